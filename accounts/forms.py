@@ -1,6 +1,7 @@
 from django import forms
 from django.contrib.auth.forms import UserCreationForm, UserChangeForm
 from .models import CustomUser, Profile
+from .validators import validate_student_email
 
 
 class CustomUserCreationForm(UserCreationForm):
@@ -12,11 +13,7 @@ class CustomUserCreationForm(UserCreationForm):
 
     def clean_email(self):
         data = self.cleaned_data['email']
-        domain = data.split('@')[1]
-        domain_list = ["mytudublin.ie"]
-        if domain not in domain_list:
-            raise forms.ValidationError(
-                "Please use your '@mytudublin.ie' email address provided.")
+        validate_student_email(data)
         return data
 
     def save(self, commit=True):
@@ -0,0 +1,52 @@
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.provisioning import provision_students, read_roster
+
+
+class Command(BaseCommand):
+    help = ('Creates student accounts from a CSV roster '
+            '(email, first_name, last_name, username, password).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('roster', help='Path to the CSV roster.')
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Processes used to hash passwords.')
+        parser.add_argument('--chunk-size', type=int, default=1000,
+                            help='Rows inserted per bulk_create.')
+        parser.add_argument('--invites', default=None,
+                            help='Write the invite links of accounts created '
+                                 'without a password to this CSV file.')
+        parser.add_argument('--base-url', default='',
+                            help='Prefix for invite links, e.g. https://moodle.example.com')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only validate the roster.')
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['roster'], newline='', encoding='utf-8-sig') as f:
+                rows, errors = read_roster(f)
+        except OSError as e:
+            raise CommandError(e)
+
+        if not options['dry_run']:
+            result = provision_students(rows, workers=options['workers'],
+                                        chunk_size=options['chunk_size'])
+            errors += result.errors
+            self.stdout.write(self.style.SUCCESS(
+                f'Created {result.created} account(s), '
+                f'skipped {result.skipped} existing.'))
+            if options['invites'] and result.invites:
+                with open(options['invites'], 'w', newline='') as f:
+                    writer = csv.writer(f)
+                    writer.writerow(['email', 'invite_url'])
+                    for email, path in result.invites:
+                        writer.writerow([email, options['base_url'] + path])
+                self.stdout.write(f'Wrote {len(result.invites)} invite(s) '
+                                  f'to {options["invites"]}.')
+        else:
+            self.stdout.write(f'{len(rows)} valid row(s).')
+
+        for line, message in sorted(errors):
+            self.stderr.write(f'line {line}: {message}')
@@ -0,0 +1,94 @@
+import time
+
+from django.conf import settings
+from django.contrib import auth
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.utils.crypto import constant_time_compare
+from django.utils.functional import SimpleLazyObject
+
+from .models import CustomUser
+
+USER_CACHE_KEY = 'auth:user:{}'
+
+
+def user_cache_key(user_id):
+    return USER_CACHE_KEY.format(user_id)
+
+
+def load_user_snapshot(user_id):
+    """
+    Returns the CustomUser (with its Profile already joined) for <user_id>,
+    from cache when possible. The snapshot is dropped by the signal handlers in
+    accounts/signals.py whenever the user or profile is saved, and by
+    <CustomUserQuerySet.update> for bulk updates.
+
+    Invalidation only reaches the cache of the process that made the change
+    (every worker in production shares one, see MOODLE_CACHE_URL), so
+    snapshots older than AUTH_USER_RECHECK_INTERVAL seconds also have their
+    password hash and <is_active> checked against the database: a revoked
+    session never outlives that interval.
+    """
+    key = user_cache_key(user_id)
+    timeout = getattr(settings, 'AUTH_USER_CACHE_TIMEOUT', 300)
+    now = time.time()
+    cached = cache.get(key)
+    if cached is not None:
+        user, checked = cached
+        if now - checked < getattr(settings, 'AUTH_USER_RECHECK_INTERVAL', 30):
+            return user
+        current = (CustomUser.objects.filter(pk=user_id)
+                   .values_list('password', 'is_active').first())
+        if current == (user.password, user.is_active):
+            cache.set(key, (user, now), timeout)
+            return user
+    user = (CustomUser.objects.select_related('profile')
+            .filter(pk=user_id).first())
+    if user is not None:
+        cache.set(key, (user, now), timeout)
+    return user
+
+
+def get_cached_user(request):
+    """
+    Same contract as <django.contrib.auth.get_user>, but the user row comes
+    from the cache. Anything unusual (unknown backend, hash mismatch, legacy
+    hashes) is handed over to Django's own implementation.
+    """
+    try:
+        user_id = CustomUser._meta.pk.to_python(request.session[SESSION_KEY])
+        backend_path = request.session[BACKEND_SESSION_KEY]
+    except KeyError:
+        return AnonymousUser()
+    if backend_path != 'django.contrib.auth.backends.ModelBackend':
+        return auth.get_user(request)
+
+    user = load_user_snapshot(user_id)
+    if user is None or not user.is_active:
+        return AnonymousUser()
+    session_hash = request.session.get(HASH_SESSION_KEY)
+    if not (session_hash and
+            constant_time_compare(session_hash, user.get_session_auth_hash())):
+        return auth.get_user(request)
+    user.backend = backend_path
+    return user
+
+
+class CachedAuthenticationMiddleware(AuthenticationMiddleware):
+    """
+    Drop-in replacement for AuthenticationMiddleware that resolves
+    <request.user> from the cache instead of querying the user table.
+    """
+
+    def process_request(self, request):
+        assert hasattr(request, 'session'), (
+            "CachedAuthenticationMiddleware requires SessionMiddleware.")
+
+        def get_user():
+            if not hasattr(request, '_cached_user'):
+                request._cached_user = get_cached_user(request)
+            return request._cached_user
+
+        request.user = SimpleLazyObject(get_user)
@@ -0,0 +1,19 @@
+# Generated by Django 3.1.14 on 2026-10-19 19:21
+
+from django.db import migrations, models
+import moodle.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_auto_20210421_1906'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='profile',
+            name='photo',
+            field=models.ImageField(blank=True, upload_to=moodle.storage.ShardedUploadTo('profile_pic')),
+        ),
+    ]
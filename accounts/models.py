@@ -1,6 +1,28 @@
+from django.core.cache import cache
 from django.db import models
 from django_countries.fields import CountryField
-from django.contrib.auth.models import AbstractUser
+from django.contrib.auth.models import AbstractUser, UserManager
+
+from moodle.storage import ShardedUploadTo
+
+
+class CustomUserQuerySet(models.QuerySet):
+
+    def update(self, **kwargs):
+        # No signals are sent for bulk updates (admin actions, scripts,
+        # bulk_update): drop the cached snapshots here, or deactivated users
+        # would stay logged in (see accounts/middleware.py)
+        from .middleware import user_cache_key
+        ids = list(self.values_list('pk', flat=True))
+        rows = super().update(**kwargs)
+        cache.delete_many([user_cache_key(pk) for pk in ids])
+        return rows
+
+    update.alters_data = True
+
+
+class CustomUserManager(UserManager.from_queryset(CustomUserQuerySet)):
+    pass
 
 
 class CustomUser(AbstractUser):
@@ -12,6 +34,8 @@ class CustomUser(AbstractUser):
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username', 'first_name', 'last_name']
 
+    objects = CustomUserManager()
+
     def __str__(self):
         return f'{self.first_name} {self.last_name}'
 
@@ -21,7 +45,7 @@ class Profile(models.Model):
                                 on_delete=models.CASCADE)
     date_of_birth = models.DateField(blank=True, null=True)
     country = CountryField(blank_label='Where are you from?', default='IE')
-    photo = models.ImageField(upload_to='profile_pic/%Y/%M/%d', blank=True)
+    photo = models.ImageField(upload_to=ShardedUploadTo('profile_pic'), blank=True)
     bio = models.CharField(max_length=200, default='')  # A short description
 
     def __str__(self):
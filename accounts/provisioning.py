@@ -0,0 +1,179 @@
+"""
+Bulk provisioning of student accounts from a CSV roster.
+
+The roster has an 'email' column and optionally 'first_name', 'last_name',
+'username' and 'password'. Rows without a password get an unusable password
+and an invite token (a password reset link) instead.
+
+Password hashing is CPU bound and dominates the cost of creating accounts, so
+it is spread over a process pool; users and profiles are then inserted with
+<bulk_create> in chunks.
+"""
+import csv
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.tokens import default_token_generator
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.db.models.functions import Lower
+from django.urls import reverse
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from .models import CustomUser, Profile
+from .validators import validate_student_email
+
+RosterRow = namedtuple('RosterRow', 'line email username first_name last_name password')
+
+ProvisionResult = namedtuple('ProvisionResult', 'created skipped errors invites')
+
+
+def read_roster(fileobj):
+    """
+    Parses a CSV roster (text file object). Returns (rows, errors) where errors
+    is a list of (line, message) for rows that can't be provisioned.
+    """
+    rows, errors = [], []
+    seen = set()
+    for line, record in enumerate(csv.DictReader(fileobj), start=2):
+        email = (record.get('email') or '').strip().lower()
+        try:
+            validate_student_email(email)
+        except ValidationError as e:
+            errors.append((line, f'{email or "<empty>"}: {e.messages[0]}'))
+            continue
+        if email in seen:
+            errors.append((line, f'{email}: duplicate in roster'))
+            continue
+        seen.add(email)
+        rows.append(RosterRow(
+            line=line,
+            email=email,
+            username=(record.get('username') or '').strip() or email.split('@')[0],
+            first_name=(record.get('first_name') or '').strip(),
+            last_name=(record.get('last_name') or '').strip(),
+            password=record.get('password') or None,
+        ))
+    return rows, errors
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def hash_passwords(passwords, workers=None):
+    """Hashes <passwords> in parallel, keeping their order."""
+    if not passwords:
+        return []
+    with ProcessPoolExecutor(max_workers=workers,
+                             initializer=django.setup) as executor:
+        chunksize = max(1, len(passwords) // ((workers or 4) * 4))
+        return list(executor.map(make_password, passwords, chunksize=chunksize))
+
+
+def invite_path(user):
+    """Relative URL letting <user> choose a password (password reset view)."""
+    return reverse('password_reset_confirm', kwargs={
+        'uidb64': urlsafe_base64_encode(force_bytes(user.pk)),
+        'token': default_token_generator.make_token(user),
+    })
+
+
+def _users_by_email(emails):
+    """Users whose email is one of <emails> (lowercase), whatever its case."""
+    return (CustomUser.objects.annotate(email_lower=Lower('email'))
+            .filter(email_lower__in=emails))
+
+
+def _create_accounts(rows, hashes):
+    """Inserts users and profiles for <rows>. Returns the new users."""
+    with transaction.atomic():
+        CustomUser.objects.bulk_create([
+            CustomUser(email=r.email, username=r.username,
+                       first_name=r.first_name, last_name=r.last_name,
+                       password=hashes.get(r.email) or make_password(None))
+            for r in rows])
+        # bulk_create doesn't return primary keys on every backend
+        users = list(_users_by_email([r.email for r in rows])
+                     .only('id', 'email', 'password', 'last_login'))
+        Profile.objects.bulk_create([Profile(user=user) for user in users])
+    return users
+
+
+def _drop_registered(rows):
+    """
+    Splits <rows> after accounts were registered concurrently: returns the
+    rows still free, the number of rows whose email now exists and the errors
+    of those whose username was taken.
+    """
+    emails = set(_users_by_email([r.email for r in rows])
+                 .values_list('email_lower', flat=True))
+    usernames = set(CustomUser.objects.filter(username__in=[r.username for r in rows])
+                    .values_list('username', flat=True))
+    free, skipped, errors = [], 0, []
+    for row in rows:
+        if row.email in emails:
+            skipped += 1
+        elif row.username in usernames:
+            errors.append((row.line, f'{row.email}: username {row.username} is taken'))
+        else:
+            free.append(row)
+    return free, skipped, errors
+
+
+def provision_students(rows, workers=None, chunk_size=1000):
+    """
+    Creates accounts and profiles for the roster <rows>.
+    Rows whose email (in any case) or username already exists are skipped,
+    including accounts registered while the import runs.
+    """
+    errors = []
+    skipped = 0
+    existing_emails, existing_usernames = set(), set()
+    for chunk in _chunks(rows, chunk_size):
+        existing = _users_by_email([r.email for r in chunk])
+        existing_emails.update(existing.values_list('email_lower', flat=True))
+        existing_usernames.update(
+            CustomUser.objects.filter(username__in=[r.username for r in chunk])
+            .values_list('username', flat=True))
+
+    new_rows = []
+    for row in rows:
+        if row.email in existing_emails:
+            skipped += 1
+        elif row.username in existing_usernames:
+            errors.append((row.line, f'{row.email}: username {row.username} is taken'))
+        else:
+            existing_usernames.add(row.username)
+            new_rows.append(row)
+
+    # Hash the provided passwords in parallel, unusable ones cost nothing
+    with_password = [r for r in new_rows if r.password]
+    hashes = dict(zip((r.email for r in with_password),
+                      hash_passwords([r.password for r in with_password], workers)))
+
+    created = 0
+    invites = []
+    for chunk in _chunks(new_rows, chunk_size):
+        while True:
+            try:
+                users = _create_accounts(chunk, hashes)
+                break
+            except IntegrityError:
+                # Someone registered since the checks above: the chunk was
+                # rolled back, retry it without the rows now taken
+                chunk, taken, conflicts = _drop_registered(chunk)
+                if not taken and not conflicts:
+                    raise
+                skipped += taken
+                errors.extend(conflicts)
+        created += len(users)
+        invites.extend((user.email, invite_path(user)) for user in users
+                       if not hashes.get(user.email))
+
+    return ProvisionResult(created=created, skipped=skipped,
+                           errors=sorted(errors), invites=invites)
@@ -0,0 +1,17 @@
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .middleware import user_cache_key
+from .models import CustomUser, Profile
+
+
+@receiver([post_save, post_delete], sender=CustomUser)
+def invalidate_user_snapshot(sender, instance, **kwargs):
+    # Covers profile edits in the admin, password changes and last_login updates
+    cache.delete(user_cache_key(instance.pk))
+
+
+@receiver([post_save, post_delete], sender=Profile)
+def invalidate_profile_snapshot(sender, instance, **kwargs):
+    cache.delete(user_cache_key(instance.user_id))
@@ -1,3 +1,115 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
 from django.test import TestCase
+from django.urls import reverse
+
+from . import provisioning
+from .middleware import load_user_snapshot, user_cache_key
+from .models import CustomUser, Profile
+from .provisioning import provision_students, read_roster
+
+ROSTER = '''email,first_name,username,password
+Jane.Doe@MyTUDublin.ie,Jane,,
+new.student@mytudublin.ie,New,,
+second@mytudublin.ie,Second,second,s3cret-Pass
+outsider@example.com,Out,,
+NEW.STUDENT@mytudublin.ie,Again,,
+'''
+
+
+class ProvisioningTests(TestCase):
+
+    def setUp(self):
+        CustomUser.objects.create(username='jane', email='Jane.Doe@mytudublin.ie')
+        self.rows, self.errors = read_roster(StringIO(ROSTER))
+
+    def test_read_roster(self):
+        self.assertEqual([row.email for row in self.rows], [
+            'jane.doe@mytudublin.ie', 'new.student@mytudublin.ie', 'second@mytudublin.ie'])
+        self.assertEqual(self.rows[1].username, 'new.student')
+        self.assertEqual([line for line, _ in self.errors], [5, 6])
+
+    def test_existing_email_in_any_case_is_skipped(self):
+        result = provision_students(self.rows, workers=1)
+        self.assertEqual((result.created, result.skipped, result.errors), (2, 1, []))
+        self.assertEqual(CustomUser.objects.filter(email__iexact='jane.doe@mytudublin.ie').count(), 1)
+        self.assertEqual(Profile.objects.filter(user__email__endswith='@mytudublin.ie').count(), 2)
+
+        second = CustomUser.objects.get(username='second')
+        self.assertTrue(second.check_password('s3cret-Pass'))
+        # Accounts without a password get an invite instead
+        new = CustomUser.objects.get(username='new.student')
+        self.assertFalse(new.has_usable_password())
+        self.assertEqual([email for email, _ in result.invites], ['new.student@mytudublin.ie'])
+
+    def test_concurrent_registration_is_skipped(self):
+        hash_passwords = provisioning.hash_passwords
+
+        def register_meanwhile(passwords, workers):
+            # Runs between the existence checks and the inserts
+            CustomUser.objects.create(username='new', email='new.student@mytudublin.ie')
+            return hash_passwords(passwords, workers)
+
+        with mock.patch.object(provisioning, 'hash_passwords', register_meanwhile):
+            result = provision_students(self.rows, workers=1)
+        self.assertEqual((result.created, result.skipped, result.errors), (1, 2, []))
+        self.assertEqual(result.invites, [])
+        self.assertTrue(Profile.objects.filter(user__username='second').exists())
+        self.assertFalse(Profile.objects.filter(user__username='new').exists())
+
+
+class CachedAuthenticationTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create(username='jane', email='jane@mytudublin.ie')
+        Profile.objects.create(user=self.user)
+
+    def test_snapshot_is_cached(self):
+        self.assertEqual(load_user_snapshot(self.user.pk), self.user)
+        with self.assertNumQueries(0):
+            user = load_user_snapshot(self.user.pk)
+            self.assertEqual(user.profile.country, 'IE')
+
+    def test_save_drops_snapshot(self):
+        load_user_snapshot(self.user.pk)
+        self.user.profile.save()
+        self.assertIsNone(cache.get(user_cache_key(self.user.pk)))
+        load_user_snapshot(self.user.pk)
+        self.user.save()
+        self.assertIsNone(cache.get(user_cache_key(self.user.pk)))
+
+    def test_bulk_deactivation_logs_out(self):
+        self.client.force_login(self.user)
+        url = reverse('notifications:list')
+        self.assertEqual(self.client.get(url).status_code, 200)
+        self.assertIsNotNone(cache.get(user_cache_key(self.user.pk)))
+        # As the admin's bulk actions do: no model signals
+        CustomUser.objects.filter(email__endswith='@mytudublin.ie').update(is_active=False)
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+    def test_stale_snapshot_is_rechecked(self):
+        # Another worker's cache still holds the snapshot it loaded before the
+        # password change: the invalidation never reached it
+        self.client.force_login(self.user)
+        url = reverse('notifications:list')
+        self.assertEqual(self.client.get(url).status_code, 200)
+        stale = cache.get(user_cache_key(self.user.pk))
+        CustomUser.objects.filter(pk=self.user.pk).update(is_active=False)
+        cache.set(user_cache_key(self.user.pk), stale)
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+        with mock.patch('accounts.middleware.time.time', return_value=stale[1] + 31):
+            self.assertEqual(self.client.get(url).status_code, 302)
+            self.assertFalse(load_user_snapshot(self.user.pk).is_active)
 
-# Create your tests here.
+    def test_recheck_keeps_unchanged_snapshot(self):
+        load_user_snapshot(self.user.pk)
+        _, checked = cache.get(user_cache_key(self.user.pk))
+        with mock.patch('accounts.middleware.time.time', return_value=checked + 31):
+            with self.assertNumQueries(1):
+                load_user_snapshot(self.user.pk)
+            with self.assertNumQueries(0):
+                self.assertEqual(load_user_snapshot(self.user.pk).profile.country, 'IE')
@@ -0,0 +1,11 @@
+from django.core.exceptions import ValidationError
+
+# Only university addresses can register
+STUDENT_EMAIL_DOMAINS = ['mytudublin.ie']
+
+
+def validate_student_email(value):
+    domain = value.rsplit('@', 1)[-1].lower()
+    if domain not in STUDENT_EMAIL_DOMAINS:
+        raise ValidationError(
+            "Please use your '@mytudublin.ie' email address provided.")
@@ -0,0 +1,198 @@
+"""
+Buffered access log: which Resources students open and download.
+
+Views don't write anything: <record> appends the event to an in-process ring
+buffer and returns. A background thread (started on the first event) drains
+the buffer whenever ACCESS_LOG_FLUSH_EVENTS events are waiting or every
+ACCESS_LOG_FLUSH_INTERVAL seconds, and writes the whole batch in one
+transaction: the ResourceAccess rows with <bulk_create>, plus one increment
+per Resource and per student of the per-resource and per-student counters.
+
+Losses are bounded:
+  - the buffer holds ACCESS_LOG_BUFFER_SIZE events, when the database can't
+    keep up the oldest events are dropped (and counted in <dropped>),
+  - at exit the remaining events are written within
+    ACCESS_LOG_SHUTDOWN_TIMEOUT seconds, a killed process loses what was
+    buffered, at most ACCESS_LOG_FLUSH_INTERVAL seconds of events,
+  - a batch that fails to write is logged and dropped (counted in <failed>).
+
+With BACKGROUND_TASKS_EAGER set, events are written as they are recorded.
+"""
+import atexit
+import logging
+import threading
+from collections import deque, namedtuple
+
+from django.conf import settings
+from django.db import close_old_connections, connections, transaction
+from django.db.models import F
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from .models import ResourceAccess, ResourceAccessCount, StudentAccessCount
+
+logger = logging.getLogger(__name__)
+
+AccessEvent = namedtuple('AccessEvent', 'user_id resource_id module_id action created')
+
+# Counter incremented for each action
+COUNTER_FIELDS = {
+    ResourceAccess.VIEW: 'views',
+    ResourceAccess.DOWNLOAD: 'downloads',
+}
+
+
+def _tally(events, key):
+    """{key(event): {counter: n, 'last_accessed': newest}} for <events>."""
+    totals = {}
+    for event in events:
+        row = totals.setdefault(key(event), {'views': 0, 'downloads': 0,
+                                             'last_accessed': event.created})
+        row[COUNTER_FIELDS[event.action]] += 1
+        row['last_accessed'] = max(row['last_accessed'], event.created)
+    return totals
+
+
+def _increment(queryset, row):
+    queryset.update(
+        views=F('views') + row['views'],
+        downloads=F('downloads') + row['downloads'],
+        last_accessed=Greatest(Coalesce('last_accessed', row['last_accessed']),
+                               row['last_accessed']))
+
+
+def write_events(events):
+    """Writes a batch of AccessEvents and adds them to the counters."""
+    resources = _tally(events, lambda e: (e.resource_id, e.module_id))
+    students = _tally(events, lambda e: (e.user_id, e.module_id))
+    with transaction.atomic():
+        ResourceAccess.objects.bulk_create(
+            [ResourceAccess(**event._asdict()) for event in events], batch_size=500)
+
+        ResourceAccessCount.objects.bulk_create(
+            [ResourceAccessCount(resource_id=resource_id, module_id=module_id)
+             for resource_id, module_id in resources], ignore_conflicts=True)
+        for (resource_id, _), row in resources.items():
+            _increment(ResourceAccessCount.objects.filter(resource_id=resource_id), row)
+
+        StudentAccessCount.objects.bulk_create(
+            [StudentAccessCount(student_id=user_id, module_id=module_id)
+             for user_id, module_id in students], ignore_conflicts=True)
+        for (user_id, module_id), row in students.items():
+            _increment(StudentAccessCount.objects.filter(student_id=user_id,
+                                                         module_id=module_id), row)
+
+
+class AccessLog:
+    """Ring buffer of AccessEvents, flushed to the database by a background thread."""
+
+    def __init__(self, capacity=10000, flush_events=500, flush_interval=5.0,
+                 shutdown_timeout=5.0):
+        self.buffer = deque(maxlen=capacity)
+        self.flush_events = flush_events
+        self.flush_interval = flush_interval
+        self.shutdown_timeout = shutdown_timeout
+        self.condition = threading.Condition()
+        self.thread = None
+        self.stopping = False
+        self.dropped = 0
+        self.failed = 0
+
+    def record(self, event):
+        """Buffers <event>, never blocks on the database."""
+        with self.condition:
+            if len(self.buffer) == self.buffer.maxlen:
+                self.dropped += 1
+            self.buffer.append(event)
+            if self.thread is None:
+                self._start()
+            if len(self.buffer) >= self.flush_events:
+                self.condition.notify()
+
+    def _start(self):
+        self.stopping = False
+        # Daemon: a stuck database must not block the exit, <stop> (run by
+        # atexit) gives the thread <shutdown_timeout> seconds to finish
+        self.thread = threading.Thread(target=self._run, name='moodle-access-log',
+                                       daemon=True)
+        self.thread.start()
+        atexit.register(self.stop)
+
+    def _drain(self):
+        batch = list(self.buffer)
+        self.buffer.clear()
+        return batch
+
+    def _run(self):
+        while True:
+            with self.condition:
+                self.condition.wait_for(
+                    lambda: self.stopping or len(self.buffer) >= self.flush_events,
+                    timeout=self.flush_interval)
+                batch = self._drain()
+                stopping = self.stopping
+            if batch:
+                self._write(batch)
+            if stopping:
+                return
+
+    def _write(self, batch):
+        close_old_connections()
+        try:
+            write_events(batch)
+        except Exception:
+            self.failed += len(batch)
+            logger.exception('Could not write %s access event(s)', len(batch))
+        finally:
+            # Release this thread's connection between flushes
+            connections.close_all()
+
+    def flush(self):
+        """Writes the buffered events now, on the calling thread."""
+        with self.condition:
+            batch = self._drain()
+        if batch:
+            write_events(batch)
+        return len(batch)
+
+    def stop(self):
+        """Stops the flusher thread once it has written what is buffered."""
+        with self.condition:
+            thread = self.thread
+            if thread is None:
+                return
+            self.stopping = True
+            self.condition.notify()
+        thread.join(self.shutdown_timeout)
+        if thread.is_alive():
+            logger.warning('Access log still writing after %ss, %s event(s) lost',
+                           self.shutdown_timeout, len(self.buffer))
+        with self.condition:
+            self.thread = None
+        atexit.unregister(self.stop)
+
+
+_access_log = None
+_access_log_lock = threading.Lock()
+
+
+def get_access_log():
+    """The access log of this process, created from the ACCESS_LOG_* settings."""
+    global _access_log
+    if _access_log is None:
+        with _access_log_lock:
+            if _access_log is None:
+                _access_log = AccessLog(
+                    capacity=getattr(settings, 'ACCESS_LOG_BUFFER_SIZE', 10000),
+                    flush_events=getattr(settings, 'ACCESS_LOG_FLUSH_EVENTS', 500),
+                    flush_interval=getattr(settings, 'ACCESS_LOG_FLUSH_INTERVAL', 5),
+                    shutdown_timeout=getattr(settings, 'ACCESS_LOG_SHUTDOWN_TIMEOUT', 5))
+    return _access_log
+
+
+def record(user_id, resource_id, module_id, action):
+    event = AccessEvent(user_id, resource_id, module_id, action, timezone.now())
+    if getattr(settings, 'BACKGROUND_TASKS_EAGER', False):
+        write_events([event])
+    else:
+        get_access_log().record(event)
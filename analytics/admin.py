@@ -0,0 +1,33 @@
+from django.contrib import admin
+from .models import (ModuleActivity, ModuleSummary, ResourceAccess, ResourceAccessCount,
+                     StudentAccessCount)
+
+
+@admin.register(ModuleSummary)
+class ModuleSummaryAdmin(admin.ModelAdmin):
+    list_display = ['module', 'students', 'topics', 'resources', 'storage_bytes', 'updated']
+
+
+@admin.register(ModuleActivity)
+class ModuleActivityAdmin(admin.ModelAdmin):
+    list_display = ['module', 'period', 'day', 'enrollments', 'unenrollments',
+                    'resources_added', 'resources_removed']
+    list_filter = ['period']
+
+
+@admin.register(ResourceAccess)
+class ResourceAccessAdmin(admin.ModelAdmin):
+    list_display = ['user', 'resource_id', 'module_id', 'action', 'created']
+    list_filter = ['action']
+    raw_id_fields = ['user']
+
+
+@admin.register(ResourceAccessCount)
+class ResourceAccessCountAdmin(admin.ModelAdmin):
+    list_display = ['resource_id', 'module_id', 'views', 'downloads', 'last_accessed']
+
+
+@admin.register(StudentAccessCount)
+class StudentAccessCountAdmin(admin.ModelAdmin):
+    list_display = ['student', 'module_id', 'views', 'downloads', 'last_accessed']
+    raw_id_fields = ['student']
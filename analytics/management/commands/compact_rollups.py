@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from analytics.rollups import (access_retention_days, compact_activity, prune_access_log,
+                               rebuild_summaries, retention_days)
+
+
+class Command(BaseCommand):
+    help = ('Recomputes the analytics totals of every module, folds daily '
+            'activity older than ANALYTICS_DAILY_RETENTION_DAYS into months and '
+            'deletes access events older than ACCESS_LOG_RETENTION_DAYS. '
+            'Run it periodically (e.g. nightly).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--skip-storage', action='store_true',
+                            help="Don't recompute storage usage (stats every file).")
+
+    def handle(self, *args, **options):
+        summaries = rebuild_summaries(storage=not options['skip_storage'])
+        folded = compact_activity()
+        pruned = prune_access_log()
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {summaries} module summaries, folded {folded} daily '
+            f'row(s) older than {retention_days()} days into months, deleted '
+            f'{pruned} access event(s) older than {access_retention_days()} days.'))
@@ -0,0 +1,68 @@
+# Generated by Django 3.1.14 on 2026-10-19 19:39
+
+from django.db import migrations, models
+from django.db.models import Count
+import django.db.models.deletion
+
+
+def create_summaries(apps, schema_editor):
+    # Counts only: storage usage is filled in by the compact_rollups command
+    Module = apps.get_model('modules', 'Module')
+    Topic = apps.get_model('modules', 'Topic')
+    Resource = apps.get_model('modules', 'Resource')
+    ModuleSummary = apps.get_model('analytics', 'ModuleSummary')
+
+    def counts(queryset, group_by):
+        return dict(queryset.values_list(group_by).order_by().annotate(n=Count('id')))
+
+    students = counts(Module.students.through.objects, 'module_id')
+    topics = counts(Topic.objects, 'module_id')
+    resources = counts(Resource.objects, 'topic__module_id')
+    ModuleSummary.objects.bulk_create([
+        ModuleSummary(module_id=pk, students=students.get(pk, 0),
+                      topics=topics.get(pk, 0), resources=resources.get(pk, 0))
+        for pk in Module.objects.values_list('id', flat=True)])
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('modules', '0008_module_capacity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ModuleSummary',
+            fields=[
+                ('module', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='summary', serialize=False, to='modules.module')),
+                ('students', models.IntegerField(default=0)),
+                ('topics', models.IntegerField(default=0)),
+                ('resources', models.IntegerField(default=0)),
+                ('storage_bytes', models.BigIntegerField(default=0)),
+                ('updated', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ModuleActivity',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('day', 'Day'), ('month', 'Month')], default='day', max_length=5)),
+                ('day', models.DateField()),
+                ('enrollments', models.IntegerField(default=0)),
+                ('unenrollments', models.IntegerField(default=0)),
+                ('resources_added', models.IntegerField(default=0)),
+                ('resources_removed', models.IntegerField(default=0)),
+                ('bytes_added', models.BigIntegerField(default=0)),
+                ('bytes_removed', models.BigIntegerField(default=0)),
+                ('module', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='activity', to='modules.module')),
+            ],
+            options={
+                'verbose_name_plural': 'module activity',
+                'ordering': ['day'],
+                'unique_together': {('module', 'period', 'day')},
+            },
+        ),
+        migrations.RunPython(create_summaries, migrations.RunPython.noop),
+    ]
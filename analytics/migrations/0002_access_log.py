@@ -0,0 +1,59 @@
+# Generated by Django 3.1.14 on 2026-10-19 19:49
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('modules', '0008_module_capacity'),
+        ('analytics', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResourceAccessCount',
+            fields=[
+                ('views', models.IntegerField(default=0)),
+                ('downloads', models.IntegerField(default=0)),
+                ('last_accessed', models.DateTimeField(blank=True, null=True)),
+                ('resource', models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='+', serialize=False, to='modules.resource')),
+                ('module', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='modules.module')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ResourceAccess',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('action', models.PositiveSmallIntegerField(choices=[(1, 'View'), (2, 'Download')])),
+                ('created', models.DateTimeField(db_index=True)),
+                ('module', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='modules.module')),
+                ('resource', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='modules.resource')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resource_accesses', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'resource accesses',
+            },
+        ),
+        migrations.CreateModel(
+            name='StudentAccessCount',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('views', models.IntegerField(default=0)),
+                ('downloads', models.IntegerField(default=0)),
+                ('last_accessed', models.DateTimeField(blank=True, null=True)),
+                ('module', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='modules.module')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='access_counts', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('module', 'student')},
+            },
+        ),
+        migrations.AddIndex(
+            model_name='resourceaccesscount',
+            index=models.Index(fields=['module', '-views'], name='access_module_views_idx'),
+        ),
+    ]
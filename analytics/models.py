@@ -0,0 +1,150 @@
+from django.conf import settings
+from django.db import models
+
+from modules.models import Module, Resource
+
+
+class ModuleSummary(models.Model):
+    """
+        Running totals of a Module for the instructor dashboard.
+        Updated in place with F() increments (see analytics/rollups.py) and
+        recomputed exactly by the compact_rollups command.
+    """
+    module = models.OneToOneField(Module,
+                                  primary_key=True,
+                                  related_name='summary',
+                                  on_delete=models.CASCADE)
+    students = models.IntegerField(default=0)
+    topics = models.IntegerField(default=0)
+    resources = models.IntegerField(default=0)
+    storage_bytes = models.BigIntegerField(default=0)
+    updated = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'Summary of {self.module_id}'
+
+    @property
+    def resources_per_topic(self):
+        return round(self.resources / self.topics, 1) if self.topics else 0
+
+
+class ModuleActivity(models.Model):
+    """
+        Activity of a Module over one day, or over one month once
+        compact_rollups has folded old days together. <day> is the first day
+        of the period.
+    """
+    DAY = 'day'
+    MONTH = 'month'
+
+    PERIOD_CHOICES = [
+        (DAY, 'Day'),
+        (MONTH, 'Month'),
+    ]
+
+    # Counters, in the order they are shown
+    COUNTERS = ('enrollments', 'unenrollments', 'resources_added',
+                'resources_removed', 'bytes_added', 'bytes_removed')
+
+    module = models.ForeignKey(Module,
+                               related_name='activity',
+                               on_delete=models.CASCADE)
+    period = models.CharField(max_length=5, choices=PERIOD_CHOICES, default=DAY)
+    day = models.DateField()
+    enrollments = models.IntegerField(default=0)
+    unenrollments = models.IntegerField(default=0)
+    resources_added = models.IntegerField(default=0)
+    resources_removed = models.IntegerField(default=0)
+    bytes_added = models.BigIntegerField(default=0)
+    bytes_removed = models.BigIntegerField(default=0)
+
+    class Meta:
+        ordering = ['day']
+        unique_together = ('module', 'period', 'day')
+        verbose_name_plural = 'module activity'
+
+    def __str__(self):
+        return f'{self.module_id} {self.period} {self.day}'
+
+
+class ResourceAccess(models.Model):
+    """
+        One Resource opened or downloaded by a user. Written in batches by the
+        access log (see analytics/access.py), never from the request itself.
+        The Resource and Module links have no database constraint: purges
+        delete Resources without visiting this (large) table, orphan rows are
+        removed by compact_rollups.
+    """
+    VIEW = 1
+    DOWNLOAD = 2
+
+    ACTION_CHOICES = [
+        (VIEW, 'View'),
+        (DOWNLOAD, 'Download'),
+    ]
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL,
+                             related_name='resource_accesses',
+                             on_delete=models.CASCADE)
+    resource = models.ForeignKey(Resource,
+                                 related_name='+',
+                                 db_constraint=False,
+                                 on_delete=models.DO_NOTHING)
+    module = models.ForeignKey(Module,
+                               related_name='+',
+                               db_constraint=False,
+                               on_delete=models.DO_NOTHING)
+    action = models.PositiveSmallIntegerField(choices=ACTION_CHOICES)
+    created = models.DateTimeField(db_index=True)
+
+    class Meta:
+        verbose_name_plural = 'resource accesses'
+
+    def __str__(self):
+        return f'{self.get_action_display()} of {self.resource_id} by {self.user_id}'
+
+
+class AccessCounts(models.Model):
+    """Views and downloads, incremented each time the access log is flushed."""
+    views = models.IntegerField(default=0)
+    downloads = models.IntegerField(default=0)
+    last_accessed = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        abstract = True
+
+
+class ResourceAccessCount(AccessCounts):
+    resource = models.OneToOneField(Resource,
+                                    primary_key=True,
+                                    related_name='+',
+                                    db_constraint=False,
+                                    on_delete=models.DO_NOTHING)
+    module = models.ForeignKey(Module,
+                               related_name='+',
+                               db_constraint=False,
+                               on_delete=models.DO_NOTHING)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['module', '-views'], name='access_module_views_idx'),
+        ]
+
+    def __str__(self):
+        return f'Accesses of {self.resource_id}'
+
+
+class StudentAccessCount(AccessCounts):
+    student = models.ForeignKey(settings.AUTH_USER_MODEL,
+                                related_name='access_counts',
+                                on_delete=models.CASCADE)
+    module = models.ForeignKey(Module,
+                               related_name='+',
+                               db_constraint=False,
+                               on_delete=models.DO_NOTHING)
+
+    class Meta:
+        unique_together = ('module', 'student')
+
+    def __str__(self):
+        return f'Accesses of {self.student_id} in {self.module_id}'
@@ -0,0 +1,210 @@
+"""
+Incrementally maintained analytics for the instructor dashboard.
+
+Enrollments and Resources added or removed bump two kinds of rows with F()
+increments:
+  - ModuleSummary, the running totals of a Module,
+  - ModuleActivity, the activity of a Module on one day.
+Reading the dashboard therefore costs one row per Module plus one row per
+day shown, however many students or resources there are.
+
+The compact_rollups command recomputes the totals exactly (fixing any drift
+left by changes made outside the application) and folds days older than
+ANALYTICS_DAILY_RETENTION_DAYS into monthly rows.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from modules.models import File, Image, Module, Resource, Topic
+from moodle.tasks import enqueue_on_commit
+from .models import (ModuleActivity, ModuleSummary, ResourceAccess, ResourceAccessCount,
+                     StudentAccessCount)
+
+Enrollment = Module.students.through
+
+
+def retention_days():
+    return getattr(settings, 'ANALYTICS_DAILY_RETENTION_DAYS', 90)
+
+
+def access_retention_days():
+    return getattr(settings, 'ACCESS_LOG_RETENTION_DAYS', 90)
+
+
+def _increment(queryset, deltas):
+    return queryset.update(**{name: F(name) + value for name, value in deltas.items()})
+
+
+def record_activity(module_id, day=None, **deltas):
+    """Adds <deltas> to the ModuleActivity row of <day> (default today)."""
+    deltas = {name: value for name, value in deltas.items() if value}
+    if not deltas:
+        return
+    day = day or timezone.localdate()
+    rows = ModuleActivity.objects.filter(module_id=module_id,
+                                         period=ModuleActivity.DAY, day=day)
+    if _increment(rows, deltas):
+        return
+    try:
+        with transaction.atomic():
+            ModuleActivity.objects.create(module_id=module_id, day=day, **deltas)
+    except IntegrityError:
+        # Created by a concurrent event
+        _increment(rows, deltas)
+
+
+def update_summary(module_id, **deltas):
+    """Adds <deltas> to the ModuleSummary of the Module."""
+    deltas = {name: value for name, value in deltas.items() if value}
+    if not deltas:
+        return
+    if not _increment(ModuleSummary.objects.filter(module_id=module_id), deltas):
+        # First event of this Module: count once, the change included
+        _create_summary(module_id)
+
+
+def refresh_topic_count(module_id):
+    """Topics are few per Module: recount them (also catches bulk inserts)."""
+    updated = ModuleSummary.objects.filter(module_id=module_id).update(
+        topics=Topic.all_objects.filter(module_id=module_id).count())
+    if not updated:
+        _create_summary(module_id)
+
+
+def _create_summary(module_id):
+    """
+    Creates the missing ModuleSummary of a Module from a recount. Runs during
+    requests: storage, which stats every file, is added in the background.
+    """
+    rebuild_summaries([module_id], storage=False)
+    enqueue_on_commit(rebuild_summaries, [module_id])
+
+
+def storage_by_module(module_ids=None, batch_size=500):
+    """Bytes of uploaded files per Module id. Stats every file: slow."""
+    totals = {}
+    for model in (File, Image):
+        resources = Resource.objects.filter(
+            resource_type=ContentType.objects.get_for_model(model))
+        if module_ids is not None:
+            resources = resources.filter(topic__module_id__in=module_ids)
+        owners = dict(resources.values_list('object_id', 'topic__module_id'))
+        object_ids = sorted(owners)
+        storage = model._meta.get_field('file').storage
+        for start in range(0, len(object_ids), batch_size):
+            chunk = object_ids[start:start + batch_size]
+            for pk, name in model.objects.filter(id__in=chunk).values_list('id', 'file'):
+                try:
+                    size = storage.size(name) if name else 0
+                except OSError:
+                    size = 0
+                totals[owners[pk]] = totals.get(owners[pk], 0) + size
+    return totals
+
+
+def _counts(queryset, group_by, module_ids):
+    if module_ids is not None:
+        queryset = queryset.filter(**{f'{group_by}__in': module_ids})
+    return dict(queryset.values_list(group_by).order_by().annotate(n=Count('id')))
+
+
+def rebuild_summaries(module_ids=None, storage=True):
+    """
+    Recomputes ModuleSummary rows from the source tables (all Modules when
+    <module_ids> is None). Topics waiting to be purged still count, as their
+    removal is reported when they are purged; their Resources do not (see
+    <resources_hidden>), while their files count in storage until deleted.
+    Returns the number of summaries written.
+    """
+    modules = Module.all_objects.all()
+    if module_ids is not None:
+        modules = modules.filter(pk__in=module_ids)
+    ids = list(modules.values_list('id', flat=True))
+    if not ids:
+        return 0
+    students = _counts(Enrollment.objects, 'module_id', ids)
+    topics = _counts(Topic.all_objects, 'module_id', ids)
+    resources = _counts(Resource.objects.filter(topic__deleted__isnull=True),
+                        'topic__module_id', ids)
+    sizes = storage_by_module(ids) if storage else {}
+
+    for module_id in ids:
+        values = {'students': students.get(module_id, 0),
+                  'topics': topics.get(module_id, 0),
+                  'resources': resources.get(module_id, 0)}
+        if storage:
+            values['storage_bytes'] = sizes.get(module_id, 0)
+        try:
+            with transaction.atomic():
+                ModuleSummary.objects.update_or_create(module_id=module_id,
+                                                       defaults=values)
+        except IntegrityError:
+            # Created concurrently, the values are the same
+            pass
+    return len(ids)
+
+
+def compact_activity(before=None):
+    """
+    Folds daily rows older than <before> (default: the retention period)
+    into monthly rows. Returns the number of daily rows folded.
+    """
+    before = before or timezone.localdate() - timedelta(days=retention_days())
+    days = ModuleActivity.objects.filter(period=ModuleActivity.DAY, day__lt=before)
+    months = (days.annotate(month=TruncMonth('day'))
+              .values('module_id', 'month').order_by()
+              .annotate(**{name: Sum(name) for name in ModuleActivity.COUNTERS}))
+    with transaction.atomic():
+        for row in months:
+            deltas = {name: row[name] for name in ModuleActivity.COUNTERS}
+            month = ModuleActivity.objects.filter(module_id=row['module_id'],
+                                                  period=ModuleActivity.MONTH,
+                                                  day=row['month'])
+            if not _increment(month, deltas):
+                ModuleActivity.objects.create(module_id=row['module_id'],
+                                              period=ModuleActivity.MONTH,
+                                              day=row['month'], **deltas)
+        folded, _ = days.delete()
+    return folded
+
+
+def daily_series(module_id, days):
+    """One dict per day of the last <days> days, oldest first, zeros included."""
+    today = timezone.localdate()
+    start = today - timedelta(days=days - 1)
+    rows = {row['day']: row for row in
+            ModuleActivity.objects.filter(module_id=module_id,
+                                          period=ModuleActivity.DAY,
+                                          day__gte=start)
+            .values('day', *ModuleActivity.COUNTERS)}
+    empty = dict.fromkeys(ModuleActivity.COUNTERS, 0)
+    return [rows.get(start + timedelta(days=n), {**empty, 'day': start + timedelta(days=n)})
+            for n in range(days)]
+
+
+def monthly_series(module_id):
+    """Activity of the compacted months, oldest first."""
+    return list(ModuleActivity.objects
+                .filter(module_id=module_id, period=ModuleActivity.MONTH)
+                .values('day', *ModuleActivity.COUNTERS))
+
+
+def prune_access_log(before=None):
+    """
+    Deletes access events older than <before> (default: the access log
+    retention period) and the counters of deleted Resources and Modules.
+    Returns the number of events deleted.
+    """
+    before = before or timezone.now() - timedelta(days=access_retention_days())
+    deleted, _ = ResourceAccess.objects.filter(created__lt=before).delete()
+    ResourceAccessCount.objects.exclude(
+        resource_id__in=Resource.objects.values('id')).delete()
+    StudentAccessCount.objects.exclude(
+        module_id__in=Module.all_objects.values('id')).delete()
+    return deleted
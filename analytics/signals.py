@@ -0,0 +1,68 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from modules.models import Module, Topic
+from modules.signals import (RESOURCE_DOWNLOADED, RESOURCE_VIEWED, resource_accessed,
+                             resources_added, resources_hidden, resources_removed)
+from students.enrollment import enrollment_changed
+from . import access
+from .models import ModuleSummary, ResourceAccess
+from .rollups import record_activity, refresh_topic_count, update_summary
+
+
+@receiver(post_save, sender=Module)
+def create_summary(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        ModuleSummary.objects.get_or_create(module=instance)
+
+
+@receiver(enrollment_changed)
+def count_enrollments(sender, module_id, delta, **kwargs):
+    record_activity(module_id, enrollments=max(delta, 0),
+                    unenrollments=max(-delta, 0))
+    update_summary(module_id, students=delta)
+
+
+@receiver(resources_added)
+def count_added_resources(sender, module_id, count, size, **kwargs):
+    record_activity(module_id, resources_added=count, bytes_added=size)
+    update_summary(module_id, resources=count, storage_bytes=size)
+    # Bulk imports create their Topics without model signals
+    refresh_topic_count(module_id)
+
+
+@receiver(resources_removed)
+def count_removed_resources(sender, module_id, count, size, hidden=False, **kwargs):
+    if module_id is None:
+        return
+    record_activity(module_id, resources_removed=count, bytes_removed=size)
+    # Hidden Resources were already taken off when their Topic was deleted
+    update_summary(module_id, resources=0 if hidden else -count, storage_bytes=-size)
+
+
+@receiver(resources_hidden)
+def count_hidden_resources(sender, module_id, count, **kwargs):
+    # Progress is completed / resources: only what students can still open
+    update_summary(module_id, resources=-count)
+
+
+@receiver(post_save, sender=Topic)
+def count_new_topic(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        refresh_topic_count(instance.module_id)
+
+
+@receiver(post_delete, sender=Topic)
+def count_purged_topic(sender, instance, **kwargs):
+    refresh_topic_count(instance.module_id)
+
+
+ACCESS_ACTIONS = {
+    RESOURCE_VIEWED: ResourceAccess.VIEW,
+    RESOURCE_DOWNLOADED: ResourceAccess.DOWNLOAD,
+}
+
+
+@receiver(resource_accessed)
+def log_access(sender, user_id, resource_id, module_id, action, **kwargs):
+    access.record(user_id, resource_id, module_id, ACCESS_ACTIONS[action])
@@ -0,0 +1,108 @@
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import CustomUser
+from modules.models import Module, Resource, Text, Topic
+from students.enrollment import enroll, unenroll
+from .access import AccessEvent, AccessLog
+from .models import (ModuleActivity, ModuleSummary, ResourceAccess, ResourceAccessCount,
+                     StudentAccessCount)
+from .rollups import rebuild_summaries
+
+
+class RollupTests(TestCase):
+
+    def setUp(self):
+        self.instructor = CustomUser.objects.create(username='teacher', is_staff=True)
+        self.module = Module.objects.create(code='ROLL1', title='Rollups', overview='-',
+                                            instructor=self.instructor)
+        CustomUser.objects.bulk_create([
+            CustomUser(username=f'student{i}', email=f'student{i}@example.com')
+            for i in range(5)])
+        self.students = list(CustomUser.objects.filter(username__startswith='student')
+                             .order_by('id'))
+
+    def test_enrollments_update_rollups(self):
+        for student in self.students:
+            enroll(self.module, student)
+        unenroll(self.module, self.students[0])
+
+        summary = ModuleSummary.objects.get(module=self.module)
+        self.assertEqual(summary.students, 4)
+        today = ModuleActivity.objects.get(module=self.module, period=ModuleActivity.DAY)
+        self.assertEqual((today.enrollments, today.unenrollments), (5, 1))
+        # The incremental totals match a full recount
+        rebuild_summaries([self.module.pk], storage=False)
+        self.assertEqual(ModuleSummary.objects.get(module=self.module).students, 4)
+
+    def test_removing_students_not_enrolled(self):
+        self.module.students.add(*self.students[:2])
+        # students[2] never enrolled: nothing to count for them
+        self.module.students.remove(self.students[0], self.students[2])
+        self.students[3].modules_enrolled.remove(self.module)
+
+        self.assertEqual(ModuleSummary.objects.get(module=self.module).students, 1)
+        today = ModuleActivity.objects.get(module=self.module, period=ModuleActivity.DAY)
+        self.assertEqual((today.enrollments, today.unenrollments), (2, 1))
+
+    def test_missing_summary_skips_storage(self):
+        ModuleSummary.objects.filter(module=self.module).delete()
+        with mock.patch('analytics.rollups.storage_by_module') as storage_by_module:
+            enroll(self.module, self.students[0])
+        storage_by_module.assert_not_called()
+        self.assertEqual(ModuleSummary.objects.get(module=self.module).students, 1)
+
+    def test_dashboard_cost_does_not_grow_with_days(self):
+        self.client.force_login(self.instructor)
+        url = reverse('analytics:dashboard')
+        self.client.get(url)  # Warm the per-session caches
+        counts = []
+        for days in (7, 365):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url, {'days': days})
+            self.assertEqual(response.status_code, 200)
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+
+
+class AccessLogTests(TestCase):
+
+    def setUp(self):
+        self.student = CustomUser.objects.create(username='student', email='s@example.com')
+        self.module = Module.objects.create(code='LOG1', title='Log', overview='-')
+        topic = Topic.objects.create(module=self.module, title='Week 1')
+        text = Text.objects.create(creator=self.student, title='Notes', content='-')
+        self.resource = Resource.objects.create(topic=topic, item=text)
+        # Thresholds out of reach: the flusher thread only writes on stop()
+        self.log = AccessLog(capacity=3, flush_events=100, flush_interval=60)
+        self.addCleanup(self.log.stop)
+
+    def event(self, action=ResourceAccess.VIEW):
+        return AccessEvent(self.student.pk, self.resource.pk, self.module.pk, action,
+                           timezone.now())
+
+    def test_flush_writes_events_and_counters(self):
+        self.log.record(self.event())
+        self.log.record(self.event())
+        self.log.record(self.event(ResourceAccess.DOWNLOAD))
+        self.assertEqual(ResourceAccess.objects.count(), 0)
+
+        self.assertEqual(self.log.flush(), 3)
+        self.assertEqual(ResourceAccess.objects.count(), 3)
+        counts = ResourceAccessCount.objects.get(resource=self.resource)
+        self.assertEqual((counts.views, counts.downloads), (2, 1))
+        counts = StudentAccessCount.objects.get(student=self.student, module=self.module)
+        self.assertEqual((counts.views, counts.downloads), (2, 1))
+
+    def test_full_buffer_drops_oldest_events(self):
+        events = [self.event() for _ in range(5)]
+        for event in events:
+            self.log.record(event)
+        self.assertEqual(self.log.dropped, 2)
+        self.assertEqual(list(self.log.buffer), events[2:])
+        self.log.flush()
@@ -0,0 +1,10 @@
+from django.urls import path
+from .views import access_report_view, analytics_dashboard_view, module_analytics_view
+
+app_name = 'analytics'
+
+urlpatterns = [
+    path('', analytics_dashboard_view, name='dashboard'),
+    path('module/<int:pk>/', module_analytics_view, name='module'),
+    path('module/<int:pk>/access/', access_report_view, name='access'),
+]
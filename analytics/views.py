@@ -0,0 +1,129 @@
+from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.views.generic.base import TemplateResponseMixin, View
+
+from modules.models import Module, Resource
+from .models import (ModuleActivity, ModuleSummary, ResourceAccessCount,
+                     StudentAccessCount)
+from .rollups import daily_series, monthly_series
+
+MAX_DAYS = 365
+
+DAY_RANGES = (7, 30, 90, 365)
+
+
+def get_days(request, default=30):
+    days = request.GET.get('days', '')
+    return min(int(days), MAX_DAYS) if days.isdigit() and int(days) else default
+
+
+class InstructorAnalyticsMixin(LoginRequiredMixin, UserPassesTestMixin):
+
+    def test_func(self):
+        # Same rule as the module management views
+        return self.request.user.is_staff
+
+
+class AnalyticsDashboardView(InstructorAnalyticsMixin, TemplateResponseMixin, View):
+    """
+    Totals of the instructor's Modules and the daily activity of one of them,
+    read from the rollup tables only (see analytics/rollups.py).
+    """
+    template_name = 'analytics/dashboard.html'
+
+    def get(self, request):
+        modules = list(Module.objects.filter(instructor=request.user)
+                       .select_related('summary'))
+        for module in modules:
+            try:
+                module.stats = module.summary
+            except ModuleSummary.DoesNotExist:
+                module.stats = ModuleSummary(module=module)
+
+        selected = None
+        if request.GET.get('module', '').isdigit():
+            selected = next((m for m in modules if m.id == int(request.GET['module'])), None)
+        selected = selected or (modules[0] if modules else None)
+        days = get_days(request)
+        series = daily_series(selected.id, days) if selected else []
+        peak = max((row['enrollments'] + row['unenrollments'] for row in series), default=0)
+        return self.render_to_response({
+            'modules': modules,
+            'selected': selected,
+            'days': days,
+            'day_ranges': DAY_RANGES,
+            'series': series,
+            'peak': peak or 1,
+            'months': monthly_series(selected.id) if selected else [],
+        })
+
+
+analytics_dashboard_view = AnalyticsDashboardView.as_view()
+
+
+class ModuleAnalyticsView(InstructorAnalyticsMixin, View):
+    """Totals and activity of one Module as JSON."""
+
+    def get(self, request, pk):
+        module = get_object_or_404(Module, pk=pk, instructor=request.user)
+        summary = ModuleSummary.objects.filter(module=module).first() \
+            or ModuleSummary(module=module)
+        days = get_days(request)
+
+        def serialize(rows):
+            return [{**row, 'day': row['day'].isoformat()} for row in rows]
+
+        return JsonResponse({
+            'module': {'id': module.id, 'code': module.code, 'title': module.title},
+            'summary': {
+                'students': summary.students,
+                'topics': summary.topics,
+                'resources': summary.resources,
+                'resources_per_topic': summary.resources_per_topic,
+                'storage_bytes': summary.storage_bytes,
+                'updated': summary.updated.isoformat() if summary.updated else None,
+            },
+            'counters': ModuleActivity.COUNTERS,
+            'days': serialize(daily_series(module.id, days)),
+            'months': serialize(monthly_series(module.id)),
+        })
+
+
+module_analytics_view = ModuleAnalyticsView.as_view()
+
+
+class AccessReportView(InstructorAnalyticsMixin, TemplateResponseMixin, View):
+    """
+    Most opened Resources and per-student activity of one Module, read from
+    the counters kept by the access log (see analytics/access.py).
+    """
+    template_name = 'analytics/access.html'
+    limit = 100
+
+    def get(self, request, pk):
+        module = get_object_or_404(Module, pk=pk, instructor=request.user)
+        resources = list(ResourceAccessCount.objects.filter(module=module)
+                         .order_by('-views', '-downloads')[:self.limit])
+        items = {resource.id: resource.item for resource in
+                 Resource.objects.filter(id__in=[row.resource_id for row in resources])
+                 .prefetch_related('item')}
+        for row in resources:
+            row.item = items.get(row.resource_id)
+        students = (StudentAccessCount.objects.filter(module=module)
+                    .select_related('student')
+                    .order_by('-views', '-downloads')[:self.limit])
+        inactive = (Module.students.through.objects.filter(module_id=module.id)
+                    .exclude(customuser_id__in=StudentAccessCount.objects
+                             .filter(module=module).values('student_id'))
+                    .count())
+        return self.render_to_response({
+            'module': module,
+            # Resources deleted since are left out
+            'resources': [row for row in resources if row.item is not None],
+            'students': students,
+            'inactive': inactive,
+        })
+
+
+access_report_view = AccessReportView.as_view()
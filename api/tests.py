@@ -0,0 +1,97 @@
+from django.test import TestCase
+from django.urls import reverse
+
+from accounts.models import CustomUser
+from modules.models import Module, Resource, Text, Topic
+from modules.purge import soft_delete_module
+
+
+class ApiTests(TestCase):
+
+    def setUp(self):
+        for i in range(3):
+            Module.objects.create(code=f'API{i}', title=f'Module {i}', overview='-' * 200)
+
+    def test_sparse_fields(self):
+        response = self.client.get('/api/modules/')
+        self.assertEqual(set(response.json()['results'][0]),
+                         {'id', 'code', 'title', 'slug', 'level', 'created'})
+        # 'id' always comes along, for the cursor
+        response = self.client.get('/api/modules/', {'fields': 'code'})
+        self.assertEqual(response.json()['results'][0],
+                         {'id': Module.objects.get(code='API0').pk, 'code': 'API0'})
+        response = self.client.get('/api/modules/', {'fields': 'code,password'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'error': 'Unknown field(s): password'})
+
+    def test_cursor_pagination(self):
+        codes, url, pages = [], '/api/modules/?limit=2&fields=code', 0
+        while url:
+            page = self.client.get(url).json()
+            codes.extend(row['code'] for row in page['results'])
+            url, pages = page['next'], pages + 1
+        self.assertEqual((codes, pages), (['API0', 'API1', 'API2'], 2))
+        for params in ({'cursor': '!!'}, {'limit': '0'}, {'limit': 'x'}):
+            self.assertEqual(self.client.get('/api/modules/', params).status_code, 400)
+
+    def test_not_modified(self):
+        url = reverse('api:module_list')
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        Module.objects.filter(code='API0').update(title='Renamed')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_not_modified_behind_gzip(self):
+        response = self.client.get('/api/modules/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertTrue(response['ETag'].startswith('W/'))
+        response = self.client.get('/api/modules/', HTTP_ACCEPT_ENCODING='gzip',
+                                   HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_resources_for_enrolled_students(self):
+        student = CustomUser.objects.create(username='student', email='student@example.com')
+        module = Module.objects.first()
+        topic = Topic.objects.create(module=module, title='Week 1')
+        resource = Resource.objects.create(topic=topic, item=Text.objects.create(
+            creator=student, title='Notes', content='Long body'))
+        url = reverse('api:resource_list', args=[topic.pk])
+        self.assertEqual(self.client.get(url).status_code, 401)
+        self.client.force_login(student)
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+        module.students.add(student)
+        row, = self.client.get(url).json()['results']
+        self.assertEqual((row['id'], row['type']), (resource.pk, 'text'))
+        self.assertNotIn('content', row['item'])
+        row, = self.client.get(url, {'include': 'content'}).json()['results']
+        self.assertEqual(row['item']['content'], 'Long body')
+
+    def test_topic_descriptions_are_sanitized(self):
+        module = Module.objects.first()
+        Topic.objects.create(module=module, title='Week 1',
+                             description='<p onclick="steal()">Hi<script>steal()</script></p>')
+        url = reverse('api:topic_list', args=[module.pk])
+        row, = self.client.get(url, {'fields': 'description_html'}).json()['results']
+        self.assertEqual(row['description_html'], '<p>Hi</p>')
+        self.assertEqual(self.client.get(url, {'fields': 'description'}).status_code, 400)
+
+    def test_deleted_module_content_is_hidden(self):
+        student = CustomUser.objects.create(username='student', email='student@example.com')
+        module = Module.objects.first()
+        module.students.add(student)
+        topic = Topic.objects.create(module=module, title='Week 1')
+        Resource.objects.create(topic=topic, item=Text.objects.create(
+            creator=student, title='Notes', content='-'))
+        topics_url = reverse('api:topic_list', args=[module.pk])
+        resources_url = reverse('api:resource_list', args=[topic.pk])
+        self.client.force_login(student)
+        self.assertEqual(len(self.client.get(topics_url).json()['results']), 1)
+        self.assertEqual(len(self.client.get(resources_url).json()['results']), 1)
+
+        # Until the background purge runs, only the Module row is flagged
+        soft_delete_module(module)
+        self.assertEqual(self.client.get(topics_url).json()['results'], [])
+        self.assertEqual(self.client.get(resources_url).status_code, 404)
@@ -0,0 +1,19 @@
+from django.urls import path
+from .views import (
+    module_list_api_view,
+    module_detail_api_view,
+    enrollment_list_api_view,
+    topic_list_api_view,
+    resource_list_api_view
+)
+
+app_name = 'api'
+
+urlpatterns = [
+    path('modules/', module_list_api_view, name='module_list'),
+    path('modules/<int:pk>/', module_detail_api_view, name='module_detail'),
+    path('modules/<int:pk>/topics/', topic_list_api_view, name='topic_list'),
+    path('topics/<int:topic_id>/resources/', resource_list_api_view,
+         name='resource_list'),
+    path('enrollments/', enrollment_list_api_view, name='enrollment_list'),
+]
@@ -0,0 +1,227 @@
+import base64
+import binascii
+import hashlib
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags, quote_etag
+from django.views.generic.base import View
+
+from modules.models import Module, Resource, Topic
+from .serializers import FieldError, parse_fields, resolve_items, serialize_rows
+
+
+# Read-only JSON API.
+# Every endpoint supports sparse fieldsets (?fields=), cursor pagination
+# (?cursor=, ?limit=) and conditional requests through ETags.
+
+
+def json_response(request, data, status=200):
+    """
+    Serializes <data> compactly and answers 304 when the client already has
+    this exact representation (If-None-Match).
+    """
+    body = json.dumps(data, cls=DjangoJSONEncoder, separators=(',', ':'))
+    etag = quote_etag(hashlib.md5(body.encode()).hexdigest())
+    # Weak comparison: CompressionMiddleware sends gzipped bodies as W/"..."
+    client_etags = [tag[2:] if tag.startswith('W/') else tag
+                    for tag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', ''))]
+    if status == 200 and (etag in client_etags or '*' in client_etags):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(body, status=status,
+                                content_type='application/json')
+    response['ETag'] = etag
+    response['Vary'] = 'Cookie'
+    return response
+
+
+def error_response(request, status, message):
+    return json_response(request, {'error': message}, status=status)
+
+
+def encode_cursor(last_id):
+    return base64.urlsafe_b64encode(str(last_id).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    padded = cursor + '=' * (-len(cursor) % 4)
+    return int(base64.urlsafe_b64decode(padded.encode()).decode())
+
+
+class ApiListView(View):
+    """
+    Base list endpoint. Subclasses define the queryset and the fields clients
+    may ask for; rows are paginated by primary key (keyset pagination), so
+    deep pages cost the same as the first one.
+    """
+    fields = ()
+    default_fields = ()
+    # Columns always fetched, consumed by <serialize>
+    required_fields = ()
+    page_size = 25
+    max_page_size = 100
+
+    def get_queryset(self):
+        raise NotImplementedError
+
+    def check_access(self, request):
+        """Returns an error response, or None when access is granted."""
+        return None
+
+    def serialize(self, rows):
+        return rows
+
+    def get(self, request, *args, **kwargs):
+        denied = self.check_access(request)
+        if denied is not None:
+            return denied
+        try:
+            fields = parse_fields(request.GET.get('fields'),
+                                  self.fields, self.default_fields)
+            limit = min(int(request.GET.get('limit', self.page_size)),
+                        self.max_page_size)
+            cursor = request.GET.get('cursor')
+            after = decode_cursor(cursor) if cursor else None
+        except FieldError as e:
+            return error_response(request, 400, str(e))
+        except (ValueError, binascii.Error):
+            return error_response(request, 400, 'Invalid limit or cursor.')
+        if limit < 1:
+            return error_response(request, 400, 'Invalid limit or cursor.')
+
+        qs = self.get_queryset().order_by('id')
+        if after is not None:
+            qs = qs.filter(id__gt=after)
+        # Fetch one extra row to know whether there is a next page
+        rows = serialize_rows(qs[:limit + 1],
+                              fields + list(self.required_fields))
+        next_url = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            params = request.GET.copy()
+            params['cursor'] = encode_cursor(rows[-1]['id'])
+            next_url = f'{request.path}?{params.urlencode()}'
+        return json_response(request, {'results': self.serialize(rows),
+                                       'next': next_url})
+
+
+########################
+###      MODULE       ##
+########################
+
+MODULE_FIELDS = ('id', 'code', 'title', 'slug', 'level', 'created',
+                 'overview', 'instructor_id')
+MODULE_DEFAULT_FIELDS = ('id', 'code', 'title', 'slug', 'level', 'created')
+
+
+class ModuleListApiView(ApiListView):
+    fields = MODULE_FIELDS
+    default_fields = MODULE_DEFAULT_FIELDS
+
+    def get_queryset(self):
+        qs = Module.objects.all()
+        level = self.request.GET.get('level')
+        if level:
+            qs = qs.filter(level=level)
+        return qs
+
+
+module_list_api_view = ModuleListApiView.as_view()
+
+
+class ModuleDetailApiView(View):
+
+    def get(self, request, pk):
+        try:
+            fields = parse_fields(request.GET.get('fields'),
+                                  MODULE_FIELDS, MODULE_FIELDS)
+        except FieldError as e:
+            return error_response(request, 400, str(e))
+        row = Module.objects.filter(id=pk).values(*fields).first()
+        if row is None:
+            return error_response(request, 404, 'Module not found.')
+        return json_response(request, row)
+
+
+module_detail_api_view = ModuleDetailApiView.as_view()
+
+
+class EnrollmentListApiView(ApiListView):
+    """Modules the current user is enrolled in."""
+    fields = MODULE_FIELDS
+    default_fields = MODULE_DEFAULT_FIELDS
+
+    def check_access(self, request):
+        if not request.user.is_authenticated:
+            return error_response(request, 401, 'Authentication required.')
+        return None
+
+    def get_queryset(self):
+        return Module.objects.filter(students=self.request.user)
+
+
+enrollment_list_api_view = EnrollmentListApiView.as_view()
+
+
+########################
+###      TOPIC        ##
+########################
+
+
+class TopicListApiView(ApiListView):
+    """
+    Topics of a Module, public like the Module detail page. Descriptions are
+    only served sanitized (see modules/richtext.py), never as typed.
+    """
+    fields = ('id', 'module_id', 'title', 'description_html', 'created', 'updated')
+    default_fields = ('id', 'module_id', 'title', 'created', 'updated')
+
+    def get_queryset(self):
+        # Topics of a soft-deleted Module live on until it is purged
+        return Topic.objects.filter(module_id=self.kwargs['pk'],
+                                    module__deleted__isnull=True)
+
+
+topic_list_api_view = TopicListApiView.as_view()
+
+
+########################
+###     RESOURCE      ##
+########################
+
+
+class ResourceListApiView(ApiListView):
+    """
+    Resources of a Topic with their items, for enrolled students and the
+    Module's instructor. Text content is only included with ?include=content.
+    """
+    fields = ('id', 'topic_id')
+    default_fields = ('id', 'topic_id')
+    required_fields = ('resource_type_id', 'object_id')
+
+    def check_access(self, request):
+        if not request.user.is_authenticated:
+            return error_response(request, 401, 'Authentication required.')
+        allowed = (Topic.objects
+                   .filter(id=self.kwargs['topic_id'], module__deleted__isnull=True)
+                   .filter(Q(module__students=request.user) |
+                           Q(module__instructor=request.user))
+                   .exists())
+        if not allowed:
+            return error_response(request, 404, 'Topic not found.')
+        return None
+
+    def get_queryset(self):
+        return Resource.objects.filter(topic_id=self.kwargs['topic_id'],
+                                       topic__deleted__isnull=True,
+                                       topic__module__deleted__isnull=True)
+
+    def serialize(self, rows):
+        include = self.request.GET.get('include', '').split(',')
+        return resolve_items(rows, include_deferred='content' in include)
+
+
+resource_list_api_view = ResourceListApiView.as_view()
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Module, Topic, Resource
+from .models import ImportJob, Module, Topic, Resource
 
 class TopicInline(admin.StackedInline):
     model = Topic
@@ -14,3 +14,8 @@ class ModuleAdmin(admin.ModelAdmin):
 
 admin.site.register(Topic)
 admin.site.register(Resource)
+
+@admin.register(ImportJob)
+class ImportJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'module', 'creator', 'status', 'processed', 'total', 'created']
+    list_filter = ['status']
@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class ModulesConfig(AppConfig):
     name = 'modules'
+
+    def ready(self):
+        # Registers the cache invalidation handlers
+        from . import signals  # noqa: F401
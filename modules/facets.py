@@ -0,0 +1,91 @@
+"""
+Catalog facets: level, instructor and tag.
+
+Counts live in <FacetCount> and are refreshed one value at a time, with a
+small indexed COUNT, whenever a Module or a Topic's tags change. A full
+rebuild is available through the rebuild_facets command.
+"""
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.db.models import Count
+
+from taggit.models import Tag, TaggedItem
+
+from .models import FacetCount, Module, Topic
+
+
+def _store(facet, value, label, count):
+    if count:
+        FacetCount.objects.update_or_create(
+            facet=facet, value=str(value),
+            defaults={'label': label, 'count': count})
+    else:
+        FacetCount.objects.filter(facet=facet, value=str(value)).delete()
+
+
+def refresh_level(level):
+    label = dict(Module.LEVEL_CHOICES).get(level, level)
+    _store(FacetCount.LEVEL, level, label,
+           Module.objects.filter(level=level).count())
+
+
+def refresh_instructor(user_id):
+    if user_id is None:
+        return
+    user = get_user_model().objects.filter(pk=user_id).first()
+    label = (user.get_full_name() or user.username) if user else str(user_id)
+    _store(FacetCount.INSTRUCTOR, user_id, label,
+           Module.objects.filter(instructor_id=user_id).count())
+
+
+def refresh_tag(tag_id):
+    tag = Tag.objects.filter(pk=tag_id).first()
+    if tag is None:
+        return
+    count = (Module.objects
+             .filter(topics__tag__id=tag_id, topics__deleted__isnull=True)
+             .distinct().count())
+    _store(FacetCount.TAG, tag.slug, tag.name, count)
+
+
+def topic_tag_ids(topic_ids):
+    return (TaggedItem.objects
+            .filter(content_type=ContentType.objects.get_for_model(Topic),
+                    object_id__in=topic_ids)
+            .values_list('tag_id', flat=True).distinct())
+
+
+def refresh_module(module):
+    """Refreshes every facet value <module> contributes to."""
+    refresh_level(module.level)
+    refresh_instructor(module.instructor_id)
+    topic_ids = Topic.all_objects.filter(module=module).values('id')
+    for tag_id in topic_tag_ids(topic_ids):
+        refresh_tag(tag_id)
+
+
+def rebuild():
+    """Recomputes every facet from scratch with GROUP BY queries."""
+    FacetCount.objects.all().delete()
+    levels = dict(Module.LEVEL_CHOICES)
+    rows = [FacetCount(facet=FacetCount.LEVEL, value=row['level'],
+                       label=levels.get(row['level'], row['level']),
+                       count=row['n'])
+            for row in Module.objects.values('level').order_by()
+                       .annotate(n=Count('id'))]
+    users = get_user_model().objects.filter(
+        modules_created__deleted__isnull=True,
+        modules_created__isnull=False).annotate(n=Count('modules_created'))
+    rows += [FacetCount(facet=FacetCount.INSTRUCTOR, value=str(user.pk),
+                        label=user.get_full_name() or user.username,
+                        count=user.n)
+             for user in users]
+    tags = (Module.objects.filter(topics__deleted__isnull=True,
+                                  topics__tag__isnull=False)
+            .values('topics__tag__slug', 'topics__tag__name')
+            .order_by().annotate(n=Count('id', distinct=True)))
+    rows += [FacetCount(facet=FacetCount.TAG, value=row['topics__tag__slug'],
+                        label=row['topics__tag__name'], count=row['n'])
+             for row in tags]
+    FacetCount.objects.bulk_create(rows)
+    return len(rows)
@@ -1,3 +1,5 @@
+import zipfile
+
 from django import forms
 from django.forms.models import inlineformset_factory
 from .models import Module, Topic
@@ -6,3 +8,16 @@ from .models import Module, Topic
 TopicFormSet = inlineformset_factory(Module, Topic, 
                                      fields=['title', 'description'],
                                      extra=1, can_delete=True)
+
+
+class ModuleImportForm(forms.Form):
+    archive = forms.FileField(
+        help_text='A zip archive. Top-level folders become topics, '
+                  'sub-folders become topic tags.')
+
+    def clean_archive(self):
+        archive = self.cleaned_data['archive']
+        if not zipfile.is_zipfile(archive):
+            raise forms.ValidationError('This is not a zip archive.')
+        archive.seek(0)
+        return archive
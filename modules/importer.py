@@ -0,0 +1,381 @@
+"""
+Bulk import of course material from a zip archive or a server-side directory.
+
+Layout of the archive:
+
+    Week 1/slides.pdf           -> Topic "Week 1"
+    Week 1/Lab/diagram.png      -> Topic "Week 1", tagged "Lab"
+    syllabus.pdf                -> Topic ROOT_TOPIC_TITLE
+
+Existing topics with the same title are reused. Entries are never extracted
+as a whole: each one is streamed from the archive straight to storage by a
+pool of worker threads, and its type (Image or File) is decided from its
+first bytes, not its extension. Items, Resources, Topics and tags are then
+inserted with <bulk_create>, one chunk of entries per transaction, and the
+ImportJob row is updated after every chunk for the progress endpoint.
+"""
+import logging
+import os
+import posixpath
+import threading
+import zipfile
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.files import File as DjangoFile
+from django.db import transaction
+from django.utils import timezone
+from django.utils.text import slugify
+
+from taggit.models import Tag, TaggedItem
+
+from . import facets, live
+from .models import File, Image, ImportJob, Resource, Topic, allocate_slots
+from .outline import invalidate_outline
+from .signals import resources_added
+
+logger = logging.getLogger(__name__)
+
+ROOT_TOPIC_TITLE = 'General'
+
+# Leading bytes of the image formats browsers display inline
+IMAGE_SIGNATURES = (
+    b'\x89PNG\r\n\x1a\n',
+    b'\xff\xd8\xff',            # JPEG
+    b'GIF87a',
+    b'GIF89a',
+    b'BM',                      # BMP
+)
+
+HEAD_SIZE = 16
+
+Entry = namedtuple('Entry', 'path topic tags')
+
+Stored = namedtuple('Stored', 'entry model name size')
+
+
+def detect_model(head):
+    """Item model for a file starting with the bytes <head>."""
+    if head.startswith(IMAGE_SIGNATURES):
+        return Image
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return Image
+    return File
+
+
+def _is_ignored(parts):
+    # Hidden files, macOS resource forks and path traversal attempts
+    return any(not part or part.startswith('.') or part in ('..', '__MACOSX')
+               for part in parts)
+
+
+def make_entry(path):
+    """Maps an archive path to its Topic title and tags, or None to skip it."""
+    parts = path.strip('/').split('/')
+    if path.startswith('/') or _is_ignored(parts):
+        return None
+    if len(parts) == 1:
+        return Entry(path, ROOT_TOPIC_TITLE, ())
+    return Entry(path, parts[0][:200], tuple(parts[1:-1]))
+
+
+class ZipSource:
+    """
+    Entries of a zip archive. Every worker thread reads through its own
+    ZipFile handle; <opener> returns a new binary file object for the archive.
+    """
+
+    def __init__(self, opener):
+        self.opener = opener
+        self.local = threading.local()
+        self.handles = []
+        self.lock = threading.Lock()
+
+    def _zip(self):
+        archive = getattr(self.local, 'archive', None)
+        if archive is None:
+            fileobj = self.opener()
+            archive = self.local.archive = zipfile.ZipFile(fileobj)
+            with self.lock:
+                self.handles.append((archive, fileobj))
+        return archive
+
+    def paths(self):
+        return [info.filename for info in self._zip().infolist()
+                if not info.is_dir()]
+
+    def size(self, path):
+        # Uncompressed size from the central directory. Reading an entry
+        # never yields more than this, whatever its compressed data holds
+        return self._zip().getinfo(path).file_size
+
+    def open(self, path):
+        return self._zip().open(path)
+
+    def close(self):
+        with self.lock:
+            for archive, fileobj in self.handles:
+                archive.close()
+                fileobj.close()
+            self.handles = []
+
+
+class DirectorySource:
+    """Regular files below <root>, symlinks are not followed."""
+
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+
+    def paths(self):
+        paths = []
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            dirnames.sort()
+            relative = os.path.relpath(dirpath, self.root)
+            for filename in sorted(filenames):
+                full = os.path.join(dirpath, filename)
+                if os.path.isfile(full) and not os.path.islink(full):
+                    path = filename if relative == '.' else os.path.join(relative, filename)
+                    paths.append(path.replace(os.sep, '/'))
+        return paths
+
+    def size(self, path):
+        return os.path.getsize(os.path.join(self.root, *path.split('/')))
+
+    def open(self, path):
+        return open(os.path.join(self.root, *path.split('/')), 'rb')
+
+    def close(self):
+        pass
+
+
+def open_source(job):
+    if job.directory:
+        if zipfile.is_zipfile(job.directory):
+            return ZipSource(lambda: open(job.directory, 'rb'))
+        return DirectorySource(job.directory)
+    return ZipSource(lambda: job.archive.storage.open(job.archive.name, 'rb'))
+
+
+def check_sizes(source, entries, max_file_size, max_total_size):
+    """
+    Leaves out the entries larger than <max_file_size> bytes (uncompressed),
+    raises ValueError when the others add up to more than <max_total_size>.
+    Runs before anything is stored: returns (entries kept, errors).
+    """
+    kept = []
+    errors = []
+    total = 0
+    for entry in entries:
+        size = source.size(entry.path)
+        if size > max_file_size:
+            errors.append(f'{entry.path}: {size} bytes, files are limited '
+                          f'to {max_file_size} bytes.')
+            continue
+        total += size
+        if total > max_total_size:
+            raise ValueError(f'The files add up to more than {max_total_size} '
+                             f'bytes, the most one import can store.')
+        kept.append(entry)
+    return kept, errors
+
+
+def store_entry(source, entry):
+    """Streams one entry to storage (runs on a worker thread)."""
+    with source.open(entry.path) as fileobj:
+        model = detect_model(fileobj.read(HEAD_SIZE))
+        fileobj.seek(0)
+        field = model._meta.get_field('file')
+        filename = posixpath.basename(entry.path)
+        name = field.storage.save(field.generate_filename(None, filename),
+                                  DjangoFile(fileobj, name=filename))
+    return Stored(entry, model, name, field.storage.size(name))
+
+
+def item_title(path):
+    title = os.path.splitext(posixpath.basename(path))[0]
+    return title.replace('_', ' ').strip()[:250] or posixpath.basename(path)[:250]
+
+
+def ensure_topics(module, entries):
+    """Topic per distinct title in <entries>, created with bulk_create if missing."""
+    titles = {entry.topic for entry in entries}
+    topics = {}
+    for topic in Topic.objects.filter(module=module, title__in=titles).order_by('id'):
+        topics.setdefault(topic.title, topic)
+    missing = titles - set(topics)
+    if missing:
+        Topic.objects.bulk_create([Topic(module=module, title=title, description='')
+                                   for title in sorted(missing)])
+        # bulk_create doesn't return primary keys on every backend
+        for topic in Topic.objects.filter(module=module, title__in=missing).order_by('id'):
+            topics.setdefault(topic.title, topic)
+    return topics
+
+
+def tag_topics(topics, entries):
+    """Tags every Topic with the folder names below it. Returns the tag ids."""
+    wanted = {}
+    for entry in entries:
+        for name in entry.tags:
+            slug = slugify(name)[:100]
+            if slug:
+                wanted.setdefault(slug, name[:100])
+    if not wanted:
+        return set()
+    tags = dict(Tag.objects.filter(slug__in=wanted).values_list('slug', 'id'))
+    missing = [Tag(name=wanted[slug], slug=slug) for slug in wanted if slug not in tags]
+    if missing:
+        Tag.objects.bulk_create(missing, ignore_conflicts=True)
+        tags = dict(Tag.objects.filter(slug__in=wanted).values_list('slug', 'id'))
+
+    pairs = set()
+    for entry in entries:
+        topic = topics[entry.topic]
+        pairs.update((topic.pk, tags[slugify(name)[:100]]) for name in entry.tags
+                     if slugify(name)[:100] in tags)
+    content_type = ContentType.objects.get_for_model(Topic)
+    existing = set(TaggedItem.objects
+                   .filter(content_type=content_type,
+                           object_id__in={topic_id for topic_id, _ in pairs})
+                   .values_list('object_id', 'tag_id'))
+    TaggedItem.objects.bulk_create([
+        TaggedItem(content_type=content_type, object_id=topic_id, tag_id=tag_id)
+        for topic_id, tag_id in sorted(pairs - existing)])
+    return {tag_id for _, tag_id in pairs}
+
+
+def insert_items(job, topics, stored):
+    """Inserts the items and Resources for a chunk of stored entries."""
+    resources = []
+    titles = {}
+    with transaction.atomic():
+        for model in (File, Image):
+            rows = [s for s in stored if s.model is model]
+            if not rows:
+                continue
+            model.objects.bulk_create([
+                model(creator=job.creator, title=item_title(s.entry.path), file=s.name)
+                for s in rows])
+            # Stored names are unique (and indexed), so they identify the new rows
+            ids = dict(model.objects.filter(file__in=[s.name for s in rows])
+                       .order_by('id').values_list('file', 'id'))
+            resource_type = ContentType.objects.get_for_model(model)
+            resources.extend(Resource(topic=topics[s.entry.topic],
+                                      resource_type=resource_type,
+                                      object_id=ids[s.name])
+                             for s in rows)
+            titles[model] = {ids[s.name]: item_title(s.entry.path) for s in rows}
+        if resources:
+            first_slot = allocate_slots(job.module_id, len(resources))
+            for offset, resource in enumerate(resources):
+                resource.slot = first_slot + offset
+        Resource.objects.bulk_create(resources)
+        publish_added(topics, titles)
+    return len(resources)
+
+
+def publish_added(topics, titles):
+    """Live "added" events for the Resources just inserted, one per Topic."""
+    added = {}
+    for model, items in titles.items():
+        rows = (Resource.objects
+                .filter(topic_id__in=[topic.pk for topic in topics.values()],
+                        resource_type=ContentType.objects.get_for_model(model),
+                        object_id__in=items)
+                .order_by('id').values_list('id', 'topic_id', 'object_id'))
+        for pk, topic_id, object_id in rows:
+            added.setdefault(topic_id, []).append(
+                live.describe(pk, items[object_id], model))
+    for topic_id, resources in added.items():
+        live.publish_resources(topic_id, live.ADDED, resources)
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _store_or_error(source, entry):
+    try:
+        return store_entry(source, entry)
+    except Exception as e:
+        return e
+
+
+def run_import(job_id, report=None):
+    """
+    Background task: processes a pending ImportJob.
+    <report>, when given, is called with a message after every chunk.
+    """
+    # Claim the job, a second worker picking it up gets nothing
+    if not ImportJob.objects.filter(pk=job_id, status=ImportJob.PENDING) \
+            .update(status=ImportJob.RUNNING):
+        return
+    job = ImportJob.objects.select_related('module', 'creator').get(pk=job_id)
+    workers = getattr(settings, 'IMPORT_WORKERS', 4)
+    chunk_size = getattr(settings, 'IMPORT_CHUNK_SIZE', 50)
+    max_entries = getattr(settings, 'IMPORT_MAX_ENTRIES', 5000)
+    max_file_size = getattr(settings, 'IMPORT_MAX_FILE_SIZE', 100 * 1024 * 1024)
+    max_total_size = getattr(settings, 'IMPORT_MAX_TOTAL_SIZE', 2 * 1024 * 1024 * 1024)
+    errors = []
+    source = None
+    try:
+        source = open_source(job)
+        entries = [entry for entry in map(make_entry, source.paths()) if entry]
+        if len(entries) > max_entries:
+            raise ValueError(f'{len(entries)} files, at most {max_entries} '
+                             f'can be imported at once.')
+        # Sizes are checked up front, so a zip bomb stores nothing
+        entries, errors = check_sizes(source, entries, max_file_size, max_total_size)
+        ImportJob.objects.filter(pk=job.pk).update(total=len(entries))
+        topics = ensure_topics(job.module, entries)
+        for tag_id in tag_topics(topics, entries):
+            facets.refresh_tag(tag_id)
+
+        processed = created = 0
+        with ThreadPoolExecutor(max_workers=workers,
+                                thread_name_prefix='moodle-import') as pool:
+            for chunk in _chunks(entries, chunk_size):
+                results = list(pool.map(lambda e: _store_or_error(source, e), chunk))
+                stored = []
+                for entry, result in zip(chunk, results):
+                    if isinstance(result, Exception):
+                        errors.append(f'{entry.path}: {result}')
+                    else:
+                        stored.append(result)
+                try:
+                    inserted = insert_items(job, topics, stored)
+                except Exception:
+                    # Rows are gone, don't leave their files behind
+                    for s in stored:
+                        s.model._meta.get_field('file').storage.delete(s.name)
+                    raise
+                created += inserted
+                resources_added.send(sender=Resource, module_id=job.module_id,
+                                     count=inserted,
+                                     size=sum(s.size for s in stored))
+                processed += len(chunk)
+                ImportJob.objects.filter(pk=job.pk).update(
+                    processed=processed, created_resources=created,
+                    errors='\n'.join(errors))
+                invalidate_outline(job.module_id)
+                if report:
+                    report(f'{processed}/{len(entries)} file(s)')
+        status = ImportJob.DONE
+    except Exception as e:
+        logger.exception('Import #%s failed', job.pk)
+        errors.append(str(e) or e.__class__.__name__)
+        status = ImportJob.FAILED
+    finally:
+        if source is not None:
+            source.close()
+
+    ImportJob.objects.filter(pk=job.pk).update(
+        status=status, finished=timezone.now(), errors='\n'.join(errors))
+    invalidate_outline(job.module_id)
+    if job.archive:
+        # The uploaded archive is not needed once processed
+        job.archive.delete(save=False)
+        ImportJob.objects.filter(pk=job.pk).update(archive='')
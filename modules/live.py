@@ -0,0 +1,78 @@
+"""
+Live updates of topic pages.
+
+When Resources of a Topic are added, updated or removed, a "resource" event
+is published on the channel of that Topic once the transaction commits:
+
+    {"action": "added", "topic": 12,
+     "resources": [{"id": 34, "title": "Slides", "type": "file",
+                    "url": "/modules/resource/34/"}]}
+
+Students on the topic page follow it through the Server-Sent Events stream
+at LIVE_EVENTS_PREFIX + "topic/<id>/" (moodle/sse.py, routed in
+moodle/asgi.py) and load the body of new Resources from <url>. Removed
+Resources only carry their id.
+"""
+import json
+import re
+
+from django.conf import settings
+from django.db import transaction
+from django.urls import reverse
+
+from moodle.pubsub import publish
+from moodle.sse import format_event
+from .models import Module, Topic
+
+ADDED = 'added'
+UPDATED = 'updated'
+REMOVED = 'removed'
+
+
+def events_prefix():
+    return getattr(settings, 'LIVE_EVENTS_PREFIX', '/events/')
+
+
+def topic_events_pattern():
+    """Path regex of the Topic streams, routed by moodle/asgi.py."""
+    return rf'^{re.escape(events_prefix())}topic/(?P<topic_id>\d+)/$'
+
+
+def topic_channel(topic_id):
+    return f'topic.{topic_id}'
+
+
+def topic_events_url(topic_id):
+    return f'{events_prefix()}topic/{topic_id}/'
+
+
+def describe(resource_id, title, model):
+    """What a topic page needs to show a Resource before loading its body."""
+    return {'id': resource_id, 'title': title, 'type': model._meta.model_name,
+            'url': reverse('modules:resource_partial', args=[resource_id])}
+
+
+def publish_resources(topic_id, action, resources):
+    """Publishes a "resource" event for <topic_id> once the transaction commits."""
+    if not resources:
+        return
+    frame = format_event('resource', json.dumps(
+        {'action': action, 'topic': topic_id, 'resources': resources}))
+    transaction.on_commit(lambda: publish(topic_channel(topic_id), frame))
+
+
+def follow_topic(user, topic_id):
+    """
+    <resolve> callback of the stream (see moodle/sse.py): the channel of the
+    Topic for its instructor and its enrolled students, None for anyone else.
+    """
+    module = (Topic.objects.filter(id=topic_id, module__deleted__isnull=True)
+              .values('module_id', 'module__instructor_id').first())
+    if module is None:
+        return None
+    if module['module__instructor_id'] != user.pk and not (
+            Module.students.through.objects
+            .filter(module_id=module['module_id'], customuser_id=user.pk)
+            .exists()):
+        return None
+    return topic_channel(topic_id)
@@ -0,0 +1,45 @@
+import os
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from modules.importer import run_import
+from modules.models import ImportJob, Module
+
+
+class Command(BaseCommand):
+    help = ('Imports course material into a module from a directory (or zip '
+            'archive) on the server. Top-level folders become topics.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('module', help='Module code.')
+        parser.add_argument('path', help='Directory or zip archive to import.')
+        parser.add_argument('--user', help='Username owning the new items '
+                                           '(defaults to the module instructor).')
+
+    def handle(self, *args, **options):
+        path = os.path.abspath(options['path'])
+        if not os.path.exists(path):
+            raise CommandError(f'{path} does not exist.')
+        module = Module.objects.filter(code=options['module']).first()
+        if module is None:
+            raise CommandError(f"No module with code {options['module']}.")
+        if options['user']:
+            creator = get_user_model().objects.filter(username=options['user']).first()
+            if creator is None:
+                raise CommandError(f"No user {options['user']}.")
+        else:
+            creator = module.instructor
+            if creator is None:
+                raise CommandError('The module has no instructor, use --user.')
+
+        job = ImportJob.objects.create(module=module, creator=creator,
+                                       directory=path)
+        run_import(job.pk, report=self.stdout.write)
+        job.refresh_from_db()
+        for line in job.errors.splitlines():
+            self.stderr.write(line)
+        style = self.style.SUCCESS if job.status == ImportJob.DONE else self.style.ERROR
+        self.stdout.write(style(
+            f'Import #{job.pk} {job.status}: {job.created_resources} resource(s) '
+            f'created from {job.total} file(s).'))
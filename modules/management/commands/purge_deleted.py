@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from modules.models import Module, Topic
+from modules.purge import purge_module, purge_topic
+
+
+class Command(BaseCommand):
+    help = ('Purges soft-deleted Modules and Topics in batches. Picks up '
+            'purges interrupted by a restart.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        module_ids = list(Module.all_objects.filter(deleted__isnull=False)
+                          .values_list('id', flat=True))
+        for module_id in module_ids:
+            purge_module(module_id, batch_size,
+                         report=lambda msg, pk=module_id: self.stdout.write(
+                             f'Module {pk}: {msg}'))
+        topic_ids = list(Topic.all_objects.filter(deleted__isnull=False)
+                         .values_list('id', flat=True))
+        for topic_id in topic_ids:
+            count = purge_topic(topic_id, batch_size)
+            self.stdout.write(f'Topic {topic_id}: {count} resource(s) removed')
+        self.stdout.write(self.style.SUCCESS(
+            f'Purged {len(module_ids)} module(s) and {len(topic_ids)} topic(s).'))
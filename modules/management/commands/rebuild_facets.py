@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from modules.facets import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the catalog facet counts from scratch.'
+
+    def handle(self, *args, **options):
+        count = rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Stored {count} facet value(s).'))
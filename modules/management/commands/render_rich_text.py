@@ -0,0 +1,22 @@
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+
+from modules.models import Module, Topic
+from modules.outline import OUTLINE_CACHE_KEY
+from modules.richtext import rerender
+
+
+class Command(BaseCommand):
+    help = ('Renders the stored HTML of Module overviews and Topic descriptions '
+            'again, e.g. after the sanitizer allow-list changed.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        count = rerender(Module, Topic, batch_size=options['batch_size'])
+        if count:
+            # Cached outlines hold the Modules with their old overview
+            cache.delete_many([OUTLINE_CACHE_KEY.format(pk) for pk in
+                               Module.all_objects.values_list('pk', flat=True)])
+        self.stdout.write(self.style.SUCCESS(f'Rendered {count} row(s).'))
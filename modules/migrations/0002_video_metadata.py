@@ -0,0 +1,48 @@
+# Generated by Django 3.1.14 on 2026-10-19 19:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('modules', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='video',
+            name='duration',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='video',
+            name='embed_url',
+            field=models.URLField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='video',
+            name='metadata_fetched',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='video',
+            name='provider',
+            field=models.CharField(blank=True, max_length=20),
+        ),
+        migrations.AddField(
+            model_name='video',
+            name='provider_title',
+            field=models.CharField(blank=True, max_length=250),
+        ),
+        migrations.AddField(
+            model_name='video',
+            name='thumbnail_url',
+            field=models.URLField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='video',
+            name='video_id',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+    ]
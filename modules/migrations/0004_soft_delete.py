@@ -0,0 +1,23 @@
+# Generated by Django 3.1.14 on 2026-10-19 19:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('modules', '0003_sharded_uploads'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='module',
+            name='deleted',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='topic',
+            name='deleted',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 3.1.14 on 2026-10-19 19:25
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def populate_facets(apps, schema_editor):
+    # Same computation as modules.facets.rebuild(), with historical models
+    Module = apps.get_model('modules', 'Module')
+    FacetCount = apps.get_model('modules', 'FacetCount')
+    levels = dict(Module._meta.get_field('level').choices)
+    modules = Module.objects.filter(deleted__isnull=True)
+    rows = [FacetCount(facet='level', value=row['level'],
+                       label=levels.get(row['level'], row['level']),
+                       count=row['n'])
+            for row in modules.values('level').order_by()
+                       .annotate(n=Count('id'))]
+    instructors = (modules.filter(instructor__isnull=False)
+                   .values('instructor_id', 'instructor__first_name',
+                           'instructor__last_name', 'instructor__username')
+                   .order_by().annotate(n=Count('id')))
+    for row in instructors:
+        name = f"{row['instructor__first_name']} {row['instructor__last_name']}".strip()
+        rows.append(FacetCount(facet='instructor', value=str(row['instructor_id']),
+                               label=name or row['instructor__username'],
+                               count=row['n']))
+    # Tags are attached to Topics through taggit's generic TaggedItem
+    ContentType = apps.get_model('contenttypes', 'ContentType')
+    TaggedItem = apps.get_model('taggit', 'TaggedItem')
+    Topic = apps.get_model('modules', 'Topic')
+    topic_type = ContentType.objects.filter(app_label='modules', model='topic').first()
+    topic_modules = dict(Topic.objects.filter(deleted__isnull=True,
+                                              module__deleted__isnull=True)
+                         .values_list('id', 'module_id'))
+    tagged = (TaggedItem.objects.filter(content_type=topic_type)
+              .values_list('object_id', 'tag__slug', 'tag__name'))
+    tag_modules = {}
+    for topic_id, slug, name in tagged:
+        if topic_id in topic_modules:
+            tag_modules.setdefault((slug, name), set()).add(topic_modules[topic_id])
+    rows += [FacetCount(facet='tag', value=slug, label=name, count=len(ids))
+             for (slug, name), ids in tag_modules.items()]
+    FacetCount.objects.bulk_create(rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('modules', '0004_soft_delete'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='module',
+            name='level',
+            field=models.CharField(choices=[('U', 'Undergraduate'), ('PG', 'Postraduate'), ('P', 'PhD'), ('PT', 'Part-Time')], db_index=True, default='U', max_length=2),
+        ),
+        migrations.CreateModel(
+            name='FacetCount',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('facet', models.CharField(choices=[('level', 'Level'), ('instructor', 'Instructor'), ('tag', 'Tag')], max_length=20)),
+                ('value', models.CharField(max_length=100)),
+                ('label', models.CharField(max_length=200)),
+                ('count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['facet', 'label'],
+                'unique_together': {('facet', 'value')},
+            },
+        ),
+        migrations.RunPython(populate_facets, migrations.RunPython.noop),
+    ]
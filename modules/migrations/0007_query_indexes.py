@@ -0,0 +1,32 @@
+# Generated by Django 3.1.14 on 2026-10-19 19:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('modules', '0006_import_jobs'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='module',
+            index=models.Index(fields=['instructor', 'created'], name='module_instructor_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='resource',
+            index=models.Index(fields=['topic', 'resource_type', 'object_id'], name='resource_topic_item_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='topic',
+            index=models.Index(fields=['module', 'created'], name='topic_module_created_idx'),
+        ),
+        # Auto-created through table, no Meta to declare it on: covers the
+        # "modules a student is enrolled in" lookups (students__in)
+        migrations.RunSQL(
+            'CREATE INDEX module_students_student_idx '
+            'ON modules_module_students (customuser_id, module_id)',
+            'DROP INDEX module_students_student_idx',
+        ),
+    ]
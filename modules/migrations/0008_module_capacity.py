@@ -0,0 +1,34 @@
+# Generated by Django 3.1.14 on 2026-10-19 19:33
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def count_seats(apps, schema_editor):
+    Module = apps.get_model('modules', 'Module')
+    Enrollment = Module.students.through
+    counts = (Enrollment.objects.values('module_id').order_by()
+              .annotate(n=Count('id')))
+    for row in counts:
+        Module.objects.filter(pk=row['module_id']).update(seats_taken=row['n'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('modules', '0007_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='module',
+            name='capacity',
+            field=models.PositiveIntegerField(blank=True, help_text='Leave empty for unlimited seats.', null=True),
+        ),
+        migrations.AddField(
+            model_name='module',
+            name='seats_taken',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(count_seats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 3.1.14 on 2026-10-19 19:57
+
+from django.db import migrations, models
+
+
+def number_resources(apps, schema_editor):
+    """Existing Resources take the first slots of their Module, in creation order."""
+    Module = apps.get_model('modules', 'Module')
+    Resource = apps.get_model('modules', 'Resource')
+    slots = {}
+    batch = []
+    rows = Resource.objects.order_by('id').values_list('id', 'topic__module_id')
+    for pk, module_id in rows.iterator():
+        slot = slots.get(module_id, 0)
+        slots[module_id] = slot + 1
+        batch.append(Resource(pk=pk, slot=slot))
+        if len(batch) >= 500:
+            Resource.objects.bulk_update(batch, ['slot'])
+            batch = []
+    Resource.objects.bulk_update(batch, ['slot'])
+    for module_id, count in slots.items():
+        Module.objects.filter(pk=module_id).update(resource_slots=count)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('modules', '0009_rich_text'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='module',
+            name='resource_slots',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='resource',
+            name='slot',
+            field=models.PositiveIntegerField(editable=False, null=True),
+        ),
+        migrations.RunPython(number_resources, migrations.RunPython.noop),
+    ]
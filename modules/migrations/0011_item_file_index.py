@@ -0,0 +1,24 @@
+# Generated by Django 3.1.14 on 2026-10-19 20:08
+
+from django.db import migrations, models
+import moodle.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('modules', '0010_resource_slots'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='file',
+            name='file',
+            field=models.FileField(db_index=True, upload_to=moodle.storage.ShardedUploadTo('files')),
+        ),
+        migrations.AlterField(
+            model_name='image',
+            name='file',
+            field=models.FileField(db_index=True, upload_to=moodle.storage.ShardedUploadTo('images')),
+        ),
+    ]
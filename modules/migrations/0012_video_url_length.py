@@ -0,0 +1,23 @@
+# Generated by Django 3.1.14 on 2026-10-19 20:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('modules', '0011_item_file_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='video',
+            name='embed_url',
+            field=models.URLField(blank=True, max_length=2048),
+        ),
+        migrations.AlterField(
+            model_name='video',
+            name='thumbnail_url',
+            field=models.URLField(blank=True, max_length=2048),
+        ),
+    ]
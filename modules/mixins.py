@@ -10,7 +10,7 @@ class InstructorEditMixin(UserPassesTestMixin):
     Reusable logic for Instructor actions over Modules.
     """
     model = Module
-    fields = ['title', 'code', 'level', 'overview']
+    fields = ['title', 'code', 'level', 'capacity', 'overview']
     template_name = 'manage/module/form.html'
     context_object_name = 'module'
 
@@ -3,7 +3,8 @@ from os import path
 from django.conf import settings
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.contenttypes.fields import GenericForeignKey
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
 from django.template.loader import render_to_string
 from django.urls import reverse
 
@@ -12,6 +13,22 @@ from tinymce import models as tinymce_models
 
 from autoslug import AutoSlugField
 
+from moodle.storage import ShardedUploadTo
+from moodle.tasks import enqueue_on_commit
+from .oembed import MAX_URL_LENGTH, fetch_video_metadata, parse_video_url
+from .richtext import render_description, render_overview
+
+
+class ActiveManager(models.Manager):
+    """
+        Default manager hiding soft-deleted rows.
+        Soft-deleted rows are purged in the background (see modules/purge.py),
+        use <all_objects> to reach them.
+    """
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted__isnull=True)
+
 
 class Module(models.Model):
     """
@@ -35,12 +52,34 @@ class Module(models.Model):
                                       blank=True)
     title = models.CharField(max_length=200, unique=True)
     slug = AutoSlugField(populate_from='title')
-    level = models.CharField(max_length=2, choices=LEVEL_CHOICES, default='U')
+    level = models.CharField(max_length=2, choices=LEVEL_CHOICES, default='U',
+                             db_index=True)
     created = models.DateTimeField(auto_now_add=True)
     overview = models.TextField()
+    # <overview> rendered to HTML on save (see modules/richtext.py)
+    overview_html = models.TextField(blank=True, default='', editable=False)
+    # Seats: <capacity> None means unlimited. <seats_taken> is only changed
+    # with conditional UPDATEs (see students/enrollment.py)
+    capacity = models.PositiveIntegerField(null=True, blank=True,
+                                           help_text='Leave empty for unlimited seats.')
+    seats_taken = models.PositiveIntegerField(default=0, editable=False)
+    # Completion slots handed out to the Module's Resources so far (see
+    # <allocate_slots>), only changed with UPDATEs too
+    resource_slots = models.PositiveIntegerField(default=0, editable=False)
+    deleted = models.DateTimeField(null=True, blank=True, editable=False)
+
+    objects = ActiveManager()
+    all_objects = models.Manager()
+
+    COUNTER_FIELDS = ('seats_taken', 'resource_slots')
 
     class Meta:
         ordering = ['-created']
+        indexes = [
+            # Instructor dashboard: a teacher's modules, newest first
+            models.Index(fields=['instructor', 'created'],
+                         name='module_instructor_created_idx'),
+        ]
 
     def __str__(self):
         return self.title
@@ -49,6 +88,25 @@ class Module(models.Model):
         return reverse('modules:detail',
                        kwargs={'slug': self.slug})
 
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        # Never write back stale counters, enrollments and uploads run concurrently
+        if not self._state.adding and update_fields is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.COUNTER_FIELDS]
+        if update_fields is None or 'overview' in update_fields:
+            self.overview_html = render_overview(self.overview)
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'overview_html'}
+        super().save(*args, **kwargs)
+
+    @property
+    def seats_left(self):
+        if self.capacity is None:
+            return None
+        return max(0, self.capacity - self.seats_taken)
+
 
 class Topic(models.Model):
     """
@@ -63,10 +121,108 @@ class Topic(models.Model):
     created = models.DateTimeField(auto_now_add=True)
     updated = models.DateTimeField(auto_now=True)
     description = tinymce_models.HTMLField()
+    # Sanitized <description>, rendered on save (see modules/richtext.py)
+    description_html = models.TextField(blank=True, default='', editable=False)
+    deleted = models.DateTimeField(null=True, blank=True, editable=False)
+
+    objects = ActiveManager()
+    all_objects = models.Manager()
+
+    class Meta:
+        indexes = [
+            # Module outline: a module's topics in creation order
+            models.Index(fields=['module', 'created'],
+                         name='topic_module_created_idx'),
+        ]
 
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'description' in update_fields:
+            self.description_html = render_description(self.description)
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'description_html'}
+        super().save(*args, **kwargs)
+
+
+class FacetCount(models.Model):
+    """
+        Precomputed number of Modules per catalog facet value.
+        Kept up to date from signals (see modules/facets.py) so the catalog
+        never runs GROUP BY queries.
+    """
+    LEVEL = 'level'
+    INSTRUCTOR = 'instructor'
+    TAG = 'tag'
+
+    FACET_CHOICES = [
+        (LEVEL, 'Level'),
+        (INSTRUCTOR, 'Instructor'),
+        (TAG, 'Tag'),
+    ]
+
+    facet = models.CharField(max_length=20, choices=FACET_CHOICES)
+    value = models.CharField(max_length=100)
+    label = models.CharField(max_length=200)
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('facet', 'value')
+        ordering = ['facet', 'label']
+
+    def __str__(self):
+        return f'{self.facet}={self.value} ({self.count})'
+
+
+class ImportJob(models.Model):
+    """
+        A bulk import of course material into a Module, from an uploaded zip
+        archive or (for admins) a directory on the server.
+        Processed in the background by modules/importer.py.
+    """
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    module = models.ForeignKey(Module,
+                               related_name='import_jobs',
+                               on_delete=models.CASCADE)
+    creator = models.ForeignKey(settings.AUTH_USER_MODEL,
+                                related_name='import_jobs',
+                                on_delete=models.CASCADE)
+    archive = models.FileField(upload_to='imports/', blank=True)
+    directory = models.CharField(max_length=500, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES,
+                              default=PENDING)
+    total = models.PositiveIntegerField(default=0)
+    processed = models.PositiveIntegerField(default=0)
+    created_resources = models.PositiveIntegerField(default=0)
+    errors = models.TextField(blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    finished = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created']
+
+    def __str__(self):
+        return f'Import #{self.pk} into {self.module_id} ({self.status})'
+
+    @property
+    def percent(self):
+        if not self.total:
+            return 100 if self.status == self.DONE else 0
+        return int(self.processed * 100 / self.total)
+
 
 # Content
 class Resource(models.Model):
@@ -87,6 +243,35 @@ class Resource(models.Model):
     # A field related to both previous fields combined
     item = GenericForeignKey('resource_type', 'object_id')
 
+    # Position of the Resource in the completion bitmaps of its Module
+    # (see students/progress.py), unique within the Module
+    slot = models.PositiveIntegerField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            # Topic pages and purges resolve items per type from the topic
+            models.Index(fields=['topic', 'resource_type', 'object_id'],
+                         name='resource_topic_item_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self.slot is None:
+            self.slot = allocate_slots(self.topic.module_id)
+        super().save(*args, **kwargs)
+
+
+def allocate_slots(module_id, count=1):
+    """
+    Reserves <count> completion slots in the Module and returns the first one.
+    Slots are never reused: a removed Resource's slot stays empty.
+    """
+    with transaction.atomic():
+        Module.all_objects.filter(pk=module_id).update(
+            resource_slots=F('resource_slots') + count)
+        end = (Module.all_objects.filter(pk=module_id)
+               .values_list('resource_slots', flat=True).get())
+    return end - count
+
 
 ### File Type Abstract Base Model ###
 
@@ -110,12 +295,23 @@ class ItemBase(models.Model):
     def __str__(self):
         return self.title
 
-    def render(self):
+    @property
+    def file_size(self):
+        """Size in bytes of the uploaded file, 0 for items without one."""
+        file = getattr(self, 'file', None)
+        if not file:
+            return 0
+        try:
+            return file.size
+        except OSError:
+            return 0
+
+    def render(self, resource=None):
         """Renders a template and returns rendered content as a string."""
         return render_to_string(
             # Generates the template name dynamically (file/video)
             f'module/content/{self._meta.model_name}.html',
-            {'item': self}
+            {'item': self, 'resource': resource}
         )
 
 
@@ -126,13 +322,60 @@ class Text(ItemBase):
 
 
 class File(ItemBase):
-    file = models.FileField(upload_to='files')
+    # Indexed: bulk imports find their new rows by stored name
+    file = models.FileField(upload_to=ShardedUploadTo('files'), db_index=True)
 
 
 class Image(ItemBase):
-    file = models.FileField(upload_to='images')
+    file = models.FileField(upload_to=ShardedUploadTo('images'), db_index=True)
 
 
 class Video(ItemBase):
     # Embedded videos (i.e. YouTube)
     url = models.URLField()
+
+    # Metadata resolved once per URL (see modules/oembed.py)
+    provider = models.CharField(max_length=20, blank=True)
+    video_id = models.CharField(max_length=64, blank=True)
+    embed_url = models.URLField(max_length=MAX_URL_LENGTH, blank=True)
+    thumbnail_url = models.URLField(max_length=MAX_URL_LENGTH, blank=True)
+    provider_title = models.CharField(max_length=250, blank=True)
+    duration = models.PositiveIntegerField(null=True, blank=True)  # Seconds
+    metadata_fetched = models.DateTimeField(null=True, blank=True)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored URL to detect changes on save
+        instance._loaded_url = instance.__dict__.get('url')
+        return instance
+
+    def save(self, *args, **kwargs):
+        """
+        Parses the URL (no network) and schedules the remote metadata fetch
+        whenever the URL is new or has changed.
+        """
+        url_changed = self.url != getattr(self, '_loaded_url', None)
+        if url_changed:
+            parsed = parse_video_url(self.url)
+            self.provider = parsed.get('provider', '')
+            self.video_id = parsed.get('video_id', '')
+            self.embed_url = parsed.get('embed_url', '')
+            self.thumbnail_url = ''
+            self.provider_title = ''
+            self.duration = None
+            self.metadata_fetched = None
+        super().save(*args, **kwargs)
+        self._loaded_url = self.url
+        if url_changed and self.provider:
+            enqueue_on_commit(fetch_video_metadata, self.id)
+
+    @property
+    def duration_display(self):
+        if self.duration is None:
+            return ''
+        minutes, seconds = divmod(self.duration, 60)
+        hours, minutes = divmod(minutes, 60)
+        if hours:
+            return f'{hours}:{minutes:02d}:{seconds:02d}'
+        return f'{minutes}:{seconds:02d}'
@@ -0,0 +1,127 @@
+"""
+Video metadata resolution for <Video> resources.
+
+The provider and video id are parsed from the URL when a Video is saved
+(regex only, no network). Title, thumbnail and duration come from the
+provider's oEmbed endpoint and are fetched in the background, so rendering a
+topic page never waits on YouTube/Vimeo.
+
+The HTTP client is pluggable through VIDEO_METADATA_HTTP_CLIENT, e.g.
+'modules.oembed.OfflineClient' to work without network access.
+"""
+import json
+import logging
+import re
+from urllib.parse import urlencode
+from urllib.request import Request, urlopen
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from embed_video.backends import EmbedVideoException, detect_backend
+
+logger = logging.getLogger(__name__)
+
+# oEmbed endpoints per provider (name derived from the embed_video backend)
+OEMBED_ENDPOINTS = {
+    'youtube': 'https://www.youtube.com/oembed',
+    'vimeo': 'https://vimeo.com/api/oembed.json',
+    'soundcloud': 'https://soundcloud.com/oembed',
+}
+
+# Providers whose video id/embed URL can be derived from the URL alone
+PARSEABLE_PROVIDERS = ('youtube', 'vimeo')
+
+IFRAME_SRC_RE = re.compile(r'src="([^"]+)"')
+
+# Length of the stored URL columns: signed CDN thumbnail URLs run long
+MAX_URL_LENGTH = 2048
+
+
+class UrllibClient:
+    """Default HTTP client, uses the standard library only."""
+    timeout = 5
+
+    def get_json(self, url, params=None):
+        if params:
+            url = f'{url}?{urlencode(params)}'
+        request = Request(url, headers={'User-Agent': 'moodle-oembed/1.0'})
+        with urlopen(request, timeout=self.timeout) as response:
+            return json.loads(response.read().decode('utf-8'))
+
+
+class OfflineClient:
+    """Stand-in client for local development: never touches the network."""
+
+    def get_json(self, url, params=None):
+        return {}
+
+
+def get_http_client():
+    path = getattr(settings, 'VIDEO_METADATA_HTTP_CLIENT',
+                   'modules.oembed.UrllibClient')
+    return import_string(path)()
+
+
+def parse_video_url(url):
+    """
+    Returns the metadata that can be worked out from the URL itself:
+    provider, video_id and embed_url. Unknown URLs give an empty dict.
+    """
+    try:
+        backend = detect_backend(url)
+    except EmbedVideoException:
+        return {}
+    provider = type(backend).__name__.replace('Backend', '').lower()
+    data = {'provider': provider, 'video_id': '', 'embed_url': ''}
+    if provider in PARSEABLE_PROVIDERS:
+        try:
+            data['video_id'] = backend.code
+            data['embed_url'] = backend.url
+        except EmbedVideoException:
+            pass
+    return data
+
+
+def fetch_oembed(provider, url, client=None):
+    """Asks the provider's oEmbed endpoint for title, thumbnail and duration."""
+    endpoint = OEMBED_ENDPOINTS.get(provider)
+    if endpoint is None:
+        return {}
+    client = client or get_http_client()
+    payload = client.get_json(endpoint, {'url': url, 'format': 'json'}) or {}
+
+    data = {}
+    if payload.get('title'):
+        data['provider_title'] = payload['title'][:250]
+    if payload.get('thumbnail_url') and len(payload['thumbnail_url']) <= MAX_URL_LENGTH:
+        data['thumbnail_url'] = payload['thumbnail_url']
+    if payload.get('duration'):
+        data['duration'] = int(payload['duration'])
+    # Providers without a URL pattern (SoundCloud) only expose the player in <html>
+    match = IFRAME_SRC_RE.search(payload.get('html', ''))
+    if match and len(match.group(1)) <= MAX_URL_LENGTH:
+        data['embed_url'] = match.group(1).replace('&amp;', '&')
+    return data
+
+
+def fetch_video_metadata(video_id, client=None):
+    """
+    Background task: resolves the remote metadata of a Video and stores it.
+    Uses <update()> so the model's save() logic is not triggered again.
+    """
+    from .models import Video
+
+    video = Video.objects.filter(id=video_id).only('url', 'provider').first()
+    if video is None or not video.provider:
+        return
+    try:
+        data = fetch_oembed(video.provider, video.url, client=client)
+    except Exception:
+        logger.warning('Could not fetch metadata for video %s', video_id,
+                       exc_info=True)
+        return
+    data['metadata_fetched'] = timezone.now()
+    # Only write if the URL did not change while we were fetching
+    Video.objects.filter(id=video_id, url=video.url).update(**data)
@@ -0,0 +1,80 @@
+"""
+Cached Module outline: the Module with its instructor and the ordered list of
+its Topics annotated with their resource counts. Topics carry their sanitized
+<description_html>, shown by the player; the raw source is left out.
+
+Both the public Module page and the student player render this outline on
+every request, so it is built with two queries and then served from the cache
+until a Module, Topic or Resource of that Module, or its instructor, changes
+(see modules/signals.py).
+
+Topic pages list their Resources from <load_resources>, which leaves out the
+heavy item columns; each item's body is then rendered on demand by the
+resource partial endpoint (see ResourcePartialView).
+"""
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.db.models import Count
+
+from .models import Module, Resource
+
+OUTLINE_CACHE_KEY = 'modules:outline:{}'
+OUTLINE_CACHE_TIMEOUT = 60 * 60
+
+# Item columns only needed to render the item body
+DEFERRED_ITEM_FIELDS = {'text': ('content',)}
+
+
+def build_outline(module_id):
+    module = (Module.objects.select_related('instructor')
+              .filter(pk=module_id).first())
+    if module is None:
+        return None
+    topics = list(module.topics
+                  .annotate(resource_count=Count('resources'))
+                  .order_by('created', 'id')
+                  .defer('description'))
+    return {'module': module, 'topics': topics}
+
+
+def get_outline(module_id):
+    """Returns {'module', 'topics'} for <module_id> or None if it doesn't exist."""
+    key = OUTLINE_CACHE_KEY.format(module_id)
+    outline = cache.get(key)
+    if outline is None:
+        outline = build_outline(module_id)
+        if outline is not None:
+            cache.set(key, outline, OUTLINE_CACHE_TIMEOUT)
+    return outline
+
+
+def invalidate_outline(module_id):
+    cache.delete(OUTLINE_CACHE_KEY.format(module_id))
+
+
+def load_resources(topic_id):
+    """
+    Resources of a Topic, in order, with their <item> attached.
+    One query for the Resources plus one per item type; Text bodies are
+    deferred.
+    """
+    resources = list(Resource.objects.filter(topic_id=topic_id).order_by('id'))
+    ids_by_type = {}
+    for resource in resources:
+        ids_by_type.setdefault(resource.resource_type_id, []).append(resource.object_id)
+
+    items = {}
+    for type_id, object_ids in ids_by_type.items():
+        model = ContentType.objects.get_for_id(type_id).model_class()
+        deferred = DEFERRED_ITEM_FIELDS.get(model._meta.model_name, ())
+        for item in model.objects.filter(id__in=object_ids).defer(*deferred):
+            items[type_id, item.id] = item
+
+    loaded = []
+    for resource in resources:
+        item = items.get((resource.resource_type_id, resource.object_id))
+        if item is not None:
+            # Fills the GenericForeignKey cache, <resource.item> runs no query
+            resource.item = item
+            loaded.append(resource)
+    return loaded
@@ -0,0 +1,181 @@
+"""
+Soft deletion and batched purging of Modules and Topics.
+
+Deleting a large Module in one go makes Django's collector load every Topic,
+Resource and enrollment row into memory and holds one long write transaction.
+Instead, the Module (or Topic) is only flagged as deleted, which hides it
+immediately through <ActiveManager>, and a background task removes its content
+in small batches, each in its own short transaction.
+"""
+import logging
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from taggit.models import TaggedItem
+
+from moodle.tasks import enqueue_on_commit
+from notifications.services import forget_unread_counts
+from .models import Module, Resource, Topic
+from . import facets
+from .outline import invalidate_outline
+from .search import module_removed
+from .signals import resources_hidden, resources_removed
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_CACHE_KEY = 'purge:module:{}'
+
+
+def _batch_size():
+    return getattr(settings, 'PURGE_BATCH_SIZE', 200)
+
+
+def soft_delete_module(module):
+    """Hides <module> right away and schedules its purge."""
+    Module.all_objects.filter(pk=module.pk).update(deleted=timezone.now())
+    invalidate_outline(module.pk)
+    module_id = module.pk
+    transaction.on_commit(lambda: module_removed(module_id))
+    facets.refresh_module(module)
+    enqueue_on_commit(purge_module, module.pk)
+
+
+def soft_delete_topics(topics):
+    """Hides <topics> right away and schedules their purge."""
+    ids = [topic.pk for topic in topics]
+    if not ids:
+        return
+    Topic.all_objects.filter(pk__in=ids).update(deleted=timezone.now())
+    hidden = {}
+    for module_id, slot in (Resource.objects.filter(topic_id__in=ids)
+                            .values_list('topic__module_id', 'slot')):
+        hidden.setdefault(module_id, []).append(slot)
+    for module_id, slots in hidden.items():
+        resources_hidden.send(sender=Resource, module_id=module_id, count=len(slots),
+                              slots=[slot for slot in slots if slot is not None])
+    for module_id in {topic.module_id for topic in topics}:
+        invalidate_outline(module_id)
+    for tag_id in facets.topic_tag_ids(ids):
+        facets.refresh_tag(tag_id)
+    for topic_id in ids:
+        enqueue_on_commit(purge_topic, topic_id)
+
+
+def get_purge_progress(module_id):
+    """
+    Progress of a module purge, or None before it starts. Kept for an hour
+    once the purge is done, with <status> 'done'.
+    """
+    return cache.get(PROGRESS_CACHE_KEY.format(module_id))
+
+
+def purge_resources(topic_id, batch_size=None):
+    """
+    Deletes the Resources of a Topic together with their items and files.
+    Returns the number of resources deleted.
+    """
+    batch_size = batch_size or _batch_size()
+    module_id = (Topic.all_objects.filter(pk=topic_id)
+                 .values_list('module_id', flat=True).first())
+    deleted = 0
+    while True:
+        batch = list(Resource.objects.filter(topic_id=topic_id)
+                     .values_list('id', 'resource_type_id', 'object_id', 'slot')
+                     [:batch_size])
+        if not batch:
+            return deleted
+        ids_by_type = {}
+        for _, type_id, object_id, _ in batch:
+            ids_by_type.setdefault(type_id, []).append(object_id)
+
+        files = []
+        with transaction.atomic():
+            for type_id, object_ids in ids_by_type.items():
+                model = ContentType.objects.get_for_id(type_id).model_class()
+                items = model.objects.filter(id__in=object_ids)
+                if any(f.name == 'file' for f in model._meta.fields):
+                    storage = model._meta.get_field('file').storage
+                    files.extend((storage, name) for name in
+                                 items.values_list('file', flat=True) if name)
+                items.delete()
+            resource_ids = [pk for pk, _, _, _ in batch]
+            forget_unread_counts(resource_ids)
+            Resource.objects.filter(id__in=resource_ids).delete()
+        # Files go only once the rows are gone for good
+        size = 0
+        for storage, name in files:
+            try:
+                size += storage.size(name)
+            except OSError:
+                pass
+            storage.delete(name)
+        resources_removed.send(sender=Resource, module_id=module_id,
+                               count=len(batch), size=size, hidden=True,
+                               slots=[slot for _, _, _, slot in batch if slot is not None])
+        deleted += len(batch)
+
+
+def purge_topic(topic_id, batch_size=None):
+    """Background task: removes a soft-deleted Topic and everything under it."""
+    if not Topic.all_objects.filter(pk=topic_id, deleted__isnull=False).exists():
+        return 0
+    resources = purge_resources(topic_id, batch_size)
+    with transaction.atomic():
+        TaggedItem.objects.filter(
+            content_type=ContentType.objects.get_for_model(Topic),
+            object_id=topic_id).delete()
+        Topic.all_objects.filter(pk=topic_id).delete()
+    return resources
+
+
+def purge_module(module_id, batch_size=None, report=None):
+    """
+    Background task: removes a soft-deleted Module in bounded batches.
+    Progress is kept in the cache (see <get_purge_progress>) and passed to the
+    optional <report> callable.
+    """
+    batch_size = batch_size or _batch_size()
+    module = (Module.all_objects.filter(pk=module_id, deleted__isnull=False)
+              .values('pk', 'instructor_id').first())
+    if module is None:
+        return
+    key = PROGRESS_CACHE_KEY.format(module_id)
+    topic_ids = list(Topic.all_objects.filter(module_id=module_id)
+                     .values_list('id', flat=True))
+    # <instructor_id>: who may read the progress once the Module row is gone
+    # (None when the instructor's account was deleted: nobody)
+    progress = {'status': 'running', 'instructor_id': module['instructor_id'],
+                'topics_total': len(topic_ids), 'topics_done': 0,
+                'resources': 0, 'enrollments': 0}
+
+    def update(message):
+        cache.set(key, progress, 60 * 60)
+        logger.info('Purging module %s: %s', module_id, message)
+        if report:
+            report(message)
+
+    update('started')
+    for topic_id in topic_ids:
+        # Flag the topic so purge_topic accepts it
+        Topic.all_objects.filter(pk=topic_id).update(deleted=timezone.now())
+        progress['resources'] += purge_topic(topic_id, batch_size)
+        progress['topics_done'] += 1
+        update(f"topic {progress['topics_done']}/{progress['topics_total']}")
+
+    Enrollment = Module.students.through
+    while True:
+        ids = list(Enrollment.objects.filter(module_id=module_id)
+                   .values_list('id', flat=True)[:batch_size])
+        if not ids:
+            break
+        Enrollment.objects.filter(id__in=ids).delete()
+        progress['enrollments'] += len(ids)
+    update(f"{progress['enrollments']} enrollment(s) removed")
+
+    Module.all_objects.filter(pk=module_id).delete()
+    progress['status'] = 'done'
+    update('done')
@@ -0,0 +1,197 @@
+"""
+Rich text rendered once, at save time.
+
+Instructors write Topic descriptions with TinyMCE and Module overviews as
+plain text. Both are turned into their final HTML when saved and stored next
+to the source (<Topic.description_html>, <Module.overview_html>), so pages
+only output a stored string:
+  - descriptions go through <sanitize>, an allow-list of tags and attributes:
+    everything else is dropped (the content of script-like elements too),
+    links and images must point to http(s), mailto or relative URLs, and the
+    markup is re-serialized with every tag balanced,
+  - overviews are escaped and get the <linebreaks> paragraphs.
+
+Rows saved before the companion columns existed were rendered by migration
+0009, with its own frozen copy of these rules. When the rules change, stored
+HTML is brought up to date by <rerender> (the render_rich_text command).
+"""
+import re
+from html.parser import HTMLParser
+from urllib.parse import urlsplit
+
+from django.utils.html import escape, linebreaks
+
+# Allowed tags and, for each of them, the allowed attributes
+ALLOWED_TAGS = {
+    'a': {'href', 'title'},
+    'abbr': {'title'},
+    'b': set(),
+    'blockquote': set(),
+    'br': set(),
+    'code': set(),
+    'del': set(),
+    'em': set(),
+    'h2': set(), 'h3': set(), 'h4': set(), 'h5': set(), 'h6': set(),
+    'hr': set(),
+    'i': set(),
+    'img': {'src', 'alt', 'title', 'width', 'height'},
+    'li': set(),
+    'ol': {'start'},
+    'p': set(),
+    'pre': set(),
+    's': set(),
+    'span': set(),
+    'strong': set(),
+    'sub': set(),
+    'sup': set(),
+    'table': set(),
+    'tbody': set(),
+    'td': {'colspan', 'rowspan'},
+    'tfoot': set(),
+    'th': {'colspan', 'rowspan'},
+    'thead': set(),
+    'tr': set(),
+    'u': set(),
+    'ul': set(),
+}
+
+VOID_TAGS = {'br', 'hr', 'img'}
+
+# Open tags closed by the start of another tag ("<li>a<li>b")
+IMPLIED_END_TAGS = {
+    'li': {'li'},
+    'p': {'p'},
+    'tr': {'tr', 'td', 'th'},
+    'td': {'td', 'th'},
+    'th': {'td', 'th'},
+}
+
+# Dropped along with everything they contain
+DROPPED_TAGS = {'script', 'style', 'iframe', 'object', 'embed', 'template',
+                'noscript', 'textarea', 'select', 'svg', 'math', 'title', 'head'}
+
+URL_ATTRIBUTES = {'href', 'src'}
+URL_SCHEMES = {'', 'http', 'https', 'mailto'}
+NUMBER_ATTRIBUTES = {'colspan', 'rowspan', 'start', 'width', 'height'}
+
+# Browsers ignore these inside a URL scheme ("java\tscript:")
+URL_IGNORED = re.compile(r'[\x00-\x20\x7f]+')
+
+
+def _safe_url(value):
+    url = URL_IGNORED.sub('', value)
+    try:
+        scheme = urlsplit(url).scheme.lower()
+    except ValueError:
+        return False
+    return scheme in URL_SCHEMES
+
+
+class Sanitizer(HTMLParser):
+    """Re-serializes HTML keeping only the allow-listed markup."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.output = []
+        self.open_tags = []
+        self.dropped = []
+
+    def handle_starttag(self, tag, attrs):
+        if self.dropped or tag in DROPPED_TAGS:
+            if tag in DROPPED_TAGS:
+                self.dropped.append(tag)
+            return
+        if tag not in ALLOWED_TAGS:
+            return
+        attributes = self._attributes(tag, attrs)
+        if tag == 'img' and ' src=' not in attributes:
+            return
+        while self.open_tags and self.open_tags[-1] in IMPLIED_END_TAGS.get(tag, ()):
+            self.output.append(f'</{self.open_tags.pop()}>')
+        self.output.append(f'<{tag}{attributes}>')
+        if tag not in VOID_TAGS:
+            self.open_tags.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_TAGS:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if self.dropped:
+            if tag in self.dropped:
+                del self.dropped[self.dropped.index(tag):]
+            return
+        if tag not in self.open_tags:
+            return
+        # Also closes the tags left open inside <tag>
+        while self.open_tags:
+            open_tag = self.open_tags.pop()
+            self.output.append(f'</{open_tag}>')
+            if open_tag == tag:
+                break
+
+    def handle_data(self, data):
+        if not self.dropped:
+            self.output.append(escape(data))
+
+    def _attributes(self, tag, attrs):
+        allowed = ALLOWED_TAGS[tag]
+        kept = []
+        for name, value in attrs:
+            if name not in allowed or value is None:
+                continue
+            if name in URL_ATTRIBUTES and not _safe_url(value):
+                continue
+            if name in NUMBER_ATTRIBUTES and not value.strip().isdigit():
+                continue
+            kept.append(f' {name}="{escape(value.strip())}"')
+        return ''.join(kept)
+
+    def render(self, html):
+        self.feed(html)
+        self.close()
+        self.output.extend(f'</{tag}>' for tag in reversed(self.open_tags))
+        self.open_tags = []
+        return ''.join(self.output)
+
+
+def sanitize(html):
+    """<html> with only the allow-listed tags and attributes."""
+    return Sanitizer().render(html or '')
+
+
+def render_description(html):
+    """Final HTML of a Topic description."""
+    return sanitize(html)
+
+
+def render_overview(text):
+    """Final HTML of a Module overview: escaped text in paragraphs."""
+    return linebreaks(text or '', autoescape=True)
+
+
+def rerender(module_model, topic_model, batch_size=500):
+    """
+    Renders the stored HTML of every Module and Topic again (soft-deleted
+    ones included) and returns the number of rows written.
+    """
+    count = 0
+    for model, source, target, render in (
+            (module_model, 'overview', 'overview_html', render_overview),
+            (topic_model, 'description', 'description_html', render_description)):
+        rows = model._base_manager.only('pk', source, target).order_by('pk')
+        batch = []
+        for row in rows.iterator(chunk_size=batch_size):
+            html = render(getattr(row, source))
+            if html != getattr(row, target):
+                setattr(row, target, html)
+                batch.append(row)
+            if len(batch) >= batch_size:
+                model._base_manager.bulk_update(batch, [target])
+                count += len(batch)
+                batch = []
+        if batch:
+            model._base_manager.bulk_update(batch, [target])
+            count += len(batch)
+    return count
@@ -0,0 +1,146 @@
+"""
+In-process prefix index over Module codes and titles for search autocomplete.
+
+Every worker keeps a sorted list of (key, module id) pairs and answers
+prefix queries with a binary search, without touching the database. Module
+signals update the local index incrementally, once the change is committed,
+and bump a version number in the cache; other workers see the new version on
+their next lookup and rebuild.
+"""
+import threading
+from bisect import bisect_left, insort
+
+from django.core.cache import cache
+from django.urls import reverse
+
+VERSION_CACHE_KEY = 'modules:search-index:version'
+
+
+def index_keys(code, title):
+    """Keys a module can be found by: its code, its title and each title word."""
+    keys = {code.lower(), title.lower()}
+    keys.update(word for word in title.lower().split() if word)
+    return keys
+
+
+class PrefixIndex:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.version = None
+        self.keys = []      # Sorted (key, module_id)
+        self.modules = {}   # module_id -> suggestion dict
+
+    def build(self, rows, version):
+        keys, modules = [], {}
+        for row in rows:
+            modules[row['id']] = self.suggestion(row)
+            keys.extend((key, row['id']) for key in index_keys(row['code'], row['title']))
+        keys.sort()
+        with self.lock:
+            self.keys, self.modules, self.version = keys, modules, version
+
+    def suggestion(self, row):
+        return {
+            'id': row['id'],
+            'code': row['code'],
+            'title': row['title'],
+            'url': reverse('modules:detail', kwargs={'slug': row['slug']}),
+        }
+
+    def add(self, row):
+        with self.lock:
+            self._remove(row['id'])
+            self.modules[row['id']] = self.suggestion(row)
+            for key in index_keys(row['code'], row['title']):
+                insort(self.keys, (key, row['id']))
+
+    def remove(self, module_id):
+        with self.lock:
+            self._remove(module_id)
+
+    def _remove(self, module_id):
+        old = self.modules.pop(module_id, None)
+        if old is None:
+            return
+        for key in index_keys(old['code'], old['title']):
+            position = bisect_left(self.keys, (key, module_id))
+            if position < len(self.keys) and self.keys[position] == (key, module_id):
+                del self.keys[position]
+
+    def search(self, prefix, limit=10):
+        prefix = prefix.strip().lower()
+        if not prefix:
+            return []
+        results, seen = [], set()
+        with self.lock:
+            position = bisect_left(self.keys, (prefix,))
+            while position < len(self.keys) and len(results) < limit:
+                key, module_id = self.keys[position]
+                if not key.startswith(prefix):
+                    break
+                if module_id not in seen:
+                    seen.add(module_id)
+                    results.append(self.modules[module_id])
+                position += 1
+        return results
+
+
+module_index = PrefixIndex()
+
+
+def current_version():
+    cache.add(VERSION_CACHE_KEY, 1, timeout=None)
+    return cache.get(VERSION_CACHE_KEY, 1)
+
+
+def bump_version():
+    """Tells the other workers to rebuild; returns the new version."""
+    try:
+        return cache.incr(VERSION_CACHE_KEY)
+    except ValueError:
+        cache.set(VERSION_CACHE_KEY, 1, timeout=None)
+        return 1
+
+
+def get_index():
+    """The local index, rebuilt from the database only when it is stale."""
+    version = current_version()
+    if module_index.version != version:
+        from .models import Module
+        module_index.build(Module.objects.values('id', 'code', 'title', 'slug'),
+                           version)
+    return module_index
+
+
+def module_row(module):
+    return {'id': module.pk, 'code': module.code, 'title': module.title, 'slug': module.slug}
+
+
+def _apply(change):
+    """
+    Applies <change> to the local index and invalidates the other workers.
+    The index stays current only when no other worker changed anything since
+    it was built: the version it had is then the one just before ours.
+    Otherwise it is left stale and rebuilt on the next lookup.
+    """
+    previous = module_index.version
+    change()
+    version = bump_version()
+    if previous is not None and version == previous + 1:
+        module_index.version = version
+    else:
+        module_index.version = None
+
+
+def module_saved(row):
+    """Applies a Module change (a <module_row>) locally."""
+    _apply(lambda: module_index.add(row))
+
+
+def module_removed(module_id):
+    _apply(lambda: module_index.remove(module_id))
+
+
+def autocomplete(prefix, limit=10):
+    return get_index().search(prefix, limit)
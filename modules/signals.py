@@ -0,0 +1,102 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.dispatch import Signal, receiver
+
+from taggit.models import TaggedItem
+
+from .models import Module, Topic
+from .outline import invalidate_outline
+from . import facets, search
+
+# Sent with <module_id>, <count> and <size> (bytes of uploaded files) whenever
+# Resources are added or removed, removals also with the completion <slots>
+# they freed. Resources have no model signals: bulk inserts and batched purges
+# send these once per batch instead.
+resources_added = Signal()
+resources_removed = Signal()
+
+# Sent with <module_id>, <count> and <slots> when Topics are soft-deleted:
+# their Resources stop counting right away. The purge reports them again
+# later through <resources_removed>, with <hidden> set.
+resources_hidden = Signal()
+
+# Sent with <user_id>, <resource_id>, <module_id> and <action> (RESOURCE_VIEWED
+# or RESOURCE_DOWNLOADED) when a user opens or downloads a Resource
+resource_accessed = Signal()
+RESOURCE_VIEWED = 'view'
+RESOURCE_DOWNLOADED = 'download'
+
+
+@receiver([post_save, post_delete], sender=Module)
+def module_changed(sender, instance, **kwargs):
+    invalidate_outline(instance.pk)
+
+
+# The search index only sees committed changes: a rolled back save must not
+# leave entries behind, and other workers rebuild from the database
+@receiver(post_save, sender=Module)
+def index_module(sender, instance, **kwargs):
+    if instance.deleted is None:
+        row = search.module_row(instance)
+        transaction.on_commit(lambda: search.module_saved(row))
+    else:
+        module_id = instance.pk
+        transaction.on_commit(lambda: search.module_removed(module_id))
+
+
+@receiver(post_delete, sender=Module)
+def unindex_module(sender, instance, **kwargs):
+    module_id = instance.pk
+    transaction.on_commit(lambda: search.module_removed(module_id))
+
+
+@receiver([post_save, post_delete], sender=Topic)
+def topic_changed(sender, instance, **kwargs):
+    invalidate_outline(instance.module_id)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def instructor_changed(sender, instance, update_fields=None, **kwargs):
+    # Outlines show the instructor's name; logins only touch last_login
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    for module_id in Module.all_objects.filter(instructor=instance).values_list('id', flat=True):
+        invalidate_outline(module_id)
+
+
+@receiver(pre_save, sender=Module)
+def remember_facets(sender, instance, **kwargs):
+    # Facet values before the change, their counts may go down
+    instance._old_facets = (Module.all_objects.filter(pk=instance.pk)
+                            .values_list('level', 'instructor_id').first()
+                            if instance.pk else None)
+
+
+@receiver(post_save, sender=Module)
+def update_module_facets(sender, instance, **kwargs):
+    old = getattr(instance, '_old_facets', None)
+    if old and old[0] != instance.level:
+        facets.refresh_level(old[0])
+    if old and old[1] != instance.instructor_id:
+        facets.refresh_instructor(old[1])
+    facets.refresh_level(instance.level)
+    facets.refresh_instructor(instance.instructor_id)
+
+
+@receiver(post_delete, sender=Module)
+def delete_module_facets(sender, instance, **kwargs):
+    facets.refresh_level(instance.level)
+    facets.refresh_instructor(instance.instructor_id)
+
+
+@receiver(m2m_changed, sender=TaggedItem)
+def update_tag_facets(sender, instance, action, pk_set, **kwargs):
+    if action == 'pre_clear':
+        instance._cleared_tag_ids = list(instance.tag.values_list('id', flat=True))
+    elif action == 'post_clear':
+        for tag_id in getattr(instance, '_cleared_tag_ids', []):
+            facets.refresh_tag(tag_id)
+    elif action in ('post_add', 'post_remove'):
+        for tag_id in pk_set or ():
+            facets.refresh_tag(tag_id)
@@ -1,3 +1,546 @@
-from django.test import TestCase
+import asyncio
+import tempfile
+import zipfile
+from io import BytesIO, StringIO
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import transaction
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from taggit.models import TaggedItem
+
+from accounts.models import CustomUser
+from analytics.models import ResourceAccess
+from moodle.asgi import application
+from moodle.pubsub import get_broker
+from moodle.query_plans import PlanCheck, check_query_plans
+from .importer import ROOT_TOPIC_TITLE, detect_model, run_import
+from .live import ADDED, describe, publish_resources, topic_events_url
+from .models import FacetCount, File, Image, ImportJob, Module, Resource, Text, Topic, Video
+from .oembed import fetch_video_metadata, parse_video_url
+from .outline import load_resources
+from .purge import get_purge_progress, purge_module, soft_delete_module, soft_delete_topics
+from .richtext import sanitize
+from . import search
+
+
+class QueryPlanTests(TestCase):
+
+    def test_hot_queries_use_indexes(self):
+        # Raises CommandError when a plan regresses to a full table scan
+        call_command('check_query_plans', stdout=StringIO())
+
+    def test_full_scan_is_reported(self):
+        check = PlanCheck('overview', lambda: Module.objects.filter(overview='x'))
+        self.assertEqual(check_query_plans([check]),
+                         [('overview', ['modules_module'])])
+
+
+class RichTextTests(TestCase):
+
+    def test_sanitize(self):
+        self.assertEqual(sanitize('<p onclick="steal()">Hi <b>there</p>'
+                                  '<script>alert(1)</script><iframe><p>x</p></iframe>'),
+                         '<p>Hi <b>there</b></p>')
+        self.assertEqual(sanitize('<a href="java\tscript:alert(1)">a</a>'
+                                  '<a href="/topics/">b</a><img src="data:x">'),
+                         '<a>a</a><a href="/topics/">b</a>')
+        self.assertEqual(sanitize('<ul><li>a<li>b</ul> &lt;i&gt;'),
+                         '<ul><li>a</li><li>b</li></ul> &lt;i&gt;')
+
+    def test_rendered_on_save(self):
+        module = Module.objects.create(code='RICH1', title='Rich', overview='a <b>\n\nb')
+        self.assertEqual(module.overview_html, '<p>a &lt;b&gt;</p>\n\n<p>b</p>')
+        topic = Topic.objects.create(module=module, title='T',
+                                     description='<p>ok</p><script>x</script>')
+        topic.description = '<em>new</em>'
+        topic.save(update_fields=['description'])
+        topic.refresh_from_db()
+        self.assertEqual(topic.description_html, '<em>new</em>')
+
+    def test_command_backfills(self):
+        module = Module.objects.create(code='RICH2', title='Backfill', overview='x')
+        Module.objects.filter(pk=module.pk).update(overview_html='')
+        call_command('render_rich_text', stdout=StringIO())
+        module.refresh_from_db()
+        self.assertEqual(module.overview_html, '<p>x</p>')
+
+
+class LiveEventsTests(TransactionTestCase):
+    """Drives the ASGI application like a server would."""
+
+    def setUp(self):
+        self.instructor = CustomUser.objects.create(username='teacher', email='teacher@example.com')
+        self.student = CustomUser.objects.create(username='student', email='student@example.com')
+        self.outsider = CustomUser.objects.create(username='outsider', email='outsider@example.com')
+        self.module = Module.objects.create(code='LIVE1', title='Live', overview='-',
+                                            instructor=self.instructor)
+        self.module.students.add(self.student)
+        self.topic = Topic.objects.create(module=self.module, title='Week 1')
+        self.path = topic_events_url(self.topic.id)
+
+    def session_cookie(self, user):
+        client = Client()
+        client.force_login(user)
+        return (f'{settings.SESSION_COOKIE_NAME}='
+                f'{client.cookies[settings.SESSION_COOKIE_NAME].value}').encode()
+
+    def scope(self, cookie=b''):
+        return {'type': 'http', 'method': 'GET', 'path': self.path, 'query_string': b'',
+                'headers': [(b'cookie', cookie)]}
+
+    def request(self, cookie, while_open=None):
+        """Opens the stream, runs <while_open> on a thread, then disconnects.
+        Returns the ASGI messages sent."""
+        async def run():
+            inbox = asyncio.Queue()
+            sent = []
+
+            async def send(message):
+                sent.append(message)
+
+            task = asyncio.ensure_future(application(self.scope(cookie), inbox.get, send))
+            while not sent and not task.done():
+                await asyncio.sleep(0.01)
+            if while_open and not task.done():
+                await sync_to_async(while_open, thread_sensitive=False)()
+                for _ in range(100):
+                    if len(sent) > 2:
+                        break
+                    await asyncio.sleep(0.01)
+            inbox.put_nowait({'type': 'http.disconnect'})
+            await task
+            return sent
+
+        return async_to_sync(run)()
+
+    def test_outsiders_are_refused(self):
+        self.assertEqual(self.request(b'')[0]['status'], 403)
+        self.assertEqual(self.request(self.session_cookie(self.outsider))[0]['status'], 403)
+
+    def test_new_resource_is_pushed(self):
+        def add_resource():
+            text = Text.objects.create(creator=self.instructor, title='Slides', content='-')
+            with transaction.atomic():
+                resource = Resource.objects.create(topic=self.topic, item=text)
+                publish_resources(self.topic.id, ADDED,
+                                  [describe(resource.id, str(text), Text)])
+
+        sent = self.request(self.session_cookie(self.student), add_resource)
+        self.assertEqual(sent[0]['status'], 200)
+        body = b''.join(message.get('body', b'') for message in sent[1:]).decode()
+        self.assertIn('event: resource\n', body)
+        self.assertIn('"title": "Slides"', body)
+        self.assertEqual(get_broker().subscriber_count(), 0)
+
+
+PNG = b'\x89PNG\r\n\x1a\n' + b'\0' * 100
+PDF = b'%PDF-1.4\n' + b'-' * 100
+
+
+def make_archive(files):
+    buffer = BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, content in files.items():
+            archive.writestr(name, content)
+    return SimpleUploadedFile('material.zip', buffer.getvalue())
+
+
+class ImportTests(TestCase):
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        media_override = override_settings(MEDIA_ROOT=media.name)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+        self.instructor = CustomUser.objects.create(username='teacher', email='teacher@example.com')
+        self.module = Module.objects.create(code='IMP1', title='Import', overview='-',
+                                            instructor=self.instructor)
+
+    def run_job(self, files):
+        job = ImportJob.objects.create(module=self.module, creator=self.instructor,
+                                       archive=make_archive(files))
+        run_import(job.pk)
+        job.refresh_from_db()
+        return job
+
+    def test_detect_model(self):
+        self.assertIs(detect_model(PNG[:16]), Image)
+        self.assertIs(detect_model(b'RIFF\0\0\0\0WEBPVP8 '), Image)
+        self.assertIs(detect_model(PDF[:16]), File)
+
+    def test_topics_tags_and_types(self):
+        job = self.run_job({
+            'Week 1/slides.pdf': PDF,
+            'Week 1/Lab/diagram.png': PNG,
+            'syllabus.pdf': PDF,
+            '.DS_Store': b'-',
+            '__MACOSX/Week 1/._slides.pdf': b'-',
+        })
+        self.assertEqual((job.status, job.total, job.created_resources),
+                         (ImportJob.DONE, 3, 3))
+        topics = {topic.title: topic for topic in self.module.topics.all()}
+        self.assertEqual(set(topics), {'Week 1', ROOT_TOPIC_TITLE})
+        self.assertEqual(list(topics['Week 1'].tag.names()), ['Lab'])
+        items = {str(resource.item): type(resource.item)
+                 for resource in Resource.objects.filter(topic__module=self.module)}
+        self.assertEqual(items, {'slides': File, 'diagram': Image, 'syllabus': File})
+
+    @override_settings(IMPORT_MAX_ENTRIES=1)
+    def test_entry_limit(self):
+        with self.assertLogs('modules.importer', 'ERROR'):
+            job = self.run_job({'a.pdf': PDF, 'b.pdf': PDF})
+        self.assertEqual(job.status, ImportJob.FAILED)
+        self.assertIn('at most 1', job.errors)
+        self.assertFalse(Resource.objects.exists())
+
+    @override_settings(IMPORT_MAX_FILE_SIZE=len(PDF))
+    def test_oversized_entries_are_skipped(self):
+        job = self.run_job({'small.pdf': PDF, 'large.pdf': PDF * 1000})
+        self.assertEqual((job.status, job.created_resources), (ImportJob.DONE, 1))
+        self.assertIn('large.pdf', job.errors)
+
+    @override_settings(IMPORT_MAX_TOTAL_SIZE=len(PDF) * 2)
+    def test_total_size_limit(self):
+        with self.assertLogs('modules.importer', 'ERROR'):
+            job = self.run_job({'a.pdf': PDF, 'b.pdf': PDF, 'c.pdf': PDF})
+        self.assertEqual(job.status, ImportJob.FAILED)
+        self.assertFalse(File.objects.exists())
+
+    def test_progress_endpoint(self):
+        job = self.run_job({'a.pdf': PDF})
+        client = Client()
+        client.force_login(self.instructor)
+        response = client.get(f'/modules/import/job/{job.pk}/')
+        self.assertEqual(response.json()['status'], ImportJob.DONE)
+        self.assertEqual(response.json()['percent'], 100)
+        other = CustomUser.objects.create(username='other', email='other@example.com')
+        client.force_login(other)
+        self.assertEqual(client.get(f'/modules/import/job/{job.pk}/').status_code, 404)
+
+
+@override_settings(BACKGROUND_TASKS_EAGER=True)
+class MediaTests(TestCase):
+    """Uploads are only served by the access-checked resource views."""
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        media_override = override_settings(MEDIA_ROOT=media.name)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+        self.instructor = CustomUser.objects.create(username='teacher', email='teacher@example.com')
+        self.student = CustomUser.objects.create(username='student', email='student@example.com')
+        module = Module.objects.create(code='MED1', title='Media', overview='-',
+                                       instructor=self.instructor)
+        module.students.add(self.student)
+        self.topic = Topic.objects.create(module=module, title='Topic', description='')
+        self.client.force_login(self.student)
+
+    def add(self, model, name, content):
+        item = model.objects.create(creator=self.instructor, title=name,
+                                    file=SimpleUploadedFile(name, content))
+        return Resource.objects.create(topic=self.topic, item=item)
+
+    def test_html_upload_is_an_attachment(self):
+        resource = self.add(File, 'page.html', b'<script>alert(1)</script>')
+        response = self.client.get(f'/modules/resource/{resource.id}/file/')
+        self.assertTrue(response['Content-Disposition'].startswith('attachment'))
+        self.assertTrue(response['Cache-Control'].startswith('private'))
+
+    def test_image_is_inline(self):
+        resource = self.add(Image, 'diagram.png', PNG)
+        response = self.client.get(f'/modules/resource/{resource.id}/file/')
+        self.assertEqual(response['Content-Type'], 'image/png')
+        self.assertTrue(response['Content-Disposition'].startswith('inline'))
+        self.assertEqual(b''.join(response.streaming_content), PNG)
+        download = self.client.get(f'/modules/resource/{resource.id}/download/')
+        self.assertTrue(download['Content-Disposition'].startswith('attachment'))
+
+    def test_outsiders_get_nothing(self):
+        resource = self.add(File, 'notes.pdf', PDF)
+        self.client.force_login(CustomUser.objects.create(username='other',
+                                                          email='other@example.com'))
+        self.assertEqual(self.client.get(f'/modules/resource/{resource.id}/file/').status_code,
+                         404)
+
+
+class SearchTests(TestCase):
+
+    def setUp(self):
+        cache.delete(search.VERSION_CACHE_KEY)
+        search.module_index.version = None
+        self.addCleanup(setattr, search.module_index, 'version', None)
+        self.instructor = CustomUser.objects.create(username='teacher', email='teacher@example.com')
+        self.algebra = Module.objects.create(code='MATH101', title='Linear Algebra',
+                                             overview='-', instructor=self.instructor)
+        Module.objects.create(code='HIST200', title='Modern History', overview='-',
+                              instructor=self.instructor)
+
+    def codes(self, prefix):
+        return [suggestion['code'] for suggestion in search.autocomplete(prefix)]
+
+    def test_autocomplete(self):
+        self.assertEqual(self.codes('math'), ['MATH101'])
+        self.assertEqual(self.codes('alg'), ['MATH101'])
+        self.assertEqual(self.codes('  Modern h'), ['HIST200'])
+        self.assertEqual(self.codes('x'), [])
+        self.assertEqual(self.codes(''), [])
+
+    def test_local_change_keeps_index_current(self):
+        search.get_index()
+        self.algebra.title = 'Abstract Algebra'
+        search.module_saved(search.module_row(self.algebra))
+        self.assertEqual(search.module_index.version, search.current_version())
+        self.assertEqual(self.codes('abstract'), ['MATH101'])
+        self.assertEqual(self.codes('linear'), [])
+
+    def test_other_worker_change_triggers_rebuild(self):
+        search.get_index()
+        # Another worker saves a Module and bumps the shared version
+        Module.objects.create(code='PHYS100', title='Mechanics', overview='-',
+                              instructor=self.instructor)
+        search.bump_version()
+        self.assertEqual(self.codes('mech'), ['PHYS100'])
+
+    def test_concurrent_bump_leaves_index_stale(self):
+        search.get_index()
+        other = Module.objects.create(code='PHYS100', title='Mechanics', overview='-',
+                                      instructor=self.instructor)
+        search.bump_version()   # The other worker, between our save and our bump
+        search.module_removed(self.algebra.pk)
+        self.assertIsNone(search.module_index.version)
+        Module.objects.filter(pk=self.algebra.pk).delete()
+        self.assertEqual(self.codes('mech'), [other.code])
+        self.assertEqual(self.codes('math'), [])
+
+    def test_index_waits_for_commit(self):
+        search.get_index()
+        version = search.current_version()
+        with transaction.atomic():
+            Module.objects.create(code='CHEM100', title='Chemistry', overview='-',
+                                  instructor=self.instructor)
+        # Still inside the test's transaction: nothing was applied yet
+        self.assertEqual(search.current_version(), version)
+        self.assertEqual(self.codes('chem'), [])
+
+
+@override_settings(BACKGROUND_TASKS_EAGER=True)
+class PurgeTests(TestCase):
+
+    def setUp(self):
+        # Progress is kept in the cache, under Module ids the next test reuses
+        cache.clear()
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        media_override = override_settings(MEDIA_ROOT=media.name)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+        self.instructor = CustomUser.objects.create(username='teacher', email='teacher@example.com',
+                                                    is_staff=True)
+        self.module = Module.objects.create(code='DEL1', title='Doomed', overview='-',
+                                            instructor=self.instructor)
+        self.files = []
+        for n in range(2):
+            topic = Topic.objects.create(module=self.module, title=f'Week {n}')
+            topic.tag.add('doomed')
+            for m in range(2):
+                item = File.objects.create(creator=self.instructor, title='Notes',
+                                           file=SimpleUploadedFile('notes.pdf', PDF))
+                self.files.append(item.file.name)
+                Resource.objects.create(topic=topic, item=item)
+
+    def progress(self, user):
+        self.client.force_login(user)
+        return self.client.get(reverse('modules:purge_progress', args=[self.module.pk]))
+
+    def test_soft_delete_hides_module(self):
+        soft_delete_module(self.module)
+        self.assertFalse(Module.objects.filter(pk=self.module.pk).exists())
+        self.assertEqual(Module.all_objects.get(pk=self.module.pk).title, 'Doomed')
+        response = self.progress(self.instructor)
+        self.assertEqual(response.json()['status'], 'pending')
+        response = self.client.get(reverse('modules:manage_list'))
+        self.assertContains(response, reverse('modules:purge_progress', args=[self.module.pk]))
+
+    def test_purge_in_batches(self):
+        soft_delete_module(self.module)
+        reports = []
+        purge_module(self.module.pk, batch_size=1, report=reports.append)
+        self.assertEqual(reports[-1], 'done')
+        self.assertFalse(Module.all_objects.filter(pk=self.module.pk).exists())
+        self.assertFalse(Topic.all_objects.filter(module_id=self.module.pk).exists())
+        self.assertFalse(Resource.objects.exists())
+        self.assertFalse(File.objects.exists())
+        self.assertFalse(TaggedItem.objects.exists())
+        storage = File._meta.get_field('file').storage
+        self.assertFalse(any(storage.exists(name) for name in self.files))
+
+        response = self.progress(self.instructor)
+        self.assertEqual(response.json(), {
+            'id': self.module.pk, 'status': 'done', 'topics_total': 2, 'topics_done': 2,
+            'resources': 4, 'enrollments': 0})
+        outsider = CustomUser.objects.create(username='other', email='other@example.com')
+        self.assertEqual(self.progress(outsider).status_code, 404)
+
+    def test_purge_without_instructor(self):
+        soft_delete_module(self.module)
+        # What deleting the instructor's account does (SET_NULL)
+        Module.all_objects.filter(pk=self.module.pk).update(instructor=None)
+        purge_module(self.module.pk, batch_size=1)
+        self.assertFalse(Module.all_objects.filter(pk=self.module.pk).exists())
+        self.assertFalse(Resource.objects.exists())
+        self.assertEqual(get_purge_progress(self.module.pk)['status'], 'done')
+        self.assertEqual(self.progress(self.instructor).status_code, 404)
+
+
+class FakeOEmbedClient:
+
+    def __init__(self, payload=None, error=None):
+        self.payload = payload or {}
+        self.error = error
+        self.requests = []
+
+    def get_json(self, url, params=None):
+        self.requests.append((url, params))
+        if self.error:
+            raise self.error
+        return self.payload
+
+
+class VideoTests(TestCase):
+
+    def setUp(self):
+        self.user = CustomUser.objects.create(username='teacher', email='teacher@example.com')
+
+    def test_parse_video_url(self):
+        self.assertEqual(parse_video_url('https://www.youtube.com/watch?v=dQw4w9WgXcQ'), {
+            'provider': 'youtube', 'video_id': 'dQw4w9WgXcQ',
+            'embed_url': 'https://www.youtube.com/embed/dQw4w9WgXcQ?wmode=opaque'})
+        vimeo = parse_video_url('https://vimeo.com/148751763')
+        self.assertEqual((vimeo['provider'], vimeo['video_id']), ('vimeo', '148751763'))
+        self.assertEqual(parse_video_url('https://example.com/video.mp4'), {})
+
+    def test_fetch_metadata(self):
+        video = Video.objects.create(creator=self.user, title='Lecture',
+                                     url='https://www.youtube.com/watch?v=dQw4w9WgXcQ')
+        self.assertEqual(video.provider, 'youtube')
+        # Signed CDN URLs are well over URLField's default 200 characters
+        thumbnail = 'https://i.ytimg.com/vi/dQw4w9WgXcQ/hq.jpg?sig=' + 'a' * 600
+        client = FakeOEmbedClient({'title': 'Never Gonna Give You Up',
+                                   'thumbnail_url': thumbnail, 'duration': 213})
+        fetch_video_metadata(video.pk, client=client)
+        self.assertEqual(client.requests, [('https://www.youtube.com/oembed',
+                                            {'url': video.url, 'format': 'json'})])
+        video.refresh_from_db()
+        self.assertEqual((video.provider_title, video.thumbnail_url, video.duration_display),
+                         ('Never Gonna Give You Up', thumbnail, '3:33'))
+        self.assertIsNotNone(video.metadata_fetched)
+        # Fits the columns (SQLite doesn't enforce their length)
+        video.full_clean()
+
+    def test_fetch_failure_is_logged(self):
+        video = Video.objects.create(creator=self.user, title='Lecture',
+                                     url='https://vimeo.com/148751763')
+        with self.assertLogs('modules.oembed', 'WARNING'):
+            fetch_video_metadata(video.pk, client=FakeOEmbedClient(error=OSError('timeout')))
+        video.refresh_from_db()
+        self.assertIsNone(video.metadata_fetched)
+
+
+class FacetTests(TestCase):
+
+    def setUp(self):
+        self.ada = CustomUser.objects.create(username='ada', email='ada@example.com',
+                                             first_name='Ada', last_name='Byron')
+        self.alan = CustomUser.objects.create(username='alan', email='alan@example.com')
+        self.algebra = Module.objects.create(code='F1', title='Algebra', overview='-',
+                                             level='U', instructor=self.ada)
+        self.logic = Module.objects.create(code='F2', title='Logic', overview='-',
+                                           level='PG', instructor=self.ada)
+        Module.objects.create(code='F3', title='Computing', overview='-', level='U',
+                              instructor=self.alan)
+
+    def counts(self, facet):
+        return dict(FacetCount.objects.filter(facet=facet).values_list('label', 'count'))
+
+    def test_counts_follow_saves(self):
+        self.assertEqual(self.counts(FacetCount.LEVEL), {'Undergraduate': 2, 'Postraduate': 1})
+        self.assertEqual(self.counts(FacetCount.INSTRUCTOR), {'Ada Byron': 2, 'alan': 1})
+        self.logic.level = 'U'
+        self.logic.instructor = self.alan
+        self.logic.save()
+        self.assertEqual(self.counts(FacetCount.LEVEL), {'Undergraduate': 3})
+        self.assertEqual(self.counts(FacetCount.INSTRUCTOR), {'Ada Byron': 1, 'alan': 2})
+
+    def test_counts_follow_deletes(self):
+        self.logic.delete()
+        self.assertEqual(self.counts(FacetCount.LEVEL), {'Undergraduate': 2})
+        soft_delete_module(self.algebra)
+        self.assertEqual(self.counts(FacetCount.LEVEL), {'Undergraduate': 1})
+        self.assertEqual(self.counts(FacetCount.INSTRUCTOR), {'alan': 1})
+
+    def test_tag_counts(self):
+        first = Topic.objects.create(module=self.algebra, title='Week 1')
+        second = Topic.objects.create(module=self.algebra, title='Week 2')
+        first.tag.add('proofs', 'sets')
+        second.tag.add('proofs')
+        Topic.objects.create(module=self.logic, title='Week 1').tag.add('proofs')
+        # Modules, not Topics, are counted
+        self.assertEqual(self.counts(FacetCount.TAG), {'proofs': 2, 'sets': 1})
+        first.tag.clear()
+        self.assertEqual(self.counts(FacetCount.TAG), {'proofs': 2})
+        soft_delete_topics([second])
+        self.assertEqual(self.counts(FacetCount.TAG), {'proofs': 1})
+
+    def test_rebuild_matches_incremental_counts(self):
+        Topic.objects.create(module=self.algebra, title='Week 1').tag.add('proofs')
+        incremental = list(FacetCount.objects.values_list('facet', 'value', 'label', 'count'))
+        call_command('rebuild_facets', stdout=StringIO())
+        self.assertEqual(list(FacetCount.objects.values_list('facet', 'value', 'label', 'count')),
+                         incremental)
+
+
+@override_settings(BACKGROUND_TASKS_EAGER=True)
+class PartialLoadingTests(TestCase):
+    """Topic pages list Resources, item bodies come from the partial view."""
+
+    def setUp(self):
+        cache.clear()
+        self.instructor = CustomUser.objects.create(username='teacher', email='teacher@example.com')
+        self.student = CustomUser.objects.create(username='student', email='student@example.com')
+        self.module = Module.objects.create(code='PART1', title='Partial', overview='-',
+                                            instructor=self.instructor)
+        self.module.students.add(self.student)
+        self.topic = Topic.objects.create(module=self.module, title='Week 1')
+        self.resource = Resource.objects.create(topic=self.topic, item=Text.objects.create(
+            creator=self.instructor, title='Notes', content='The body of the notes'))
+        self.client.force_login(self.student)
+
+    def test_item_bodies_are_deferred(self):
+        resource, = load_resources(self.topic.pk)
+        self.assertEqual(resource.item.get_deferred_fields(), {'content'})
+        response = self.client.get(reverse('student_module_detail_topic',
+                                           args=[self.module.pk, self.topic.pk]))
+        self.assertContains(response, reverse('modules:resource_partial',
+                                              args=[self.resource.pk]))
+        self.assertNotContains(response, 'The body of the notes')
+
+    def test_partial_renders_body_and_counts_view(self):
+        response = self.client.get(reverse('modules:resource_partial', args=[self.resource.pk]))
+        self.assertContains(response, 'The body of the notes')
+        self.assertEqual(response['Cache-Control'], 'private, no-cache')
+        self.assertEqual(ResourceAccess.objects.filter(user=self.student,
+                                                       resource_id=self.resource.pk).count(), 1)
+
+    def test_partial_for_outsiders(self):
+        outsider = CustomUser.objects.create(username='other', email='other@example.com')
+        self.client.force_login(outsider)
+        response = self.client.get(reverse('modules:resource_partial', args=[self.resource.pk]))
+        self.assertEqual(response.status_code, 404)
@@ -3,14 +3,21 @@ from django.urls import path
 from .views import (
     manage_module_list_view,
     module_list_view,
+    module_autocomplete_view,
     module_detail_view,
     module_create_view,
     module_update_view,
     module_delete_view,
+    purge_progress_view,
     topic_update_view,
     resource_list_view,
     resource_create_view,
-    resource_delete_view
+    resource_delete_view,
+    resource_download_view,
+    resource_file_view,
+    resource_partial_view,
+    module_import_view,
+    import_progress_view
 )
 
 app_name = 'modules'
@@ -20,9 +27,15 @@ urlpatterns = [
     # Modules
     path('dashboard/', manage_module_list_view, name='manage_list'),
     path('all/', module_list_view, name='list'),
+    path('autocomplete/', module_autocomplete_view, name='autocomplete'),
     path('create/', module_create_view, name='create'),
     path('edit/<int:pk>/', module_update_view, name='edit'),
     path('delete/<int:pk>/', module_delete_view, name='delete'),
+    path('delete/<int:pk>/progress/', purge_progress_view,
+         name='purge_progress'),
+    path('import/<int:pk>/', module_import_view, name='import'),
+    path('import/job/<int:job_id>/', import_progress_view,
+         name='import_progress'),
     path('<slug:slug>/', module_detail_view, name='detail'),
 
     # Topics
@@ -36,4 +49,10 @@ urlpatterns = [
          resource_create_view, name='resource_update'),
     path('resource/<int:id>/delete/', resource_delete_view,
          name='resource_delete'),
+    path('resource/<int:id>/', resource_partial_view,
+         name='resource_partial'),
+    path('resource/<int:id>/download/', resource_download_view,
+         name='resource_download'),
+    path('resource/<int:id>/file/', resource_file_view,
+         name='resource_file'),
 ]
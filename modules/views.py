@@ -1,18 +1,33 @@
-from django.db.models import Count
+from django.db.models import Count, Q
 from django.forms.models import modelform_factory
-from .forms import TopicFormSet
+from .forms import ModuleImportForm, TopicFormSet
 from django.apps import apps
+from django.contrib.contenttypes.models import ContentType
 from django.views.generic.list import ListView
 from django.views.generic.detail import DetailView
 from django.views.generic.edit import CreateView, UpdateView, DeleteView
 from django.views.generic.base import TemplateResponseMixin, View
+from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.messages.views import SuccessMessageMixin
+from django.db import transaction
+from django.http import Http404, HttpResponse, JsonResponse
 from django.shortcuts import redirect, get_object_or_404
 from django.urls import reverse_lazy
 
-from .models import Module, Topic, Resource
+from .models import FacetCount, ImportJob, Module, Topic, Resource
+from .importer import run_import
+from . import live
 from .mixins import InstructorEditMixin
-
+from .outline import get_outline, invalidate_outline, load_resources
+from .purge import get_purge_progress, soft_delete_module, soft_delete_topics
+from .search import autocomplete
+from .signals import (RESOURCE_DOWNLOADED, RESOURCE_VIEWED, resource_accessed,
+                      resources_added, resources_removed)
+
+from moodle.staticfiles import serve_media
+from moodle.tasks import enqueue_on_commit
+from notifications.services import forget_unread_counts, notify_resource_published
+from students.enrollment import is_enrolled, promote_waitlist, waitlist_position
 from students.forms import ModuleEnrollForm
 
 
@@ -31,6 +46,13 @@ class ManageModuleListView(InstructorEditMixin, ListView):
     """
     template_name = 'manage/module/list.html'
 
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        # Deleted Modules whose content is still being purged
+        context['purging'] = Module.all_objects.filter(instructor=self.request.user,
+                                                       deleted__isnull=False)
+        return context
+
 
 manage_module_list_view = ManageModuleListView.as_view()
 
@@ -39,31 +61,86 @@ class ModuleListView(TemplateResponseMixin, View):
     """
     A view to list all modules.
     Inherits from TemplateResponseMixins to return a HTTP Response via <render_to_response> method.
+    Modules can be filtered by level, instructor and tag; facet counts are
+    read from the precomputed <FacetCount> table (see modules/facets.py).
     """
     model = Module
     template_name = 'module/list.html'
+    # GET parameter -> facet
+    facet_params = {
+        'level': FacetCount.LEVEL,
+        'instructor': FacetCount.INSTRUCTOR,
+        'tag': FacetCount.TAG,
+    }
 
     def get(self, request):
         """
         Retrieve all available Modules along with total number of Topics for each Module.
         Returns an HTTP response.
         """
-        modules = Module.objects.annotate(total_topics=Count('topics'))
-        return self.render_to_response({'modules': modules})
+        modules = self.get_queryset().annotate(total_topics=Count(
+            'topics', filter=Q(topics__deleted__isnull=True)))
+        return self.render_to_response({'modules': modules,
+                                        'facets': self.get_facets(),
+                                        'q': request.GET.get('q', '')})
 
     def get_queryset(self):
-        """Search functionality."""
-        qs = super().get_queryset()
-        q = self.request.GET.get('q')
-        if q:
-            return qs.filter(title__icontains=q)
+        """Search and facet filters."""
+        qs = Module.objects.all()
+        params = self.request.GET
+        if params.get('q'):
+            qs = qs.filter(Q(title__icontains=params['q']) |
+                           Q(code__icontains=params['q']))
+        if params.get('level'):
+            qs = qs.filter(level=params['level'])
+        if params.get('instructor', '').isdigit():
+            qs = qs.filter(instructor_id=params['instructor'])
+        if params.get('tag'):
+            # Subquery rather than a join, so total_topics isn't affected
+            qs = qs.filter(id__in=Topic.objects.filter(
+                tag__slug=params['tag']).values('module_id'))
         return qs
 
+    def get_facets(self):
+        """
+        Facet values with their counts and a link toggling each of them,
+        from a single query.
+        """
+        groups = {facet: [] for facet in self.facet_params.values()}
+        for facet_count in FacetCount.objects.all():
+            param = next(p for p, f in self.facet_params.items()
+                         if f == facet_count.facet)
+            params = self.request.GET.copy()
+            active = params.get(param) == facet_count.value
+            if active:
+                del params[param]
+            else:
+                params[param] = facet_count.value
+            groups[facet_count.facet].append({
+                'label': facet_count.label,
+                'count': facet_count.count,
+                'active': active,
+                'url': f'?{params.urlencode()}',
+            })
+        return [(label, groups[facet]) for facet, label in FacetCount.FACET_CHOICES
+                if groups[facet]]
+
 
 module_list_view = ModuleListView.as_view()
 
 
-module_list_view = ModuleListView.as_view()
+class ModuleAutocompleteView(View):
+    """
+    Search suggestions for the navbar, answered from the in-memory prefix
+    index (see modules/search.py).
+    """
+
+    def get(self, request):
+        results = autocomplete(request.GET.get('q', ''), limit=10)
+        return JsonResponse({'results': results})
+
+
+module_autocomplete_view = ModuleAutocompleteView.as_view()
 
 
 class ModuleDetailView(DetailView):
@@ -74,13 +151,23 @@ class ModuleDetailView(DetailView):
     model = Module
     template_name = 'module/detail.html'
 
+    def get_queryset(self):
+        return super().get_queryset().select_related('instructor')
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
+        # Topics with their resource counts, served from the cached outline
+        context['topics'] = get_outline(self.object.pk)['topics']
         context['enroll_form'] = ModuleEnrollForm(
             # Set Module in the Enrollment Form
             # (this field is set automatically and hidden from the user)
             initial={'module': self.object}
         )
+        user = self.request.user
+        if user.is_authenticated:
+            context['enrolled'] = is_enrolled(self.object.pk, user.pk)
+            if not context['enrolled'] and self.object.capacity is not None:
+                context['waitlist_position'] = waitlist_position(self.object, user)
         return context
 
 
@@ -89,7 +176,7 @@ module_detail_view = ModuleDetailView.as_view()
 
 class ModuleCreateView(SuccessMessageMixin, InstructorEditMixin, CreateView):
     # template_name = 'manage/module/form.html'
-    fields = ['code', 'title', 'level', 'overview']
+    fields = ['code', 'title', 'level', 'capacity', 'overview']
     success_msg = "Module was created successully."
 
 
@@ -99,6 +186,13 @@ module_create_view = ModuleCreateView.as_view()
 class ModuleUpdateView(InstructorEditMixin, UpdateView):
     success_msg = "Module was updated successully."
 
+    def form_valid(self, form):
+        response = super().form_valid(form)
+        # A larger capacity frees seats for waitlisted students
+        if 'capacity' in form.changed_data:
+            enqueue_on_commit(promote_waitlist, self.object.pk)
+        return response
+
 
 module_update_view = ModuleUpdateView.as_view()
 
@@ -109,10 +203,39 @@ class ModuleDeleteView(InstructorEditMixin, DeleteView):
     success_msg = "Module was deleted successully."
     success_url = reverse_lazy("modules:manage_list")
 
+    def delete(self, request, *args, **kwargs):
+        """
+        Soft-deletes the Module: it disappears immediately and its content is
+        purged in batches by a background task (see modules/purge.py).
+        """
+        self.object = self.get_object()
+        soft_delete_module(self.object)
+        return HttpResponseRedirect(self.get_success_url())
+
 
 module_delete_view = ModuleDeleteView.as_view()
 
 
+class PurgeProgressView(LoginRequiredMixin, View):
+    """Progress of the background purge of a deleted Module as JSON."""
+
+    def get(self, request, pk):
+        progress = get_purge_progress(pk)
+        if progress is None:
+            # Deleted, waiting for the background task
+            get_object_or_404(Module.all_objects, pk=pk, instructor=request.user,
+                              deleted__isnull=False)
+            progress = {'status': 'pending', 'topics_total': None, 'topics_done': 0,
+                        'resources': 0, 'enrollments': 0}
+        elif progress['instructor_id'] is None or progress['instructor_id'] != request.user.id:
+            raise Http404
+        return JsonResponse({'id': pk, **{key: value for key, value in progress.items()
+                                          if key != 'instructor_id'}})
+
+
+purge_progress_view = PurgeProgressView.as_view()
+
+
 ########################
 ###      TOPIC        ##
 ########################
@@ -149,7 +272,10 @@ class TopicUpdateView(TemplateResponseMixin, View):
     def post(self, request, *args, **kwargs):
         formset = self.get_formset(data=request.POST)
         if formset.is_valid():
-            formset.save()
+            # Deleted Topics are soft-deleted and purged in the background
+            for topic in formset.save(commit=False):
+                topic.save()
+            soft_delete_topics(formset.deleted_objects)
             return redirect('modules:list')
         context = {'module': self.module, 'formset': formset}
         # <render_to_response> is provided by TemplateResponseMixin
@@ -167,9 +293,14 @@ class ResourceListView(TemplateResponseMixin, View):
     template_name = 'manage/topic/resource_list.html'
 
     def get(self, request, topic_id):
+        """
+          Renders the outline of the Topic only, each item body is then
+          fetched from <ResourcePartialView> as it scrolls into view.
+        """
         topic = get_object_or_404(
             Topic, id=topic_id, module__instructor=request.user)
-        return self.render_to_response({'topic': topic})
+        return self.render_to_response({'topic': topic,
+                                         'resources': load_resources(topic.id)})
 
 
 resource_list_view = ResourceListView.as_view()
@@ -231,8 +362,21 @@ class ResourceCreateUpdateView(TemplateResponseMixin, View):
             obj.creator = request.user
             obj.save()
             if not id:
-                # New Resource
-                Resource.objects.create(topic=self.topic, item=obj)
+                # New Resource, enrolled students are notified in the background
+                resource = Resource.objects.create(topic=self.topic, item=obj)
+                invalidate_outline(self.topic.module_id)
+                resources_added.send(sender=Resource, module_id=self.topic.module_id,
+                                     count=1, size=obj.file_size)
+                notify_resource_published(resource)
+                live.publish_resources(self.topic.id, live.ADDED,
+                                       [live.describe(resource.id, str(obj), type(obj))])
+            else:
+                resource_ids = Resource.objects.filter(
+                    topic=self.topic, resource_type=ContentType.objects.get_for_model(obj),
+                    object_id=obj.id).values_list('id', flat=True)
+                live.publish_resources(self.topic.id, live.UPDATED,
+                                       [live.describe(pk, str(obj), type(obj))
+                                        for pk in resource_ids])
             return redirect('modules:resource_list', self.topic.id)
 
         return self.render_to_response(context)
@@ -250,11 +394,157 @@ class ResourceDeleteView(View):
         resource = get_object_or_404(
             Resource, id=id, topic__module__instructor=request.user)
         topic = resource.topic
+        item = resource.item
+        size = item.file_size
+        live.publish_resources(topic.id, live.REMOVED, [{'id': resource.id}])
         # Deletes the File object
-        resource.item.delete()
-        # Deletes the Resource object
+        item.delete()
+        # Deletes the Resource object, and its notifications
+        forget_unread_counts([resource.id])
         resource.delete()
+        invalidate_outline(topic.module_id)
+        resources_removed.send(sender=Resource, module_id=topic.module_id,
+                               count=1, size=size,
+                               slots=[resource.slot] if resource.slot is not None else [])
+        # Removes the uploaded file from storage (File/Image only)
+        if getattr(item, 'file', None):
+            item.file.delete(save=False)
         return redirect('modules:resource_list', topic.id)
 
 
 resource_delete_view = ResourceDeleteView.as_view()
+
+
+class ResourceAccessMixin(LoginRequiredMixin):
+    """Resources of live Topics, for the Module instructor and enrolled students."""
+
+    def get_resource(self, request, id):
+        resource = get_object_or_404(
+            Resource.objects.select_related('topic__module'), id=id,
+            topic__deleted__isnull=True, topic__module__deleted__isnull=True)
+        module = resource.topic.module
+        if module.instructor_id != request.user.pk and not (
+                Module.students.through.objects
+                .filter(module_id=module.id, customuser_id=request.user.pk)
+                .exists()):
+            raise Http404('No resource found matching the query')
+        if resource.item is None:
+            raise Http404('No resource found matching the query')
+        return resource
+
+    def accessed(self, request, resource, action):
+        # Counts students only, not the instructor checking their own Module
+        if resource.topic.module.instructor_id != request.user.pk:
+            resource_accessed.send(sender=Resource, user_id=request.user.pk,
+                                   resource_id=resource.id,
+                                   module_id=resource.topic.module_id, action=action)
+
+
+class ResourcePartialView(ResourceAccessMixin, View):
+    """
+    The rendered body of a single Resource item, as an HTML fragment.
+    Available to the Module instructor and to enrolled students. Pages load
+    it when the Resource scrolls into view, which counts as opening it.
+    """
+
+    def get(self, request, id):
+        resource = self.get_resource(request, id)
+        self.accessed(request, resource, RESOURCE_VIEWED)
+        response = HttpResponse(resource.item.render(resource=resource))
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+
+
+resource_partial_view = ResourcePartialView.as_view()
+
+
+class ResourceFileView(ResourceAccessMixin, View):
+    """
+    The uploaded file of a Resource, shown inline when that is safe (images).
+    Uploads are only reachable through this view and <ResourceDownloadView>.
+    """
+
+    def get_file(self, resource):
+        file = getattr(resource.item, 'file', None)
+        if not file:
+            raise Http404('No file found matching the query')
+        return file
+
+    def get(self, request, id):
+        resource = self.get_resource(request, id)
+        return serve_media(self.get_file(resource))
+
+
+resource_file_view = ResourceFileView.as_view()
+
+
+class ResourceDownloadView(ResourceFileView):
+    """Counts the download, then sends the uploaded file as an attachment."""
+
+    def get(self, request, id):
+        resource = self.get_resource(request, id)
+        file = self.get_file(resource)
+        self.accessed(request, resource, RESOURCE_DOWNLOADED)
+        return serve_media(file, as_attachment=True)
+
+
+resource_download_view = ResourceDownloadView.as_view()
+
+########################
+###      IMPORT       ##
+########################
+
+
+class ModuleImportView(LoginRequiredMixin, TemplateResponseMixin, View):
+    """
+    Bulk import of course material from a zip archive.
+    The archive is stored with an <ImportJob> and processed in the background
+    (see modules/importer.py); the page polls <ImportProgressView>.
+    """
+    template_name = 'manage/module/import.html'
+    module = None
+
+    def dispatch(self, request, pk):
+        if request.user.is_authenticated:
+            self.module = get_object_or_404(Module, id=pk, instructor=request.user)
+        return super().dispatch(request, pk)
+
+    def render_form(self, form):
+        jobs = self.module.import_jobs.all()[:10]
+        return self.render_to_response({'module': self.module, 'form': form,
+                                        'jobs': jobs})
+
+    def get(self, request, pk):
+        return self.render_form(ModuleImportForm())
+
+    def post(self, request, pk):
+        form = ModuleImportForm(data=request.POST, files=request.FILES)
+        if not form.is_valid():
+            return self.render_form(form)
+        with transaction.atomic():
+            job = ImportJob.objects.create(module=self.module, creator=request.user,
+                                           archive=form.cleaned_data['archive'])
+            enqueue_on_commit(run_import, job.pk)
+        return redirect('modules:import', self.module.id)
+
+
+module_import_view = ModuleImportView.as_view()
+
+
+class ImportProgressView(LoginRequiredMixin, View):
+    """Progress of an <ImportJob> as JSON."""
+
+    def get(self, request, job_id):
+        job = get_object_or_404(ImportJob, id=job_id, module__instructor=request.user)
+        return JsonResponse({
+            'id': job.id,
+            'status': job.status,
+            'total': job.total,
+            'processed': job.processed,
+            'percent': job.percent,
+            'created': job.created_resources,
+            'errors': job.errors.splitlines(),
+        })
+
+
+import_progress_view = ImportProgressView.as_view()
@@ -2,6 +2,8 @@
 ASGI config for moodle project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Paths below LIVE_EVENTS_PREFIX are Server-Sent Events streams, served by
+moodle/sse.py on the event loop; everything else goes to Django.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/3.1/howto/deployment/asgi/
@@ -13,4 +15,20 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'moodle.settings')
 
-application = get_asgi_application()
+# Sets Django up, import the project modules after this
+django_application = get_asgi_application()
+
+from modules.live import events_prefix, follow_topic, topic_events_pattern  # noqa: E402
+from moodle.sse import EventStream  # noqa: E402
+
+events_application = EventStream([
+    (topic_events_pattern(), follow_topic),
+])
+
+EVENTS_PREFIX = events_prefix()
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'http' and scope['path'].startswith(EVENTS_PREFIX):
+        return await events_application(scope, receive, send)
+    return await django_application(scope, receive, send)
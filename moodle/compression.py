@@ -0,0 +1,76 @@
+"""
+Response compression.
+
+Static files are compressed once, by collectstatic (see moodle/staticfiles.py),
+with gzip and, when the optional brotli package is installed, brotli.
+Responses rendered by the views are gzipped on the fly by
+<CompressionMiddleware>; streaming responses are compressed chunk by chunk as
+they are sent. Template pages are rendered, then compressed, in one piece.
+"""
+import gzip
+import re
+
+from django.middleware.gzip import GZipMiddleware
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Content types worth compressing, everything else (images, video, PDFs,
+# archives) is compressed already
+COMPRESSIBLE_TYPES = re.compile(
+    r'^(text/|application/(javascript|json|xml|xhtml\+xml|rss\+xml|atom\+xml|'
+    r'x-javascript|manifest\+json|vnd\.ms-fontobject)|image/(svg\+xml|x-icon|'
+    r'vnd\.microsoft\.icon)|font/(ttf|otf))')
+
+# Encodings we can serve, best first, with the extension of the precompressed file
+ENCODINGS = [('br', '.br'), ('gzip', '.gz')]
+
+
+def is_compressible(content_type):
+    return bool(COMPRESSIBLE_TYPES.match(content_type or ''))
+
+
+def accepted_encodings(request):
+    """Encodings the client accepts (q > 0) according to Accept-Encoding."""
+    accepted = set()
+    for part in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        name, _, params = part.strip().partition(';')
+        quality = 1.0
+        match = re.search(r'q\s*=\s*([0-9.]+)', params)
+        if match:
+            try:
+                quality = float(match[1])
+            except ValueError:
+                quality = 0
+        if name and quality > 0:
+            accepted.add(name.strip().lower())
+    return accepted
+
+
+def compress(content, encoding):
+    """<content> (bytes) compressed with <encoding> ('gzip' or 'br')."""
+    if encoding == 'gzip':
+        # mtime=0: the same input always gives the same output
+        return gzip.compress(content, compresslevel=9, mtime=0)
+    if encoding == 'br':
+        return brotli.compress(content)
+    raise ValueError(f'Unknown encoding {encoding!r}')
+
+
+def available_encodings():
+    return [(encoding, extension) for encoding, extension in ENCODINGS
+            if encoding != 'br' or brotli is not None]
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """
+    GZipMiddleware for the content types that compress well: file downloads
+    of images, videos or archives are passed through untouched.
+    """
+
+    def process_response(self, request, response):
+        if not is_compressible(response.get('Content-Type')):
+            return response
+        return super().process_response(request, response)
@@ -0,0 +1,125 @@
+"""
+Garbage collection of orphaned resource items and media files.
+
+Resource items are attached through a GenericForeignKey, which has no
+cascade: deleting a Module or Topic removes its Resources but leaves the
+Text/File/Image/Video rows (and their files) behind.
+
+Both passes only touch objects older than a grace period, so uploads that are
+in flight (file written, row not committed yet) are never collected.
+"""
+import os
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import models
+from django.utils import timezone
+
+ITEM_MODELS = ('modules.Text', 'modules.File', 'modules.Image', 'modules.Video')
+
+
+def orphaned_items(model, cutoff):
+    """Items of <model> created before <cutoff> that no Resource points to."""
+    Resource = apps.get_model('modules', 'Resource')
+    resource_type = ContentType.objects.get_for_model(model)
+    referenced = (Resource.objects.filter(resource_type=resource_type)
+                  .values('object_id'))
+    return (model.objects.filter(created__lt=cutoff)
+            .exclude(id__in=referenced).order_by('id'))
+
+
+def collect_items(grace, batch_size=500, dry_run=False, report=None):
+    """
+    Deletes orphaned items (and their files) in batches.
+    Returns the number of items collected per model label.
+    """
+    cutoff = timezone.now() - grace
+    collected = {}
+    for label in ITEM_MODELS:
+        model = apps.get_model(label)
+        has_file = any(f.name == 'file' for f in model._meta.fields)
+        count = 0
+        last_id = 0
+        while True:
+            batch = list(orphaned_items(model, cutoff)
+                         .filter(id__gt=last_id)
+                         .values_list('id', 'file' if has_file else 'id')[:batch_size])
+            if not batch:
+                break
+            last_id = batch[-1][0]
+            ids = [pk for pk, _ in batch]
+            if report:
+                for pk, name in batch:
+                    report(f'{label} #{pk}' + (f' ({name})' if has_file else ''))
+            if not dry_run:
+                model.objects.filter(id__in=ids).delete()
+                if has_file:
+                    storage = model._meta.get_field('file').storage
+                    for _, name in batch:
+                        if name:
+                            storage.delete(name)
+            count += len(ids)
+        collected[label] = count
+    return collected
+
+
+def referenced_media():
+    """Set of every media path referenced from a FileField, read with values_list."""
+    referenced = set()
+    for model in apps.get_models():
+        for field in model._meta.fields:
+            if isinstance(field, models.FileField):
+                referenced.update(
+                    model._base_manager.exclude(**{field.name: ''})
+                    .values_list(field.name, flat=True).iterator())
+    return referenced
+
+
+def scan_media(root):
+    """Yields (relative posix path, DirEntry) for every file below <root>."""
+    stack = ['']
+    while stack:
+        relative = stack.pop()
+        with os.scandir(os.path.join(root, relative)) as entries:
+            for entry in entries:
+                name = f'{relative}/{entry.name}' if relative else entry.name
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(name)
+                elif entry.is_file(follow_symlinks=False):
+                    yield name, entry
+
+
+def collect_media(grace, dry_run=False, report=None, root=None):
+    """
+    Deletes files under MEDIA_ROOT that no row references.
+    Returns (files removed, bytes freed).
+    """
+    root = root or settings.MEDIA_ROOT
+    if not os.path.isdir(root):
+        return 0, 0
+    # Files newer than this may belong to rows that are not committed yet
+    cutoff = (timezone.now() - grace).timestamp()
+    referenced = referenced_media()
+    removed = freed = 0
+    for name, entry in scan_media(root):
+        if name in referenced:
+            continue
+        stat = entry.stat(follow_symlinks=False)
+        if stat.st_mtime > cutoff:
+            continue
+        if report:
+            report(name)
+        if not dry_run:
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                continue
+        removed += 1
+        freed += stat.st_size
+    return removed, freed
+
+
+def default_grace():
+    return timedelta(minutes=getattr(settings, 'GARBAGE_GRACE_MINUTES', 60))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from moodle.query_plans import check_query_plans
+
+
+class Command(BaseCommand):
+    help = ('Explains the queries issued by the hot views and fails when any '
+            'of them reads a table in full instead of using an index.')
+
+    def handle(self, *args, **options):
+        try:
+            results = check_query_plans()
+        except NotImplementedError as e:
+            raise CommandError(str(e))
+        failures = 0
+        for label, scans in results:
+            if scans:
+                failures += 1
+                self.stdout.write(self.style.ERROR(
+                    f"{label}: full scan of {', '.join(scans)}"))
+            elif options['verbosity'] > 1:
+                self.stdout.write(f'{label}: ok')
+        if failures:
+            raise CommandError(f'{failures} of {len(results)} query plan(s) '
+                               f'regressed to a full table scan.')
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(results)} query plan(s) use indexes.'))
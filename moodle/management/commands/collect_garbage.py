@@ -0,0 +1,42 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.template.defaultfilters import filesizeformat
+
+from moodle.garbage import collect_items, collect_media, default_grace
+
+
+class Command(BaseCommand):
+    help = ('Deletes resource items no Resource points to and media files no '
+            'row references.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only report what would be deleted.')
+        parser.add_argument('--grace-minutes', type=int, default=None,
+                            help='Ignore objects younger than this '
+                                 '(default: GARBAGE_GRACE_MINUTES).')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--skip-items', action='store_true')
+        parser.add_argument('--skip-media', action='store_true')
+
+    def handle(self, *args, **options):
+        grace = default_grace()
+        if options['grace_minutes'] is not None:
+            grace = timedelta(minutes=options['grace_minutes'])
+        dry_run = options['dry_run']
+        report = self.stdout.write if dry_run or options['verbosity'] > 1 else None
+        prefix = 'Would delete' if dry_run else 'Deleted'
+
+        if not options['skip_items']:
+            collected = collect_items(grace, options['batch_size'],
+                                      dry_run=dry_run, report=report)
+            for label, count in collected.items():
+                self.stdout.write(self.style.SUCCESS(
+                    f'{prefix} {count} orphaned {label} item(s).'))
+        # Media last, so files of the items collected above are gone already
+        if not options['skip_media']:
+            removed, freed = collect_media(grace, dry_run=dry_run, report=report)
+            self.stdout.write(self.style.SUCCESS(
+                f'{prefix} {removed} unreferenced file(s), '
+                f'{filesizeformat(freed)}.'))
@@ -0,0 +1,84 @@
+import json
+import os
+import pstats
+from collections import Counter
+from io import StringIO
+
+from django.core.management.base import BaseCommand, CommandError
+
+from moodle.profiling import get_profile_dir, make_token
+
+
+def load_summaries(directory):
+    if not os.path.isdir(directory):
+        return []
+    summaries = []
+    for name in os.listdir(directory):
+        if name.endswith('.json'):
+            with open(os.path.join(directory, name)) as f:
+                summaries.append(json.load(f))
+    return sorted(summaries, key=lambda summary: summary['created'], reverse=True)
+
+
+class Command(BaseCommand):
+    help = ('Lists the captured view profiles, or summarizes one of them: '
+            'hottest functions, slowest and repeated SQL.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('profile', nargs='?',
+                            help='Profile id (or prefix) to summarize.')
+        parser.add_argument('--view', help='Only list profiles of this view name.')
+        parser.add_argument('--limit', type=int, default=20)
+        parser.add_argument('--sort', default='cumulative',
+                            help='pstats sort key for the function summary.')
+        parser.add_argument('--token', action='store_true',
+                            help='Print a signed value for the profiling header.')
+
+    def handle(self, *args, **options):
+        if options['token']:
+            self.stdout.write(make_token())
+            return
+        directory = get_profile_dir()
+        summaries = load_summaries(directory)
+        if options['profile']:
+            matches = [s for s in summaries if s['id'].startswith(options['profile'])]
+            if not matches:
+                raise CommandError(f"No profile {options['profile']} in {directory}.")
+            self.summarize(directory, matches[0], options)
+            return
+
+        if options['view']:
+            summaries = [s for s in summaries if s['view'] == options['view']]
+        for s in summaries[:options['limit']]:
+            self.stdout.write(
+                f"{s['id']}  {s['method']} {s['path']}  {s['status']}  "
+                f"{s['duration'] * 1000:.0f} ms, {len(s['queries'])} queries "
+                f"({s['sql_time'] * 1000:.0f} ms)  [{s['trigger']}]")
+        if not summaries:
+            self.stdout.write(f'No profiles in {directory}.')
+
+    def summarize(self, directory, summary, options):
+        limit = options['limit']
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"{summary['method']} {summary['path']} ({summary['view']}), "
+            f"{summary['duration'] * 1000:.1f} ms"))
+
+        out = StringIO()
+        stats = pstats.Stats(os.path.join(directory, summary['id'] + '.prof'), stream=out)
+        stats.strip_dirs().sort_stats(options['sort']).print_stats(limit)
+        self.stdout.write(out.getvalue())
+
+        queries = summary['queries']
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"{len(queries)} queries, {summary['sql_time'] * 1000:.1f} ms"))
+        for query in sorted(queries, key=lambda q: q['time'], reverse=True)[:limit]:
+            self.stdout.write(f"{query['time'] * 1000:8.2f} ms  {query['sql'][:200]}")
+            for frame in query['origin']:
+                self.stdout.write(f'             {frame}')
+
+        repeated = [(sql, n) for sql, n in Counter(q['sql'] for q in queries).most_common()
+                    if n > 1]
+        if repeated:
+            self.stdout.write(self.style.MIGRATE_HEADING('Repeated statements'))
+            for sql, n in repeated[:limit]:
+                self.stdout.write(f'{n:5d} x  {sql[:200]}')
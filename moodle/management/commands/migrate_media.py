@@ -0,0 +1,89 @@
+import os
+
+from django.apps import apps
+from django.core.files.storage import FileSystemStorage
+from django.core.management.base import BaseCommand
+from django.db import models
+from django.utils.crypto import salted_hmac
+
+from moodle.storage import ShardedUploadTo, is_sharded, sharded_path
+
+
+def sharded_file_fields():
+    """Yields (model, field) for every file field using the sharded layout."""
+    for model in apps.get_models():
+        for field in model._meta.get_fields():
+            if (isinstance(field, models.FileField) and
+                    isinstance(field.upload_to, ShardedUploadTo)):
+                yield model, field
+
+
+def migration_token(model, field, pk, name):
+    """Shard of an existing file: stable across runs, unguessable without SECRET_KEY."""
+    return salted_hmac('moodle.migrate_media',
+                       f'{model._meta.label}.{field.name}:{pk}:{name}').hexdigest()
+
+
+class Command(BaseCommand):
+    help = ('Moves existing uploads into the hash-sharded directory layout and '
+            'rewrites their paths in the database. Safe to interrupt and re-run.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Rows read per query.')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Report what would be moved without moving.')
+
+    def handle(self, *args, **options):
+        self.dry_run = options['dry_run']
+        for model, field in sharded_file_fields():
+            moved, missing = self.migrate_field(model, field, options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(
+                f'{model._meta.label}.{field.name}: moved {moved}, '
+                f'missing on disk {missing}.'))
+
+    def migrate_field(self, model, field, batch_size):
+        prefix = field.upload_to.prefix
+        storage = field.storage
+        # Base manager: soft-deleted or filtered rows still own files
+        qs = (model._base_manager.exclude(**{field.name: ''})
+              .order_by('pk').values_list('pk', field.name))
+        moved = missing = 0
+        last_pk = None
+        while True:
+            batch = qs.filter(pk__gt=last_pk) if last_pk is not None else qs
+            batch = list(batch[:batch_size])
+            if not batch:
+                break
+            last_pk = batch[-1][0]
+            for pk, name in batch:
+                if is_sharded(prefix, name):
+                    continue
+                target = sharded_path(prefix, name, migration_token(model, field, pk, name))
+                if self.dry_run:
+                    self.stdout.write(f'{name} -> {target}')
+                    moved += 1
+                    continue
+                if storage.exists(name):
+                    if storage.exists(target):
+                        target = storage.get_available_name(target)
+                    self.move(storage, name, target)
+                elif not storage.exists(target):
+                    # Neither old nor new file: leave the row alone
+                    missing += 1
+                    continue
+                # A previous interrupted run may already have moved the file
+                model._base_manager.filter(pk=pk, **{field.name: name}) \
+                    .update(**{field.name: target})
+                moved += 1
+        return moved, missing
+
+    def move(self, storage, name, target):
+        if isinstance(storage, FileSystemStorage):
+            path = storage.path(target)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(storage.path(name), path)
+        else:
+            with storage.open(name) as f:
+                storage.save(target, f)
+            storage.delete(name)
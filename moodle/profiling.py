@@ -0,0 +1,187 @@
+"""
+On-demand profiling of views.
+
+A request is profiled when one of the following holds:
+  - a staff user adds ?profile=1 to the URL,
+  - it carries a signed PROFILING_HEADER (see <make_token>, or
+    `manage.py list_profiles --token`), for reproducing issues with
+    non-staff accounts,
+  - it is picked at random, PROFILING_SAMPLE_RATE (0 to 1) of all requests.
+
+The view and the rendering of its template run under cProfile, and every
+SQL statement is recorded with its duration and the project frames that
+issued it. Each profile is written to PROFILING_DIR as a pstats dump
+(<name>.prof) and a JSON summary (<name>.json); only the newest
+PROFILING_MAX_PROFILES are kept. `manage.py list_profiles` reads them back.
+"""
+import cProfile
+import json
+import logging
+import os
+import random
+import time
+import traceback
+import uuid
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core import signing
+from django.db import connections
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+TOKEN_SALT = 'moodle.profiling'
+
+
+def _is_project_frame(filename):
+    # A virtualenv may live inside BASE_DIR, skip installed packages too
+    return (filename.startswith(str(settings.BASE_DIR))
+            and 'site-packages' not in filename
+            and filename != __file__)
+
+
+def get_profile_dir():
+    return str(getattr(settings, 'PROFILING_DIR',
+                       os.path.join(settings.BASE_DIR, 'profiles')))
+
+
+def make_token():
+    """Value for the profiling header, valid for PROFILING_TOKEN_MAX_AGE seconds."""
+    return signing.TimestampSigner(salt=TOKEN_SALT).sign(uuid.uuid4().hex)
+
+
+def check_token(token):
+    max_age = getattr(settings, 'PROFILING_TOKEN_MAX_AGE', 60 * 60)
+    try:
+        signing.TimestampSigner(salt=TOKEN_SALT).unsign(token, max_age=max_age)
+    except signing.BadSignature:
+        return False
+    return True
+
+
+class QueryRecorder:
+    """<execute_wrapper> recording SQL, timings and the code that issued them."""
+
+    def __init__(self, alias):
+        self.alias = alias
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append({
+                'alias': self.alias,
+                'sql': sql,
+                'many': many,
+                'time': time.perf_counter() - start,
+                'origin': self.origin(),
+            })
+
+    def origin(self, depth=3):
+        """The innermost project frames on the stack, as 'file:line in func'."""
+        frames = [frame for frame in traceback.extract_stack()[:-2]
+                  if _is_project_frame(frame.filename)]
+        return [f'{os.path.relpath(frame.filename, settings.BASE_DIR)}:'
+                f'{frame.lineno} in {frame.name}' for frame in frames[-depth:]]
+
+
+def profile_trigger(request):
+    """Why <request> should be profiled, or None."""
+    user = getattr(request, 'user', None)
+    if request.GET.get('profile') == '1' and user is not None and user.is_staff:
+        return 'staff'
+    header = getattr(settings, 'PROFILING_HEADER', 'HTTP_X_PROFILE')
+    token = request.META.get(header)
+    if token and check_token(token):
+        return 'header'
+    rate = getattr(settings, 'PROFILING_SAMPLE_RATE', 0)
+    if rate and random.random() < rate:
+        return 'sample'
+    return None
+
+
+def rotate(directory, keep):
+    """Deletes all but the newest <keep> profiles from <directory>."""
+    with os.scandir(directory) as entries:
+        profiles = sorted((entry.stat().st_mtime, entry.name[:-len('.json')])
+                          for entry in entries if entry.name.endswith('.json'))
+    for _, name in profiles[:max(0, len(profiles) - keep)]:
+        for extension in ('.json', '.prof'):
+            try:
+                os.remove(os.path.join(directory, name + extension))
+            except FileNotFoundError:
+                pass
+
+
+def save_profile(profiler, summary):
+    directory = get_profile_dir()
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, summary['id'])
+    profiler.dump_stats(path + '.prof')
+    # JSON last: list_profiles only picks up complete profiles
+    with open(path + '.json', 'w') as f:
+        json.dump(summary, f, indent=1)
+    rotate(directory, getattr(settings, 'PROFILING_MAX_PROFILES', 200))
+
+
+class ProfilingMiddleware:
+    """
+    Profiles the view of selected requests (see <profile_trigger>).
+    Keep it last in MIDDLEWARE: it calls the view itself from <process_view>.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        trigger = profile_trigger(request)
+        if trigger is None:
+            return None
+
+        recorders = [QueryRecorder(alias) for alias in connections]
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for recorder in recorders:
+                stack.enter_context(
+                    connections[recorder.alias].execute_wrapper(recorder))
+            profiler.enable()
+            try:
+                response = view_func(request, *view_args, **view_kwargs)
+                # Template rendering is usually where the time goes
+                if hasattr(response, 'render') and callable(response.render):
+                    response = response.render()
+            finally:
+                profiler.disable()
+        duration = time.perf_counter() - start
+
+        queries = [query for recorder in recorders for query in recorder.queries]
+        name = request.resolver_match.view_name if request.resolver_match else ''
+        profile_id = (f"{timezone.now():%Y%m%d-%H%M%S}-"
+                      f"{(name or 'view').replace(':', '.')}-{uuid.uuid4().hex[:6]}")
+        summary = {
+            'id': profile_id,
+            'created': timezone.now().isoformat(),
+            'view': name,
+            'path': request.get_full_path(),
+            'method': request.method,
+            'status': response.status_code,
+            'trigger': trigger,
+            'user': getattr(getattr(request, 'user', None), 'pk', None),
+            'duration': duration,
+            'sql_time': sum(query['time'] for query in queries),
+            'queries': queries,
+        }
+        try:
+            save_profile(profiler, summary)
+        except OSError:
+            logger.exception('Could not save profile %s', profile_id)
+        else:
+            response['X-Profile-Id'] = profile_id
+        return response
@@ -0,0 +1,143 @@
+"""
+In-process publish/subscribe for live updates.
+
+Subscribers are coroutines on the event loop of an ASGI worker, each holding
+a small asyncio.Queue per channel. Publishers are ordinary (synchronous)
+views and background tasks running on other threads: they hand the message
+to the backend, and the backend of every worker calls <Broker.deliver>,
+which schedules the fan-out on the event loop.
+
+The backend is set with PUBSUB_BACKEND. LocalBackend only reaches
+subscribers of the same process, which is enough for a single ASGI worker
+and for tests. Running several workers (or publishing from management
+commands) needs a backend that broadcasts through a shared server, e.g. Redis
+PUBLISH/SUBSCRIBE or PostgreSQL NOTIFY/LISTEN, implementing BaseBackend.
+
+Messages are strings. A subscriber that falls more than PUBSUB_QUEUE_SIZE
+messages behind has its queue emptied and receives RESET instead, telling
+it to resynchronize rather than replaying everything.
+"""
+import asyncio
+import logging
+import threading
+from contextlib import asynccontextmanager
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+# Queued instead of the messages a slow subscriber missed
+RESET = object()
+
+
+class BaseBackend:
+    """Carries messages between the brokers of every worker process."""
+
+    def publish(self, channel, message):
+        """Sends <message> (a str) to the subscribers of <channel> in every worker."""
+        raise NotImplementedError
+
+    def start(self, deliver):
+        """Calls <deliver(channel, message)> for every message published from
+        now on, from any thread."""
+        raise NotImplementedError
+
+
+class LocalBackend(BaseBackend):
+    """Stand-in backend: delivers to subscribers of this process only."""
+
+    def __init__(self):
+        self.receivers = []
+
+    def publish(self, channel, message):
+        for deliver in list(self.receivers):
+            deliver(channel, message)
+
+    def start(self, deliver):
+        self.receivers.append(deliver)
+
+
+class Broker:
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.loop = None
+        self.started = False
+        self.lock = threading.Lock()
+        # channel -> set of asyncio.Queue, only touched from the event loop
+        self.subscribers = {}
+
+    def publish(self, channel, message):
+        """Thread-safe, may be called from any thread."""
+        try:
+            self.backend.publish(channel, message)
+        except Exception:
+            # Live updates are best effort, never fail the publisher
+            logger.exception('Could not publish to %s', channel)
+
+    def deliver(self, channel, message):
+        """Called by the backend: hands <message> over to the event loop."""
+        loop = self.loop
+        if loop is None:
+            return
+        try:
+            loop.call_soon_threadsafe(self._dispatch, channel, message)
+        except RuntimeError:
+            pass  # The event loop is closed, the worker is shutting down
+
+    def _dispatch(self, channel, message):
+        for queue in self.subscribers.get(channel, ()):
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(RESET)
+
+    def _attach(self, loop):
+        with self.lock:
+            self.loop = loop
+            if not self.started:
+                self.backend.start(self.deliver)
+                self.started = True
+
+    @asynccontextmanager
+    async def subscribe(self, channel):
+        """
+        Usage (on the event loop):
+            async with broker.subscribe(channel) as queue:
+                message = await queue.get()
+        """
+        self._attach(asyncio.get_running_loop())
+        queue = asyncio.Queue(maxsize=getattr(settings, 'PUBSUB_QUEUE_SIZE', 100))
+        self.subscribers.setdefault(channel, set()).add(queue)
+        try:
+            yield queue
+        finally:
+            queues = self.subscribers.get(channel, set())
+            queues.discard(queue)
+            if not queues:
+                self.subscribers.pop(channel, None)
+
+    def subscriber_count(self):
+        return sum(len(queues) for queues in self.subscribers.values())
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """The broker of this process, created with the PUBSUB_BACKEND on first use."""
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                path = getattr(settings, 'PUBSUB_BACKEND', 'moodle.pubsub.LocalBackend')
+                _broker = Broker(import_string(path)())
+    return _broker
+
+
+def publish(channel, message):
+    get_broker().publish(channel, message)
@@ -0,0 +1,130 @@
+"""
+Query-plan regression checks.
+
+Each check rebuilds a query that a view or a background task issues on every
+call, with placeholder ids, and asks the database how it would run it. A
+check fails when the plan reads a whole table instead of going through an
+index, which usually means a migration dropped (or never added) the index the
+query relies on.
+
+Run with `manage.py check_query_plans`. The test suite runs it too.
+"""
+import re
+from collections import namedtuple
+
+from django.db import connections
+
+PlanCheck = namedtuple('PlanCheck', 'label build')
+
+# "SCAN modules_module" / "SCAN TABLE modules_module" (SQLite < 3.36),
+# optionally "... USING [COVERING] INDEX <name>"
+SQLITE_SCAN = re.compile(r'\bSCAN (?:TABLE )?(\w+)(?: USING (?:COVERING )?INDEX (\w+))?')
+POSTGRES_SCAN = re.compile(r'\bSeq Scan on (\w+)')
+
+
+def get_checks():
+    """The queries each hot view and task issues, see the labels."""
+    from django.contrib.contenttypes.models import ContentType
+    from django.db.models import Count, Q
+
+    from analytics.models import ResourceAccessCount, StudentAccessCount
+    from modules.models import File, ImportJob, Module, Resource, Text, Topic
+    from notifications.models import Notification
+
+    Enrollment = Module.students.through
+    return [
+        PlanCheck('modules:manage_list',
+                  lambda: Module.objects.filter(instructor_id=1)),
+        PlanCheck('modules:list?level',
+                  lambda: Module.objects.filter(level='U').annotate(
+                      total_topics=Count('topics', filter=Q(topics__deleted__isnull=True)))),
+        PlanCheck('modules:list?instructor',
+                  lambda: Module.objects.filter(instructor_id=1).annotate(
+                      total_topics=Count('topics', filter=Q(topics__deleted__isnull=True)))),
+        PlanCheck('modules:list?tag',
+                  lambda: Module.objects.filter(id__in=Topic.objects.filter(
+                      tag__slug='python').values('module_id'))),
+        PlanCheck('modules:detail',
+                  lambda: Module.objects.filter(slug='module')),
+        PlanCheck('modules outline',
+                  lambda: Topic.objects.filter(module_id=1)
+                  .annotate(resource_count=Count('resources'))
+                  .order_by('created', 'id')),
+        PlanCheck('modules:resource_list',
+                  lambda: Resource.objects.filter(topic_id=1).order_by('id')),
+        PlanCheck('modules:resource_list items',
+                  lambda: Text.objects.filter(id__in=[1, 2]).defer('content')),
+        PlanCheck('modules:resource_partial',
+                  lambda: Resource.objects.select_related('topic__module').filter(id=1)),
+        PlanCheck('modules:import',
+                  lambda: ImportJob.objects.filter(module_id=1)[:10]),
+        PlanCheck('import item ids',
+                  lambda: File.objects.filter(file__in=['files/ab/cd/a.pdf'])
+                  .values_list('file', 'id')),
+        PlanCheck('students:module_list',
+                  lambda: Module.objects.filter(students__in=[1])),
+        PlanCheck('students:module_detail enrollment',
+                  lambda: Enrollment.objects.filter(module_id=1, customuser_id=1)),
+        PlanCheck('notifications unread count',
+                  lambda: Notification.objects.filter(recipient_id=1, unread=True)),
+        PlanCheck('notifications:list',
+                  lambda: Notification.objects.filter(recipient_id=1)),
+        PlanCheck('notifications digest',
+                  lambda: Notification.objects.filter(unread=True, emailed=False)
+                  .order_by('recipient_id').values_list('recipient_id').distinct()),
+        PlanCheck('notifications fan-out',
+                  lambda: Enrollment.objects.filter(module_id=1).values('customuser_id')),
+        PlanCheck('api:enrollments',
+                  lambda: Module.objects.filter(students=1)),
+        PlanCheck('api:topics',
+                  lambda: Topic.objects.filter(module_id=1)),
+        PlanCheck('api:resources',
+                  lambda: Resource.objects.filter(topic_id=1)),
+        PlanCheck('purge resources',
+                  lambda: Resource.objects.filter(topic_id=1)
+                  .values_list('id', 'resource_type_id', 'object_id')[:200]),
+        PlanCheck('analytics:access resources',
+                  lambda: ResourceAccessCount.objects.filter(module_id=1)
+                  .order_by('-views', '-downloads')[:100]),
+        PlanCheck('analytics:access students',
+                  lambda: StudentAccessCount.objects.filter(module_id=1)
+                  .order_by('-views', '-downloads')[:100]),
+        PlanCheck('access log counters',
+                  lambda: StudentAccessCount.objects.filter(student_id=1, module_id=1)),
+        PlanCheck('collect_garbage references',
+                  lambda: Resource.objects.filter(
+                      resource_type=ContentType.objects.get_for_model(Text))
+                  .values('object_id')),
+    ]
+
+
+def full_scans(queryset):
+    """Tables the plan of <queryset> reads in full."""
+    connection = connections[queryset.db]
+    if connection.vendor == 'sqlite':
+        # Scanning a partial index only reads the rows it was built for
+        return [table for table, index in SQLITE_SCAN.findall(queryset.explain())
+                if not index or index not in _sqlite_partial_indexes(connection, table)]
+    if connection.vendor == 'postgresql':
+        # Tiny test tables are always cheaper to scan: rule that out, any
+        # remaining sequential scan then has no usable index
+        with connection.cursor() as cursor:
+            cursor.execute('SET enable_seqscan = off')
+            try:
+                return POSTGRES_SCAN.findall(queryset.explain())
+            finally:
+                cursor.execute('RESET enable_seqscan')
+    raise NotImplementedError(f'Query plans are not checked on {connection.vendor}.')
+
+
+def _sqlite_partial_indexes(connection, table):
+    with connection.cursor() as cursor:
+        cursor.execute(f'PRAGMA index_list({connection.ops.quote_name(table)})')
+        # (seq, name, unique, origin, partial)
+        return {row[1] for row in cursor.fetchall() if row[4]}
+
+
+def check_query_plans(checks=None):
+    """Returns [(label, tables scanned in full)] for every check."""
+    return [(check.label, full_scans(check.build()))
+            for check in (checks if checks is not None else get_checks())]
@@ -0,0 +1,18 @@
+"""
+Settings of the environment named by MOODLE_ENV: 'dev' (default) or 'prod'.
+
+DJANGO_SETTINGS_MODULE stays 'moodle.settings' everywhere; a deployment only
+sets MOODLE_ENV=prod (plus the variables prod.py requires).
+"""
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+
+MOODLE_ENV = os.environ.get('MOODLE_ENV', 'dev')
+
+if MOODLE_ENV == 'prod':
+    from .prod import *  # noqa: F401,F403
+elif MOODLE_ENV == 'dev':
+    from .dev import *  # noqa: F401,F403
+else:
+    raise ImproperlyConfigured(f"MOODLE_ENV must be 'dev' or 'prod', not {MOODLE_ENV!r}.")
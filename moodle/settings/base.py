@@ -0,0 +1,246 @@
+"""
+Django settings for moodle project, shared by every environment.
+
+Generated by 'django-admin startproject' using Django 3.1.5.
+The environment specific settings are in dev.py and prod.py, see
+__init__.py for how one is picked.
+
+For more information on this file, see
+https://docs.djangoproject.com/en/3.1/topics/settings/
+
+For the full list of settings and their values, see
+https://docs.djangoproject.com/en/3.1/ref/settings/
+"""
+
+from pathlib import Path
+import os
+
+from django.urls import reverse_lazy
+
+# Build paths inside the project like this: BASE_DIR / 'subdir'.
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+
+# SECRET_KEY, DEBUG and ALLOWED_HOSTS are set per environment
+
+
+# Application definition
+
+INSTALLED_APPS = [
+    # Django
+    'django.contrib.admin',
+    'django.contrib.auth',
+    'django.contrib.contenttypes',
+    'django.contrib.sessions',
+    'django.contrib.messages',
+    'django.contrib.staticfiles',
+    # Project package, for its management commands
+    'moodle',
+    # Dev
+    'accounts.apps.AccountsConfig',
+    'modules.apps.ModulesConfig',
+    'students.apps.StudentsConfig',
+    'notifications.apps.NotificationsConfig',
+    'api.apps.ApiConfig',
+    'analytics.apps.AnalyticsConfig',
+    # 'library.apps.LibraryConfig',
+
+    # 3rd party apps
+    'taggit',
+    'crispy_forms',
+    'tinymce',
+    'embed_video',
+    # 'django_autoslug',
+    # Development tools are added in dev.py
+]
+
+# Forms
+CRISPY_TEMPLATE_PACK = 'bootstrap'
+
+# Custom User
+AUTH_USER_MODEL = "accounts.CustomUser"
+
+MIDDLEWARE = [
+    'django.middleware.security.SecurityMiddleware',
+    # Gzips text responses (see moodle/compression.py)
+    'moodle.compression.CompressionMiddleware',
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.middleware.common.CommonMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'accounts.middleware.CachedAuthenticationMiddleware',
+    'moodle.throttling.ThrottleMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    # Last: runs the view itself when a request is profiled
+    'moodle.profiling.ProfilingMiddleware',
+]
+
+ROOT_URLCONF = 'moodle.urls'
+
+TEMPLATES = [
+    {
+        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'DIRS': [str(BASE_DIR.joinpath('templates'))],
+        'APP_DIRS': True,
+        'OPTIONS': {
+            'context_processors': [
+                'django.template.context_processors.debug',
+                'django.template.context_processors.request',
+                'django.contrib.auth.context_processors.auth',
+                'django.contrib.messages.context_processors.messages',
+                'notifications.context_processors.unread_notifications',
+            ],
+        },
+    },
+]
+
+WSGI_APPLICATION = 'moodle.wsgi.application'
+
+
+# Database
+# https://docs.djangoproject.com/en/3.1/ref/settings/#databases
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': str(BASE_DIR / 'db.sqlite3'),
+    }
+}
+
+
+# Cache
+# LocMemCache is per process, fine for a single dev server. Production reads
+# a shared backend from MOODLE_CACHE_URL (see prod.py).
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+# Sessions are read from the cache and only written through to the database
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+
+# Seconds a user/profile snapshot stays cached (see accounts/middleware.py)
+AUTH_USER_CACHE_TIMEOUT = 300
+# Seconds before a cached snapshot's password and is_active are re-checked
+AUTH_USER_RECHECK_INTERVAL = 30
+
+
+# Password validation
+# https://docs.djangoproject.com/en/3.1/ref/settings/#auth-password-validators
+
+AUTH_PASSWORD_VALIDATORS = [
+    {
+        'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.CommonPasswordValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.NumericPasswordValidator',
+    },
+]
+
+
+# Internationalization
+# https://docs.djangoproject.com/en/3.1/topics/i18n/
+
+LANGUAGE_CODE = 'en-us'
+
+TIME_ZONE = 'UTC'
+
+USE_I18N = True
+
+USE_L10N = True
+
+USE_TZ = True
+
+
+# Static files (CSS, JavaScript, Images)
+# https://docs.djangoproject.com/en/3.1/howto/static-files/
+
+STATIC_URL = '/static/'
+STATIC_ROOT = os.path.join(BASE_DIR, 'static/')
+
+MEDIA_URL = '/media/'
+MEDIA_ROOT = os.path.join(BASE_DIR, 'media/')
+
+# Browser cache lifetime (seconds) of static files without a content hash,
+# when served by moodle.staticfiles.StaticFilesMiddleware (hashed ones are
+# cached for a year), and of uploaded media sent by the resource views.
+STATIC_MAX_AGE = 60
+MEDIA_MAX_AGE = 60 * 60
+
+LOGIN_REDIRECT_URL = reverse_lazy('modules:list')
+LOGOUT_REDIRECT_URL = 'home'
+
+EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
+
+X_FRAME_OPTIONS = '*'
+
+# Background tasks (see moodle/tasks.py)
+BACKGROUND_TASKS_WORKERS = 4
+BACKGROUND_TASKS_EAGER = False
+
+# Video metadata (oEmbed) client, use 'modules.oembed.OfflineClient' offline
+VIDEO_METADATA_HTTP_CLIENT = 'modules.oembed.UrllibClient'
+
+# Notifications fan-out: rows inserted per bulk_create
+NOTIFICATIONS_CHUNK_SIZE = 1000
+
+# Throttling per URL name (see moodle/throttling.py), rates as '<count>/<s|m|h|d>'
+THROTTLE_RATES = {
+    'login': {'ip': '30/m', 'account': '5/m'},
+    'signup': {'ip': '10/h'},
+    'student_registration': {'ip': '10/h'},
+    'student_enroll_module': {'ip': '60/m', 'account': '20/m'},
+}
+# Set to e.g. 'HTTP_X_FORWARDED_FOR' when running behind a trusted proxy
+THROTTLE_IP_HEADER = None
+
+# collect_garbage ignores items and files younger than this
+GARBAGE_GRACE_MINUTES = 60
+
+# Rows deleted per transaction when purging soft-deleted modules/topics
+PURGE_BATCH_SIZE = 200
+
+# Bulk imports (see modules/importer.py): storage writer threads, entries per
+# transaction and the largest archive accepted, in entries and in uncompressed
+# bytes per file and in total
+IMPORT_WORKERS = 4
+IMPORT_CHUNK_SIZE = 50
+IMPORT_MAX_ENTRIES = 5000
+IMPORT_MAX_FILE_SIZE = 100 * 1024 * 1024
+IMPORT_MAX_TOTAL_SIZE = 2 * 1024 * 1024 * 1024
+
+# Analytics rollups: days of daily activity kept by compact_rollups
+ANALYTICS_DAILY_RETENTION_DAYS = 90
+
+# Profiling (see moodle/profiling.py): staff add ?profile=1, others send a
+# signed X-Profile header (manage.py list_profiles --token)
+PROFILING_DIR = os.path.join(BASE_DIR, 'profiles')
+PROFILING_MAX_PROFILES = 200
+PROFILING_SAMPLE_RATE = 0.0
+PROFILING_HEADER = 'HTTP_X_PROFILE'
+PROFILING_TOKEN_MAX_AGE = 60 * 60
+
+# Live topic updates (see moodle/sse.py), served by the ASGI application only.
+# LocalBackend reaches the streams of its own process: with several ASGI
+# workers, plug in a backend broadcasting through a shared server
+# (see moodle/pubsub.py)
+PUBSUB_BACKEND = 'moodle.pubsub.LocalBackend'
+PUBSUB_QUEUE_SIZE = 100
+LIVE_EVENTS_PREFIX = '/events/'
+LIVE_EVENTS_HEARTBEAT = 20
+LIVE_EVENTS_MAX_CONNECTIONS = 10000
+
+# Resource access log (see analytics/access.py): buffered events, flushed every
+# ACCESS_LOG_FLUSH_EVENTS events or ACCESS_LOG_FLUSH_INTERVAL seconds
+ACCESS_LOG_BUFFER_SIZE = 10000
+ACCESS_LOG_FLUSH_EVENTS = 500
+ACCESS_LOG_FLUSH_INTERVAL = 5
+ACCESS_LOG_SHUTDOWN_TIMEOUT = 5
+ACCESS_LOG_RETENTION_DAYS = 90
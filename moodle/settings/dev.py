@@ -0,0 +1,18 @@
+"""
+Development settings: debug mode and the development tools.
+"""
+from .base import *  # noqa: F401,F403
+
+# SECURITY WARNING: keep the secret key used in production secret!
+SECRET_KEY = '0pl0jx0#jn*@!v(dbx+878r!t)l&qhyv&h1#b*8*+40t1ke8q0'
+
+# Keeps every SQL query of a request in memory, never in production
+DEBUG = True
+
+ALLOWED_HOSTS = ['*']
+
+# A new list: base.INSTALLED_APPS must stay as it is for prod.py
+INSTALLED_APPS = INSTALLED_APPS + [
+    'factory',
+    'django_extensions',
+]
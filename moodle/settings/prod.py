@@ -0,0 +1,73 @@
+"""
+Production settings. Required environment variables:
+  MOODLE_SECRET_KEY      the secret key,
+  MOODLE_ALLOWED_HOSTS   comma separated host names,
+  MOODLE_CACHE_URL       the cache shared by all workers, memcached://host:port
+                         (comma separated for several servers, needs
+                         python-memcached) or redis://host:port/db (needs
+                         django-redis).
+"""
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+
+from .base import *  # noqa: F401,F403
+
+
+def require_env(name):
+    value = os.environ.get(name)
+    if not value:
+        raise ImproperlyConfigured(f'Set the {name} environment variable.')
+    return value
+
+
+def cache_from_url(url):
+    """CACHES entry for <url>, see MOODLE_CACHE_URL above."""
+    scheme, _, location = url.partition('://')
+    if scheme == 'memcached' and location:
+        return {
+            'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+            'LOCATION': [host.strip() for host in location.split(',') if host.strip()],
+        }
+    if scheme in ('redis', 'rediss') and location:
+        return {
+            'BACKEND': 'django_redis.cache.RedisCache',
+            'LOCATION': url,
+        }
+    raise ImproperlyConfigured(f'Unsupported MOODLE_CACHE_URL: {url}')
+
+
+SECRET_KEY = require_env('MOODLE_SECRET_KEY')
+
+DEBUG = False
+
+ALLOWED_HOSTS = [host.strip() for host in require_env('MOODLE_ALLOWED_HOSTS').split(',')
+                 if host.strip()]
+
+# User snapshots, throttling windows, module outlines, the search version and
+# purge progress must be seen by every worker: no per-process cache here
+CACHES = {'default': cache_from_url(require_env('MOODLE_CACHE_URL'))}
+
+# Templates are compiled once per worker instead of on every render
+TEMPLATES = [{
+    **TEMPLATES[0],
+    'APP_DIRS': False,
+    'OPTIONS': {
+        **TEMPLATES[0]['OPTIONS'],
+        'loaders': [
+            ('django.template.loaders.cached.Loader', [
+                'django.template.loaders.filesystem.Loader',
+                'django.template.loaders.app_directories.Loader',
+            ]),
+        ],
+    },
+}]
+
+# collectstatic writes content-hashed names and .gz/.br variants, served
+# right after SecurityMiddleware: static requests skip the rest (see
+# moodle/staticfiles.py). Uploaded media goes through the resource views.
+STATICFILES_STORAGE = 'moodle.staticfiles.CompressedManifestStaticFilesStorage'
+
+_security = MIDDLEWARE.index('django.middleware.security.SecurityMiddleware') + 1
+MIDDLEWARE = (MIDDLEWARE[:_security] + ['moodle.staticfiles.StaticFilesMiddleware']
+              + MIDDLEWARE[_security:])
@@ -0,0 +1,146 @@
+"""
+Server-Sent Events over raw ASGI.
+
+Django 3.1 cannot stream from an async view, so moodle/asgi.py hands the
+paths below LIVE_EVENTS_PREFIX to EventStream, a plain ASGI application.
+The session is checked once, on a worker thread, when the stream opens.
+From then on an open stream is one coroutine waiting on its broker queue
+(see moodle/pubsub.py): an idle client holds no thread and no database
+connection, so a single event loop keeps thousands of them open.
+
+A comment line is sent every LIVE_EVENTS_HEARTBEAT seconds so that proxies
+don't close quiet streams, and at most LIVE_EVENTS_MAX_CONNECTIONS streams
+are served per worker (503 beyond that: pages simply lose live updates).
+"""
+import asyncio
+import random
+import re
+from importlib import import_module
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.http import HttpRequest
+from django.http.cookie import parse_cookie
+
+from accounts.middleware import get_cached_user
+
+from .pubsub import RESET, get_broker
+
+# Reconnection delay sent to clients, randomized so that the tabs of a
+# restarted worker don't all come back at once
+RETRY_MS = (2000, 10000)
+
+
+def format_event(event, data):
+    """The text/event-stream frame of one event, <data> being a str."""
+    lines = ''.join(f'data: {line}\n' for line in data.split('\n'))
+    return f'event: {event}\n{lines}\n'
+
+
+RESET_FRAME = format_event('reset', '{}')
+
+HEARTBEAT_FRAME = ': ping\n\n'
+
+
+async def respond(send, status, body=b'', headers=()):
+    await send({'type': 'http.response.start', 'status': status,
+                'headers': [(b'content-type', b'text/plain; charset=utf-8'), *headers]})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+def get_session_user(scope):
+    """The user of the session cookie in <scope> (runs on a worker thread)."""
+    cookie = b'; '.join(value for name, value in scope.get('headers', ())
+                        if name == b'cookie')
+    request = HttpRequest()
+    request.COOKIES = parse_cookie(cookie.decode('latin-1'))
+    engine = import_module(settings.SESSION_ENGINE)
+    request.session = engine.SessionStore(
+        request.COOKIES.get(settings.SESSION_COOKIE_NAME))
+    return get_cached_user(request)
+
+
+class EventStream:
+    """
+    ASGI application streaming a broker channel as text/event-stream.
+    <routes> is a list of (path regex, resolve): resolve(user, **groups) runs
+    on a worker thread and returns the channel the user may follow, or None.
+    """
+
+    def __init__(self, routes):
+        self.routes = [(re.compile(pattern), resolve) for pattern, resolve in routes]
+        self.connections = 0
+
+    def match(self, path):
+        for pattern, resolve in self.routes:
+            match = pattern.match(path)
+            if match:
+                return resolve, match.groupdict()
+        return None, None
+
+    def authorize(self, scope, resolve, kwargs):
+        close_old_connections()
+        try:
+            user = get_session_user(scope)
+            if not user.is_authenticated:
+                return None
+            return resolve(user, **kwargs)
+        finally:
+            close_old_connections()
+
+    async def __call__(self, scope, receive, send):
+        resolve, kwargs = self.match(scope['path'])
+        if resolve is None:
+            return await respond(send, 404, b'Not Found')
+        if scope['method'] != 'GET':
+            return await respond(send, 405, b'Method Not Allowed', [(b'allow', b'GET')])
+        if self.connections >= getattr(settings, 'LIVE_EVENTS_MAX_CONNECTIONS', 10000):
+            return await respond(send, 503, b'Too many live connections',
+                                 [(b'retry-after', b'60')])
+        # Not thread_sensitive: that thread runs every sync Django view, a
+        # burst of reconnections would queue page views behind it
+        channel = await sync_to_async(self.authorize, thread_sensitive=False)(
+            scope, resolve, kwargs)
+        if channel is None:
+            return await respond(send, 403, b'Forbidden')
+
+        self.connections += 1
+        try:
+            async with get_broker().subscribe(channel) as queue:
+                await send({'type': 'http.response.start', 'status': 200, 'headers': [
+                    (b'content-type', b'text/event-stream; charset=utf-8'),
+                    (b'cache-control', b'no-cache'),
+                    # Don't let nginx buffer the stream
+                    (b'x-accel-buffering', b'no'),
+                ]})
+                await send({'type': 'http.response.body', 'more_body': True,
+                            'body': f'retry: {random.randint(*RETRY_MS)}\n\n'.encode()})
+                stream = asyncio.ensure_future(self.stream(queue, send))
+                disconnect = asyncio.ensure_future(self.wait_disconnect(receive))
+                done, pending = await asyncio.wait(
+                    {stream, disconnect}, return_when=asyncio.FIRST_COMPLETED)
+                for task in pending:
+                    task.cancel()
+                if stream in done:
+                    stream.result()
+        finally:
+            self.connections -= 1
+
+    async def stream(self, queue, send):
+        heartbeat = getattr(settings, 'LIVE_EVENTS_HEARTBEAT', 20)
+        while True:
+            try:
+                frames = [await asyncio.wait_for(queue.get(), heartbeat)]
+            except asyncio.TimeoutError:
+                frames = [HEARTBEAT_FRAME]
+            # Whatever piled up meanwhile goes out in the same write
+            while not queue.empty():
+                frames.append(queue.get_nowait())
+            body = ''.join(RESET_FRAME if frame is RESET else frame for frame in frames)
+            await send({'type': 'http.response.body', 'body': body.encode(),
+                        'more_body': True})
+
+    async def wait_disconnect(self, receive):
+        while (await receive())['type'] != 'http.disconnect':
+            pass
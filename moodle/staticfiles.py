@@ -0,0 +1,197 @@
+"""
+Static and media delivery without a separate web server.
+
+<CompressedManifestStaticFilesStorage> is used by collectstatic: every file
+gets a copy named after a hash of its content (base.css -> base.5af66c1b.css,
+templates link to it through {% static %}) and every text file a gzip, and
+when brotli is installed a brotli, variant written next to it:
+
+    admin/css/base.5af66c1b.css
+    admin/css/base.5af66c1b.css.gz
+    admin/css/base.5af66c1b.css.br
+
+<StaticFilesMiddleware> answers STATIC_URL requests before the rest of the
+stack runs (no session, no user, no database). Files are looked up in an
+index of STATIC_ROOT built on the first request and the smallest variant the
+client accepts is sent. Hashed names never change content and are cached for
+a year as immutable, other static files for STATIC_MAX_AGE seconds.
+
+Uploaded media is not public: views check access to the Resource first, then
+answer with <serve_media>. Only raster images and videos are shown inline,
+anything else (HTML, SVG, PDF...) is sent as an attachment so it never runs
+in the site's origin, and only the browser may cache it (MEDIA_MAX_AGE).
+"""
+import json
+import mimetypes
+import os
+import posixpath
+import re
+import threading
+from collections import namedtuple
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+from django.http import FileResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+from .compression import accepted_encodings, available_encodings, compress, is_compressible
+
+IMMUTABLE_MAX_AGE = 60 * 60 * 24 * 365
+
+# Files smaller than this aren't worth a compressed variant
+MIN_COMPRESS_SIZE = 256
+
+# Uploads safe to display inline
+INLINE_MEDIA_TYPES = re.compile(r'^(image/(png|jpeg|gif|webp|bmp)|video/)')
+
+
+def content_type(name):
+    content_type, _ = mimetypes.guess_type(name)
+    return content_type or 'application/octet-stream'
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    ManifestStaticFilesStorage that also writes a compressed variant of each
+    text file it collects, when that variant is smaller.
+    """
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        names = set(paths) | set(self.hashed_files.values())
+        for name in sorted(names):
+            self.compress(name)
+
+    def compress(self, name):
+        """Writes the .gz (and .br) variants of <name>, returns their names."""
+        if not is_compressible(content_type(name)):
+            return []
+        with self.open(name) as file:
+            content = file.read()
+        if len(content) < MIN_COMPRESS_SIZE:
+            return []
+        written = []
+        for encoding, extension in available_encodings():
+            compressed = compress(content, encoding)
+            if len(compressed) >= len(content):
+                continue
+            if self.exists(name + extension):
+                self.delete(name + extension)
+            written.append(self._save(name + extension, ContentFile(compressed)))
+        return written
+
+
+StaticFile = namedtuple('StaticFile', 'variants content_type immutable')
+
+
+def index_static_files(root):
+    """
+    {name: StaticFile} for the files collected in <root>.
+    <variants> maps each encoding ('' for none) to the path sent for it.
+    """
+    hashed = set()
+    manifest = os.path.join(root, ManifestStaticFilesStorage.manifest_name)
+    if os.path.exists(manifest):
+        with open(manifest) as file:
+            hashed = set(json.load(file).get('paths', {}).values())
+    extensions = {extension: encoding for encoding, extension in available_encodings()}
+
+    files = {}
+    for directory, _, filenames in os.walk(root):
+        for filename in filenames:
+            path = os.path.join(directory, filename)
+            name = os.path.relpath(path, root).replace(os.sep, '/')
+            base, extension = os.path.splitext(name)
+            encoding = extensions.get(extension, '')
+            # A .gz file without its original was collected as such
+            if encoding and os.path.exists(os.path.join(root, base)):
+                name = base
+            else:
+                encoding = ''
+            entry = files.setdefault(name, StaticFile({}, content_type(name), name in hashed))
+            entry.variants[encoding] = path
+    return files
+
+
+def serve_file(request, path, content_type, cache_control, encoding=''):
+    """FileResponse for <path>, or 304 when the client's copy is current."""
+    stat = os.stat(path)
+    if not was_modified_since(request.META.get('HTTP_IF_MODIFIED_SINCE'),
+                              stat.st_mtime, stat.st_size):
+        response = HttpResponseNotModified()
+    else:
+        response = FileResponse(open(path, 'rb'), content_type=content_type)
+        # Set by FileResponse from the file name, which may be the .gz one
+        del response['Content-Disposition']
+        if encoding:
+            response['Content-Encoding'] = encoding
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    response['Cache-Control'] = cache_control
+    return response
+
+
+class StaticFilesMiddleware:
+    """Serves STATIC_URL ahead of the rest of the middleware."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.static_prefix = settings.STATIC_URL
+        self.static_max_age = getattr(settings, 'STATIC_MAX_AGE', 60)
+        self._files = None
+        self._files_lock = threading.Lock()
+
+    def __call__(self, request):
+        response = None
+        path = request.path_info
+        if (request.method in ('GET', 'HEAD') and self.static_prefix
+                and path.startswith(self.static_prefix)):
+            response = self.serve_static(request, path[len(self.static_prefix):])
+        return response or self.get_response(request)
+
+    @property
+    def files(self):
+        # STATIC_ROOT only changes with a deployment (collectstatic and restart)
+        if self._files is None:
+            with self._files_lock:
+                if self._files is None:
+                    self._files = index_static_files(settings.STATIC_ROOT)
+        return self._files
+
+    def serve_static(self, request, name):
+        static_file = self.files.get(name)
+        if static_file is None:
+            return None
+        accepted = accepted_encodings(request)
+        encoding = next((encoding for encoding, _ in available_encodings()
+                         if encoding in static_file.variants and encoding in accepted), '')
+        if static_file.immutable:
+            cache_control = f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+        else:
+            cache_control = f'public, max-age={self.static_max_age}'
+        response = serve_file(request, static_file.variants[encoding],
+                              static_file.content_type, cache_control, encoding)
+        if len(static_file.variants) > 1:
+            patch_vary_headers(response, ('Accept-Encoding',))
+        return response
+
+
+def serve_media(file, as_attachment=False):
+    """
+    Response sending the uploaded <file> (a FieldFile), once the view has
+    checked the user may read it. Types not safe to display inline are
+    always sent as attachments.
+    """
+    name = posixpath.basename(file.name)
+    media_type = content_type(name)
+    inline = not as_attachment and INLINE_MEDIA_TYPES.match(media_type)
+    response = FileResponse(file.storage.open(file.name, 'rb'), content_type=media_type,
+                            as_attachment=not inline, filename=name)
+    response['Content-Length'] = file.size
+    # Never stored by shared caches: access depends on the user
+    response['Cache-Control'] = f"private, max-age={getattr(settings, 'MEDIA_MAX_AGE', 3600)}"
+    return response
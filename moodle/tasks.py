@@ -0,0 +1,56 @@
+"""
+Minimal in-process background task runner.
+
+Work that must not block a request (remote calls, fan-outs, purges) is
+submitted to a small thread pool. Tasks scheduled from inside a transaction
+should use <enqueue_on_commit> so they only run once the data they read has
+been committed.
+
+Set BACKGROUND_TASKS_EAGER = True to run tasks inline (tests, shell sessions).
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, connections, transaction
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Lazily creates the shared thread pool (one per process)."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'BACKGROUND_TASKS_WORKERS', 4),
+                    thread_name_prefix='moodle-task')
+    return _executor
+
+
+def _run(func, args, kwargs):
+    close_old_connections()
+    try:
+        return func(*args, **kwargs)
+    except Exception:
+        logger.exception('Background task %s failed', func.__qualname__)
+    finally:
+        # Worker threads keep their own connections, release them after each task
+        connections.close_all()
+
+
+def run_in_background(func, *args, **kwargs):
+    """Runs <func> on the task pool, or inline when BACKGROUND_TASKS_EAGER is set."""
+    if getattr(settings, 'BACKGROUND_TASKS_EAGER', False):
+        return func(*args, **kwargs)
+    return get_executor().submit(_run, func, args, kwargs)
+
+
+def enqueue_on_commit(func, *args, **kwargs):
+    """Schedules <func> once the current transaction commits."""
+    transaction.on_commit(lambda: run_in_background(func, *args, **kwargs))
@@ -0,0 +1,361 @@
+import gzip
+import os
+import re
+import subprocess
+import sys
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import CustomUser
+from modules.models import File, Module, Resource, Text, Topic
+from .management.commands.migrate_media import migration_token
+from .profiling import check_token, make_token
+from .storage import ShardedUploadTo, is_sharded, sharded_path
+from .throttling import FixedWindowCounter, parse_rate
+
+# Several times what a production worker needs today: the budget catches a
+# heavy import slipping into startup, not machine jitter. Slow CI machines
+# can raise it through the environment.
+SETUP_BUDGET = float(os.environ.get('MOODLE_SETUP_BUDGET', 2.0))
+IMPORT_BUDGET = float(os.environ.get('MOODLE_IMPORT_BUDGET', 2.0))
+
+# "import time: self [us] | cumulative | imported package"
+IMPORT_TIME = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|\s*(\S+)')
+
+PROBE = '''
+import time
+start = time.perf_counter()
+import django
+django.setup()
+print(time.perf_counter() - start)
+'''
+
+
+def measure_startup(env):
+    """
+    Boots Django with the <env> settings in a fresh interpreter.
+    Returns (django.setup() seconds, total import seconds, imported modules).
+    """
+    environ = dict(os.environ, DJANGO_SETTINGS_MODULE='moodle.settings', MOODLE_ENV=env,
+                   MOODLE_SECRET_KEY='startup-budget', MOODLE_ALLOWED_HOSTS='localhost',
+                   MOODLE_CACHE_URL='memcached://127.0.0.1:11211')
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', PROBE],
+                            cwd=settings.BASE_DIR, env=environ,
+                            capture_output=True, text=True, check=True)
+    imports = [IMPORT_TIME.match(line) for line in result.stderr.splitlines()]
+    imports = [match for match in imports if match]
+    return (float(result.stdout.split()[-1]),
+            sum(int(match[1]) for match in imports) / 1e6,
+            {match[3] for match in imports})
+
+
+class StartupBudgetTests(SimpleTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.setup_time, cls.import_time, cls.modules = measure_startup('prod')
+
+    def test_setup_within_budget(self):
+        self.assertLess(self.setup_time, SETUP_BUDGET)
+
+    def test_imports_within_budget(self):
+        self.assertLess(self.import_time, IMPORT_BUDGET,
+                        f'{len(self.modules)} modules imported at startup')
+
+    def test_dev_only_packages_not_loaded(self):
+        for module in ('django_extensions', 'factory', 'faker'):
+            self.assertNotIn(module, self.modules)
+
+
+class ProdCacheTests(SimpleTestCase):
+
+    def boot_prod(self, **environ):
+        """Boots the prod settings in a fresh interpreter, prints the cache LOCATION."""
+        base = {name: value for name, value in os.environ.items() if name != 'MOODLE_CACHE_URL'}
+        environ = dict(base, DJANGO_SETTINGS_MODULE='moodle.settings', MOODLE_ENV='prod',
+                       MOODLE_SECRET_KEY='cache', MOODLE_ALLOWED_HOSTS='localhost', **environ)
+        return subprocess.run(
+            [sys.executable, '-c', 'import django; django.setup(); from django.conf import '
+                                   'settings; print(settings.CACHES["default"]["LOCATION"])'],
+            cwd=settings.BASE_DIR, env=environ, capture_output=True, text=True)
+
+    def test_startup_fails_without_shared_cache(self):
+        result = self.boot_prod()
+        self.assertNotEqual(result.returncode, 0)
+        self.assertIn('Set the MOODLE_CACHE_URL environment variable', result.stderr)
+
+        result = self.boot_prod(MOODLE_CACHE_URL='locmem://')
+        self.assertNotEqual(result.returncode, 0)
+        self.assertIn('Unsupported MOODLE_CACHE_URL', result.stderr)
+
+    def test_cache_from_url(self):
+        result = self.boot_prod(MOODLE_CACHE_URL='memcached://a:11211,b:11211')
+        self.assertEqual(result.stdout.strip(), "['a:11211', 'b:11211']")
+        result = self.boot_prod(MOODLE_CACHE_URL='redis://cache:6379/1')
+        self.assertEqual(result.stdout.strip(), 'redis://cache:6379/1')
+
+
+class StaticFilesTests(TestCase):
+
+    def setUp(self):
+        source = tempfile.TemporaryDirectory()
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(source.cleanup)
+        self.addCleanup(root.cleanup)
+        with open(os.path.join(source.name, 'site.css'), 'w') as file:
+            file.write('body { color: black; }\n' * 100)
+        middleware = list(settings.MIDDLEWARE)
+        middleware.insert(1, 'moodle.staticfiles.StaticFilesMiddleware')
+        settings_override = override_settings(
+            STATICFILES_DIRS=[source.name], STATIC_ROOT=root.name,
+            STATICFILES_FINDERS=['django.contrib.staticfiles.finders.FileSystemFinder'],
+            STATICFILES_STORAGE='moodle.staticfiles.CompressedManifestStaticFilesStorage',
+            MIDDLEWARE=middleware)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        call_command('collectstatic', interactive=False, verbosity=0, stdout=StringIO())
+        self.hashed = next(name for name in os.listdir(root.name)
+                           if re.match(r'site\.[0-9a-f]{12}\.css$', name))
+
+    def test_hashed_file_is_immutable_and_compressed(self):
+        response = self.client.get(f'/static/{self.hashed}', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertIn('Accept-Encoding', response['Vary'])
+        body = gzip.decompress(b''.join(response.streaming_content))
+        self.assertTrue(body.startswith(b'body { color: black; }'))
+
+    def test_plain_file_for_clients_without_gzip(self):
+        response = self.client.get('/static/site.css', HTTP_ACCEPT_ENCODING='gzip;q=0')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertNotIn('immutable', response['Cache-Control'])
+        self.assertEqual(self.client.get('/static/missing.css').status_code, 404)
+
+    def test_pages_are_gzipped(self):
+        response = self.client.get('/accounts/login/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+
+
+class MediaLayoutTests(TestCase):
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        media_override = override_settings(MEDIA_ROOT=media.name)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+        self.media_root = media.name
+        self.user = CustomUser.objects.create(username='teacher', email='teacher@example.com')
+
+    def legacy_file(self, name, content):
+        path = os.path.join(self.media_root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as file:
+            file.write(content)
+        return File.objects.create(creator=self.user, title=name, file=name)
+
+    def migrate(self, *args):
+        out = StringIO()
+        call_command('migrate_media', *args, stdout=out)
+        return out.getvalue()
+
+    def test_upload_to(self):
+        upload_to = ShardedUploadTo('files')
+        first, second = upload_to(None, 'notes.pdf'), upload_to(None, 'C:\\docs\\notes.pdf')
+        self.assertTrue(is_sharded('files', first) and is_sharded('files', second))
+        self.assertTrue(first.endswith('/notes.pdf') and second.endswith('/notes.pdf'))
+        # Same name, random directory
+        self.assertNotEqual(first, second)
+        self.assertEqual({upload_to, ShardedUploadTo('files')}, {upload_to})
+
+    def test_migrate_in_batches(self):
+        files = [self.legacy_file(f'legacy/{n}/notes.pdf', str(n)) for n in range(3)]
+        self.assertIn('modules.File.file: moved 3, missing on disk 0.',
+                      self.migrate('--batch-size', '1'))
+        names = set()
+        for n, item in enumerate(files):
+            item.refresh_from_db()
+            self.assertTrue(is_sharded('files', item.file.name))
+            with item.file.open('r') as file:
+                self.assertEqual(file.read(), str(n))
+            names.add(item.file.name)
+        self.assertEqual(len(names), 3)
+        self.assertFalse(os.path.exists(os.path.join(self.media_root, 'legacy/0/notes.pdf')))
+        self.assertIn('moved 0,', self.migrate())
+
+    def test_dry_run_moves_nothing(self):
+        item = self.legacy_file('legacy/notes.pdf', 'x')
+        self.assertIn('legacy/notes.pdf -> files/', self.migrate('--dry-run'))
+        item.refresh_from_db()
+        self.assertEqual(item.file.name, 'legacy/notes.pdf')
+
+    def test_resumes_interrupted_run(self):
+        item = self.legacy_file('legacy/notes.pdf', 'x')
+        field = File._meta.get_field('file')
+        # A previous run moved the file, then stopped before updating the row
+        target = sharded_path('files', item.file.name,
+                              migration_token(File, field, item.pk, item.file.name))
+        os.makedirs(os.path.dirname(os.path.join(self.media_root, target)))
+        os.replace(os.path.join(self.media_root, 'legacy/notes.pdf'),
+                   os.path.join(self.media_root, target))
+        self.assertIn('moved 1, missing on disk 0', self.migrate())
+        item.refresh_from_db()
+        self.assertEqual(item.file.name, target)
+
+
+class ThrottleTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_fixed_window(self):
+        counter = FixedWindowCounter(cache, 'throttle:test', capacity=2, period=60)
+        self.assertEqual([counter.consume(now=61), counter.consume(now=70)], [0, 0])
+        self.assertEqual(counter.consume(now=110), 10)
+        # A new window starts over, whatever was used just before
+        self.assertEqual(counter.consume(now=120), 0)
+
+    @mock.patch.object(ModelBackend, 'authenticate', return_value=None)
+    def test_login_throttled_before_authentication(self, authenticate):
+        capacity, _ = parse_rate(settings.THROTTLE_RATES['login']['account'])
+        for _ in range(capacity):
+            response = self.client.post(reverse('login'),
+                                        {'username': 'Jane', 'password': 'guess'})
+            self.assertEqual(response.status_code, 200)
+        # Same account, whatever the case
+        response = self.client.post(reverse('login'), {'username': 'jane ', 'password': 'guess'})
+        self.assertEqual(response.status_code, 429)
+        self.assertTrue(int(response['Retry-After']) > 0)
+        self.assertEqual(authenticate.call_count, capacity)
+
+
+class GarbageCollectionTests(TestCase):
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        media_override = override_settings(MEDIA_ROOT=media.name, GARBAGE_GRACE_MINUTES=60)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+        self.media_root = media.name
+        user = CustomUser.objects.create(username='teacher', email='teacher@example.com')
+        module = Module.objects.create(code='GC1', title='Garbage', overview='-', instructor=user)
+        topic = Topic.objects.create(module=module, title='Week 1')
+
+        def upload(name):
+            return File.objects.create(creator=user, title=name,
+                                       file=SimpleUploadedFile(name, b'%PDF-1.4'))
+
+        self.kept = upload('kept.pdf')
+        Resource.objects.create(topic=topic, item=self.kept)
+        self.orphan = upload('orphan.pdf')
+        self.orphan_text = Text.objects.create(creator=user, title='Orphan', content='-')
+        self.recent = upload('recent.pdf')
+        self.stray = self.media_file('files/old/stray.pdf')
+        self.recent_stray = self.media_file('files/new/stray.pdf')
+
+        # Everything but the "recent" objects is past the grace period
+        old = timezone.now() - timedelta(hours=2)
+        File.objects.exclude(pk=self.recent.pk).update(created=old)
+        Text.objects.update(created=old)
+        for name in (self.kept.file.name, self.orphan.file.name, self.stray):
+            path = os.path.join(self.media_root, name)
+            os.utime(path, (old.timestamp(), old.timestamp()))
+
+    def media_file(self, name):
+        path = os.path.join(self.media_root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as file:
+            file.write(b'stray')
+        return name
+
+    def exists(self, name):
+        return os.path.exists(os.path.join(self.media_root, name))
+
+    def test_dry_run_deletes_nothing(self):
+        out = StringIO()
+        call_command('collect_garbage', '--dry-run', stdout=out)
+        self.assertIn('Would delete 1 orphaned modules.File item(s).', out.getvalue())
+        self.assertIn(self.stray, out.getvalue())
+        self.assertEqual(File.objects.count(), 3)
+        self.assertTrue(self.exists(self.orphan.file.name) and self.exists(self.stray))
+
+    def test_collects_orphans_only(self):
+        out = StringIO()
+        call_command('collect_garbage', '--batch-size', '1', stdout=out)
+        self.assertIn('Deleted 1 orphaned modules.Text item(s).', out.getvalue())
+        self.assertIn('Deleted 1 unreferenced file(s)', out.getvalue())
+        self.assertEqual(set(File.objects.values_list('pk', flat=True)),
+                         {self.kept.pk, self.recent.pk})
+        self.assertFalse(Text.objects.exists())
+        self.assertFalse(self.exists(self.orphan.file.name) or self.exists(self.stray))
+        for name in (self.kept.file.name, self.recent.file.name, self.recent_stray):
+            self.assertTrue(self.exists(name), name)
+
+
+class ProfilingTests(TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        settings_override = override_settings(PROFILING_DIR=self.directory,
+                                              PROFILING_SAMPLE_RATE=0.0)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def profiles(self):
+        return sorted(name for name in os.listdir(self.directory) if name.endswith('.json'))
+
+    def test_sampling(self):
+        self.assertNotIn('X-Profile-Id', self.client.get('/'))
+        with override_settings(PROFILING_SAMPLE_RATE=1.0):
+            response = self.client.get('/')
+        profile_id = response['X-Profile-Id']
+        self.assertEqual(self.profiles(), [f'{profile_id}.json'])
+        self.assertTrue(os.path.exists(os.path.join(self.directory, f'{profile_id}.prof')))
+        out = StringIO()
+        call_command('list_profiles', stdout=out)
+        self.assertIn(f'{profile_id}  GET /  200', out.getvalue())
+        self.assertIn('[sample]', out.getvalue())
+
+    def test_signed_token(self):
+        token = make_token()
+        self.assertTrue(check_token(token))
+        self.assertFalse(check_token(token + 'x'))
+        with override_settings(PROFILING_TOKEN_MAX_AGE=-1):
+            self.assertFalse(check_token(token))
+        self.assertNotIn('X-Profile-Id', self.client.get('/', HTTP_X_PROFILE=token[:-1]))
+        self.assertIn('X-Profile-Id', self.client.get('/', HTTP_X_PROFILE=token))
+
+    def test_staff_only_query_parameter(self):
+        user = CustomUser.objects.create(username='student', email='student@example.com')
+        self.client.force_login(user)
+        self.assertNotIn('X-Profile-Id', self.client.get('/', {'profile': '1'}))
+        CustomUser.objects.filter(pk=user.pk).update(is_staff=True)
+        self.assertIn('X-Profile-Id', self.client.get('/', {'profile': '1'}))
+
+    @override_settings(PROFILING_SAMPLE_RATE=1.0, PROFILING_MAX_PROFILES=2)
+    def test_rotation_keeps_newest(self):
+        ids = []
+        for _ in range(3):
+            ids.append(self.client.get('/')['X-Profile-Id'])
+            # Distinct modification times, newest last
+            for extension in ('.json', '.prof'):
+                path = os.path.join(self.directory, ids[-1] + extension)
+                os.utime(path, (len(ids), len(ids)))
+        self.assertEqual(self.profiles(), sorted(f'{profile_id}.json' for profile_id in ids[1:]))
+        self.assertFalse(os.path.exists(os.path.join(self.directory, f'{ids[0]}.prof')))
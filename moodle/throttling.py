@@ -0,0 +1,140 @@
+"""
+Request throttling for the authentication and enrollment endpoints.
+
+Rates are configured per URL name in THROTTLE_RATES, with an optional
+per-IP and per-account counter:
+
+    THROTTLE_RATES = {
+        'login': {'ip': '20/m', 'account': '5/m'},
+    }
+
+Each counter admits N requests per fixed window of its period (see
+<FixedWindowCounter>), counted with a single atomic <cache.incr>, so
+concurrent workers sharing the cache never over-admit within a window. The check runs in <process_view>,
+before the view, so throttled requests never reach password hashing or the
+database.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+
+PERIODS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 60 * 60 * 24}
+
+# POST field holding the account identifier, per URL name
+ACCOUNT_FIELDS = {
+    'login': 'username',
+    'signup': 'email',
+    'student_registration': 'email',
+}
+
+
+def parse_rate(rate):
+    """'5/m' -> (5, 60)"""
+    count, period = rate.split('/')
+    return int(count), PERIODS[period[0]]
+
+
+class FixedWindowCounter:
+    """
+    Admits <capacity> requests per window of <period> seconds, counted in the
+    cache under one key per window.
+
+    Windows are aligned on multiples of <period>, not on the first request:
+    a client can use its whole allowance at the end of one window and again
+    at the start of the next, i.e. up to 2 x <capacity> requests within
+    <period> seconds. The rates are set with that burst in mind.
+    """
+
+    def __init__(self, cache, key, capacity, period):
+        self.cache = cache
+        self.key = key
+        self.capacity = capacity
+        self.period = period
+
+    def consume(self, now=None):
+        """Counts a request. Returns 0 when allowed, else seconds until the next window."""
+        now = now or time.time()
+        window = int(now // self.period)
+        key = f'{self.key}:{window}'
+        # add() is a no-op when the key exists, incr() is atomic
+        self.cache.add(key, 0, timeout=self.period)
+        try:
+            used = self.cache.incr(key)
+        except ValueError:
+            # The key expired between add() and incr()
+            self.cache.set(key, 1, timeout=self.period)
+            used = 1
+        if used <= self.capacity:
+            return 0
+        return max(1, int(self.period - now % self.period))
+
+
+def get_client_ip(request):
+    header = getattr(settings, 'THROTTLE_IP_HEADER', None)
+    if header and request.META.get(header):
+        # First address of a proxy chain ("client, proxy1, proxy2")
+        return request.META[header].split(',')[0].strip()
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def get_account(request, url_name):
+    if request.user.is_authenticated:
+        return str(request.user.pk)
+    field = ACCOUNT_FIELDS.get(url_name)
+    value = request.POST.get(field, '') if field else ''
+    return value.strip().lower()
+
+
+def _digest(value):
+    # Keeps cache keys short and free of user-supplied characters
+    return hashlib.md5(value.encode()).hexdigest()
+
+
+class ThrottleMiddleware:
+    """
+    Rejects requests with 429 once any of their counters is over its rate.
+    Only unsafe methods are throttled, so rendering the forms stays free.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.rates = {
+            name: {scope: parse_rate(rate) for scope, rate in scopes.items()}
+            for name, scopes in getattr(settings, 'THROTTLE_RATES', {}).items()
+        }
+        self.cache = caches[getattr(settings, 'THROTTLE_CACHE', 'default')]
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if request.method in ('GET', 'HEAD', 'OPTIONS'):
+            return None
+        url_name = request.resolver_match.url_name if request.resolver_match else None
+        scopes = self.rates.get(url_name)
+        if not scopes:
+            return None
+
+        idents = {'ip': get_client_ip(request)}
+        if 'account' in scopes:
+            idents['account'] = get_account(request, url_name)
+        for scope, (capacity, period) in scopes.items():
+            ident = idents.get(scope)
+            if not ident:
+                continue
+            counter = FixedWindowCounter(self.cache,
+                                         f'throttle:{url_name}:{scope}:{_digest(ident)}',
+                                         capacity, period)
+            retry_after = counter.consume()
+            if retry_after:
+                return self.throttled(retry_after)
+        return None
+
+    def throttled(self, retry_after):
+        response = HttpResponse('Too many requests, please try again later.',
+                                status=429, content_type='text/plain')
+        response['Retry-After'] = str(retry_after)
+        return response
@@ -31,7 +31,10 @@ urlpatterns = [
     path('accounts/', include('django.contrib.auth.urls')),
     path('', TemplateView.as_view(template_name='home.html'), name='home'),
     path('students/', include('students.urls')),
-    path('modules/', include('modules.urls')), ]
+    path('modules/', include('modules.urls')),
+    path('notifications/', include('notifications.urls')),
+    path('api/', include('api.urls')),
+    path('analytics/', include('analytics.urls')), ]
 
 if settings.DEBUG:
     urlpatterns += static(settings.STATIC_URL,
@@ -0,0 +1,9 @@
+from django.contrib import admin
+from .models import Notification
+
+
+@admin.register(Notification)
+class NotificationAdmin(admin.ModelAdmin):
+    list_display = ['recipient', 'verb', 'resource', 'created', 'unread']
+    list_filter = ['verb', 'unread', 'emailed']
+    raw_id_fields = ['recipient', 'resource']
@@ -0,0 +1,11 @@
+from django.utils.functional import SimpleLazyObject
+
+from .services import get_unread_count
+
+
+def unread_notifications(request):
+    """Lazily exposes the unread count, only templates that use it pay for it."""
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        return {}
+    return {'unread_notifications': SimpleLazyObject(lambda: get_unread_count(user))}
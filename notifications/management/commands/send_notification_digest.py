@@ -0,0 +1,53 @@
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.core.management.base import BaseCommand
+from django.template.loader import render_to_string
+
+from notifications.models import Notification
+
+
+class Command(BaseCommand):
+    help = ('Emails each student a digest of their unread notifications '
+            'through the configured EMAIL_BACKEND.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200,
+                            help='Number of recipients per batch.')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        pending = (Notification.objects
+                   .filter(unread=True, emailed=False)
+                   .order_by('recipient_id')
+                   .values_list('recipient_id', flat=True)
+                   .distinct())
+        recipient_ids = list(pending)
+        connection = get_connection()
+        sent = 0
+        for start in range(0, len(recipient_ids), batch_size):
+            batch = recipient_ids[start:start + batch_size]
+            sent += self.send_batch(connection, batch)
+        self.stdout.write(self.style.SUCCESS(f'Sent {sent} digest(s).'))
+
+    def send_batch(self, connection, recipient_ids):
+        notifications = (Notification.objects
+                         .filter(recipient_id__in=recipient_ids,
+                                 unread=True, emailed=False)
+                         .select_related('recipient', 'resource__topic__module'))
+        by_recipient = {}
+        for notification in notifications:
+            by_recipient.setdefault(notification.recipient, []).append(notification)
+
+        messages = []
+        for recipient, items in by_recipient.items():
+            body = render_to_string('notifications/digest_email.txt',
+                                    {'user': recipient, 'notifications': items})
+            messages.append(EmailMessage(
+                subject=f'{len(items)} new update(s) in your modules',
+                body=body,
+                from_email=settings.DEFAULT_FROM_EMAIL,
+                to=[recipient.email]))
+        connection.send_messages(messages)
+        ids = [n.id for items in by_recipient.values() for n in items]
+        Notification.objects.filter(id__in=ids).update(emailed=True)
+        return len(messages)
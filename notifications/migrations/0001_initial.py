@@ -0,0 +1,38 @@
+# Generated by Django 3.1.14 on 2026-10-19 19:17
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('modules', '0002_video_metadata'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Notification',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('verb', models.PositiveSmallIntegerField(choices=[(1, 'New resource')], default=1)),
+                ('created', models.DateTimeField(default=django.utils.timezone.now)),
+                ('unread', models.BooleanField(default=True)),
+                ('emailed', models.BooleanField(default=False)),
+                ('recipient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to=settings.AUTH_USER_MODEL)),
+                ('resource', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to='modules.resource')),
+            ],
+            options={
+                'ordering': ['-created'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['recipient', 'unread'], name='notificatio_recipie_8bedf2_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.1.14 on 2026-10-19 20:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(condition=models.Q(('emailed', False), ('unread', True)), fields=['recipient'], name='notification_digest_idx'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+from django.conf import settings
+from django.db import models
+from django.db.models import Q
+from django.utils import timezone
+
+from modules.models import Resource
+
+
+class Notification(models.Model):
+    """
+        One row per (student, event). Kept deliberately narrow (two FKs, a
+        small integer verb and two flags) since a single publish to a large
+        module inserts thousands of rows.
+    """
+    RESOURCE_PUBLISHED = 1
+
+    VERB_CHOICES = [
+        (RESOURCE_PUBLISHED, 'New resource'),
+    ]
+
+    recipient = models.ForeignKey(settings.AUTH_USER_MODEL,
+                                  related_name='notifications',
+                                  on_delete=models.CASCADE)
+    resource = models.ForeignKey(Resource,
+                                 related_name='notifications',
+                                 on_delete=models.CASCADE)
+    verb = models.PositiveSmallIntegerField(choices=VERB_CHOICES,
+                                            default=RESOURCE_PUBLISHED)
+    created = models.DateTimeField(default=timezone.now)
+    unread = models.BooleanField(default=True)
+    emailed = models.BooleanField(default=False)
+
+    class Meta:
+        ordering = ['-created']
+        indexes = [
+            models.Index(fields=['recipient', 'unread']),
+            # Recipients of the email digest: only the few rows still pending
+            models.Index(fields=['recipient'], name='notification_digest_idx',
+                         condition=Q(unread=True, emailed=False)),
+        ]
+
+    def __str__(self):
+        return f'{self.get_verb_display()} for {self.recipient_id}'
@@ -0,0 +1,94 @@
+"""
+Notification fan-out and unread counters.
+
+Publishing only schedules the fan-out; the rows are inserted in chunks by a
+background task so the instructor's request returns immediately, whatever the
+size of the module.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from modules.models import Module, Resource
+from moodle.tasks import enqueue_on_commit
+from .models import Notification
+
+UNREAD_CACHE_KEY = 'notifications:unread:{}'
+UNREAD_CACHE_TIMEOUT = 60 * 60
+
+
+def _chunk_size():
+    return getattr(settings, 'NOTIFICATIONS_CHUNK_SIZE', 1000)
+
+
+def notify_resource_published(resource):
+    """Schedules the fan-out for a newly created Resource."""
+    enqueue_on_commit(fan_out_resource_published, resource.id)
+
+
+def fan_out_resource_published(resource_id):
+    """
+    Background task: inserts one Notification per enrolled student using
+    <bulk_create> in chunks, then drops the cached unread counts of that chunk.
+    Returns the number of notifications created.
+    """
+    resource = (Resource.objects.select_related('topic')
+                .filter(id=resource_id).first())
+    if resource is None:
+        return 0
+
+    chunk_size = _chunk_size()
+    # Read the m2m table directly, no need to join the user table
+    student_ids = (Module.students.through.objects
+                   .filter(module_id=resource.topic.module_id)
+                   .order_by('customuser_id')
+                   .values_list('customuser_id', flat=True))
+    created = 0
+    chunk = []
+    for student_id in student_ids.iterator(chunk_size=chunk_size):
+        chunk.append(student_id)
+        if len(chunk) >= chunk_size:
+            created += _create_chunk(resource.id, chunk)
+            chunk = []
+    if chunk:
+        created += _create_chunk(resource.id, chunk)
+    return created
+
+
+def _create_chunk(resource_id, student_ids):
+    Notification.objects.bulk_create(
+        [Notification(recipient_id=student_id, resource_id=resource_id,
+                      verb=Notification.RESOURCE_PUBLISHED)
+         for student_id in student_ids],
+        batch_size=_chunk_size())
+    cache.delete_many([UNREAD_CACHE_KEY.format(pk) for pk in student_ids])
+    return len(student_ids)
+
+
+def get_unread_count(user):
+    """Unread notifications of <user>, counted once and then served from cache."""
+    key = UNREAD_CACHE_KEY.format(user.pk)
+    count = cache.get(key)
+    if count is None:
+        count = Notification.objects.filter(recipient=user, unread=True).count()
+        cache.set(key, count, UNREAD_CACHE_TIMEOUT)
+    return count
+
+
+def mark_all_read(user):
+    Notification.objects.filter(recipient=user, unread=True).update(unread=False)
+    cache.set(UNREAD_CACHE_KEY.format(user.pk), 0, UNREAD_CACHE_TIMEOUT)
+
+
+def forget_unread_counts(resource_ids):
+    """
+    Call before deleting Resources: their Notifications go with them (CASCADE,
+    in bulk and without signals), so the cached unread counts they were part
+    of are dropped once the deletion is committed. One query per call.
+    """
+    recipient_ids = (Notification.objects
+                     .filter(resource_id__in=list(resource_ids), unread=True)
+                     .order_by().values_list('recipient_id', flat=True).distinct())
+    keys = [UNREAD_CACHE_KEY.format(pk) for pk in recipient_ids]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
@@ -0,0 +1,81 @@
+from io import StringIO
+from unittest import mock
+
+from django.core import mail
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from accounts.models import CustomUser
+from modules.models import Module, Resource, Text, Topic
+from modules.purge import soft_delete_topics
+from .models import Notification
+from .services import fan_out_resource_published, get_unread_count, mark_all_read
+
+
+class NotificationsMixin:
+    students = 5
+
+    def setUp(self):
+        cache.clear()
+        instructor = CustomUser.objects.create(username='teacher', email='teacher@example.com')
+        self.module = Module.objects.create(code='NOT1', title='Notified', overview='-',
+                                            instructor=instructor)
+        self.users = [CustomUser.objects.create(username=f'student{i}',
+                                                email=f'student{i}@example.com')
+                      for i in range(self.students)]
+        self.module.students.add(*self.users)
+        topic = Topic.objects.create(module=self.module, title='Week 1')
+        self.resource = Resource.objects.create(topic=topic, item=Text.objects.create(
+            creator=instructor, title='Notes', content='-'))
+
+
+class NotificationTests(NotificationsMixin, TestCase):
+
+    @override_settings(NOTIFICATIONS_CHUNK_SIZE=2)
+    def test_fan_out_in_chunks(self):
+        self.assertEqual(get_unread_count(self.users[0]), 0)
+        with mock.patch.object(Notification.objects, 'bulk_create',
+                               wraps=Notification.objects.bulk_create) as bulk_create:
+            self.assertEqual(fan_out_resource_published(self.resource.pk), self.students)
+        self.assertEqual([len(call.args[0]) for call in bulk_create.call_args_list], [2, 2, 1])
+        # The cached count was dropped with the insert
+        self.assertEqual(get_unread_count(self.users[0]), 1)
+        mark_all_read(self.users[0])
+        self.assertEqual(get_unread_count(self.users[0]), 0)
+
+    def test_digest(self):
+        fan_out_resource_published(self.resource.pk)
+        mark_all_read(self.users[0])
+        out = StringIO()
+        call_command('send_notification_digest', '--batch-size', '2', stdout=out)
+        self.assertIn(f'Sent {self.students - 1} digest(s).', out.getvalue())
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox),
+                         [user.email for user in self.users[1:]])
+        self.assertFalse(Notification.objects.filter(unread=True, emailed=False).exists())
+        call_command('send_notification_digest', stdout=out)
+        self.assertIn('Sent 0 digest(s).', out.getvalue())
+
+
+@override_settings(BACKGROUND_TASKS_EAGER=True, PURGE_BATCH_SIZE=2)
+class CascadeTests(NotificationsMixin, TransactionTestCase):
+
+    def test_purge_drops_unread_counts(self):
+        topic = self.resource.topic
+        resources = [self.resource] + [
+            Resource.objects.create(topic=topic, item=Text.objects.create(
+                creator=self.users[0], title='More', content='-'))
+            for _ in range(3)]
+        for resource in resources:
+            fan_out_resource_published(resource.pk)
+        self.assertEqual(get_unread_count(self.users[0]), 4)
+
+        with CaptureQueriesContext(connection) as queries:
+            soft_delete_topics([topic])
+        # Resources are fast-deleted: one notifications lookup per batch
+        lookups = [query for query in queries.captured_queries
+                   if query['sql'].startswith('SELECT DISTINCT "notifications_notification"')]
+        self.assertEqual(len(lookups), 2)
+        self.assertEqual(get_unread_count(self.users[0]), 0)
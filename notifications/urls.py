@@ -0,0 +1,9 @@
+from django.urls import path
+from .views import notification_list_view, notification_mark_read_view
+
+app_name = 'notifications'
+
+urlpatterns = [
+    path('', notification_list_view, name='list'),
+    path('read/', notification_mark_read_view, name='mark_read'),
+]
@@ -0,0 +1,35 @@
+from django.contrib.auth.mixins import LoginRequiredMixin
+from django.shortcuts import redirect
+from django.views.generic.base import View
+from django.views.generic.list import ListView
+
+from .models import Notification
+from .services import mark_all_read
+
+
+class NotificationListView(LoginRequiredMixin, ListView):
+    """
+    Lists the latest notifications of the current user.
+    """
+    template_name = 'notifications/list.html'
+    context_object_name = 'notifications'
+    paginate_by = 50
+
+    def get_queryset(self):
+        return (Notification.objects
+                .filter(recipient=self.request.user)
+                .select_related('resource__topic__module')
+                .prefetch_related('resource__item'))
+
+
+notification_list_view = NotificationListView.as_view()
+
+
+class NotificationMarkReadView(LoginRequiredMixin, View):
+
+    def post(self, request):
+        mark_all_read(request.user)
+        return redirect('notifications:list')
+
+
+notification_mark_read_view = NotificationMarkReadView.as_view()
@@ -1,3 +1,16 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import ModuleProgress, WaitlistEntry
+
+
+@admin.register(WaitlistEntry)
+class WaitlistEntryAdmin(admin.ModelAdmin):
+    list_display = ['module', 'student', 'created']
+    list_filter = ['module']
+
+
+@admin.register(ModuleProgress)
+class ModuleProgressAdmin(admin.ModelAdmin):
+    list_display = ['module', 'student', 'completed_count', 'updated']
+    list_filter = ['module']
+    readonly_fields = ['completed', 'completed_count']
@@ -3,3 +3,8 @@ from django.apps import AppConfig
 
 class StudentsConfig(AppConfig):
     name = 'students'
+
+    def ready(self):
+        # Keeps Module seat counters in sync with m2m changes and progress
+        # bitmaps with removed Resources
+        from . import signals  # noqa: F401
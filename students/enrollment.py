@@ -0,0 +1,140 @@
+"""
+Capacity-limited enrollment with a first come, first served waitlist.
+
+Seats are taken with a single conditional UPDATE:
+
+    UPDATE modules_module SET seats_taken = seats_taken + 1
+    WHERE id = %s AND (capacity IS NULL OR seats_taken < capacity)
+
+The database evaluates the condition and the increment atomically on the
+locked row, so concurrent enrollers can never overbook a Module, and nobody
+holds a lock while counting enrollments. The enrollment row is inserted in
+the same transaction as the seat it uses.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.dispatch import Signal
+
+from modules.models import Module
+from .models import WaitlistEntry
+
+ENROLLED = 'enrolled'
+WAITLISTED = 'waitlisted'
+ALREADY_ENROLLED = 'already_enrolled'
+
+Enrollment = Module.students.through
+
+# Sent with <module_id> and <delta> (students added, negative when removed)
+# inside the transaction of the change: what receivers write is committed or
+# rolled back with the enrollment itself
+enrollment_changed = Signal()
+
+
+def send_enrollment_changed(module_id, delta):
+    if delta:
+        enrollment_changed.send(sender=Module, module_id=module_id, delta=delta)
+
+
+def is_enrolled(module_id, user_id):
+    return Enrollment.objects.filter(module_id=module_id, customuser_id=user_id).exists()
+
+
+def take_seat(module_id):
+    """Takes a free seat of the Module. Returns False when it is full."""
+    return bool(Module.objects.filter(pk=module_id)
+                .filter(Q(capacity__isnull=True) | Q(seats_taken__lt=F('capacity')))
+                .update(seats_taken=F('seats_taken') + 1))
+
+
+def release_seat(module_id):
+    Module.all_objects.filter(pk=module_id, seats_taken__gt=0) \
+        .update(seats_taken=F('seats_taken') - 1)
+
+
+def _add_student(module_id, user_id):
+    """Inserts the enrollment for a seat already taken. False if it exists."""
+    try:
+        with transaction.atomic():
+            Enrollment.objects.create(module_id=module_id, customuser_id=user_id)
+    except IntegrityError:
+        # The same student enrolling twice at once
+        release_seat(module_id)
+        return False
+    return True
+
+
+def enroll(module, user):
+    """
+    Enrolls <user> in <module>, or puts them on its waitlist when it is full.
+    Returns ENROLLED, WAITLISTED or ALREADY_ENROLLED.
+    """
+    if is_enrolled(module.pk, user.pk):
+        return ALREADY_ENROLLED
+    with transaction.atomic():
+        if take_seat(module.pk):
+            if not _add_student(module.pk, user.pk):
+                return ALREADY_ENROLLED
+            WaitlistEntry.objects.filter(module_id=module.pk, student_id=user.pk).delete()
+            send_enrollment_changed(module.pk, 1)
+            return ENROLLED
+        try:
+            with transaction.atomic():
+                WaitlistEntry.objects.get_or_create(module_id=module.pk, student_id=user.pk)
+        except IntegrityError:
+            pass  # Queued by a concurrent request
+    return WAITLISTED
+
+
+def waitlist_position(module, user):
+    """1-based position of <user> on the waitlist of <module>, or None."""
+    entry = (WaitlistEntry.objects.filter(module_id=module.pk, student_id=user.pk)
+             .values('created', 'id').first())
+    if entry is None:
+        return None
+    ahead = WaitlistEntry.objects.filter(module_id=module.pk).filter(
+        Q(created__lt=entry['created']) |
+        Q(created=entry['created'], id__lt=entry['id'])).count()
+    return ahead + 1
+
+
+def unenroll(module, user):
+    """Removes <user> from <module> (or its waitlist) and fills the freed seat."""
+    with transaction.atomic():
+        deleted, _ = Enrollment.objects.filter(module_id=module.pk,
+                                               customuser_id=user.pk).delete()
+        if deleted:
+            release_seat(module.pk)
+            send_enrollment_changed(module.pk, -1)
+        WaitlistEntry.objects.filter(module_id=module.pk, student_id=user.pk).delete()
+    if deleted:
+        promote_waitlist(module.pk)
+    return bool(deleted)
+
+
+def promote_waitlist(module_id):
+    """
+    Enrolls waitlisted students, oldest first, while the Module has free seats.
+    Returns the ids of the promoted students.
+    """
+    promoted = []
+    while True:
+        with transaction.atomic():
+            # The seat UPDATE locks the Module row: promotions of one Module
+            # run one at a time until this transaction commits
+            if not take_seat(module_id):
+                break
+            entry = WaitlistEntry.objects.filter(module_id=module_id).first()
+            if entry is None:
+                release_seat(module_id)
+                break
+            entry.delete()
+            if _add_student(module_id, entry.student_id):
+                promoted.append(entry.student_id)
+                send_enrollment_changed(module_id, 1)
+    return promoted
+
+
+def recount_seats(module_id):
+    """Resynchronizes <seats_taken> after enrollments changed outside this module."""
+    Module.all_objects.filter(pk=module_id).update(
+        seats_taken=Enrollment.objects.filter(module_id=module_id).count())
@@ -0,0 +1,55 @@
+"""
+Single-pass loader for the student module player.
+
+Builds everything the player template needs in a fixed number of queries:
+  1. enrollment check,
+  2. the cached outline (Module + instructor, Topics with resource counts),
+     only queried when the cache is cold,
+  3. the selected Topic's Resources, plus one query per item type (item
+     bodies are fetched later through the resource partial endpoint),
+  4. the student's completion bitmap (see students/progress.py).
+Previous/next links come from the outline, so moving between topics only runs
+the enrollment check and the resources query.
+"""
+from django.http import Http404
+
+from modules.live import topic_events_url
+from modules.models import Module
+from modules.outline import get_outline, load_resources
+from .progress import is_set, load_completed, percent, popcount
+
+
+def load_module_player(user, module_id, topic_id=None):
+    enrolled = (Module.students.through.objects
+                .filter(module_id=module_id, customuser_id=user.pk).exists())
+    outline = get_outline(module_id) if enrolled else None
+    if outline is None:
+        raise Http404('No module found matching the query')
+
+    topics = outline['topics']
+    index = 0
+    if topic_id is not None:
+        positions = [i for i, t in enumerate(topics) if t.id == int(topic_id)]
+        if not positions:
+            raise Http404('No topic found matching the query')
+        index = positions[0]
+
+    topic = topics[index] if topics else None
+    resources = []
+    if topic is not None:
+        resources = load_resources(topic.id)
+    completed = load_completed(user.pk, module_id)
+    for resource in resources:
+        resource.done = is_set(completed, resource.slot)
+    return {
+        'module': outline['module'],
+        'topics': topics,
+        'topic': topic,
+        'resources': resources,
+        'progress': percent(popcount(completed),
+                            sum(t.resource_count for t in topics)),
+        # Live "resource" events of the topic (see modules/live.py)
+        'events_url': topic_events_url(topic.id) if topic else None,
+        'previous_topic': topics[index - 1] if topic and index > 0 else None,
+        'next_topic': topics[index + 1] if index + 1 < len(topics) else None,
+    }
@@ -0,0 +1,32 @@
+# Generated by Django 3.1.14 on 2026-10-19 19:57
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('modules', '0010_resource_slots'),
+        ('students', '0001_waitlist'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ModuleProgress',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('completed', models.BinaryField(default=b'')),
+                ('completed_count', models.PositiveIntegerField(default=0)),
+                ('updated', models.DateTimeField(auto_now=True)),
+                ('module', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='progress', to='modules.module')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='module_progress', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'module progress',
+                'unique_together': {('student', 'module')},
+            },
+        ),
+    ]
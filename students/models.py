@@ -1,3 +1,54 @@
+from django.conf import settings
 from django.db import models
 
-# Create your models here.
+from modules.models import Module
+
+
+class WaitlistEntry(models.Model):
+    """
+        A student waiting for a seat in a full Module.
+        Entries are served first come, first served (see students/enrollment.py).
+    """
+    module = models.ForeignKey(Module,
+                               related_name='waitlist',
+                               on_delete=models.CASCADE)
+    student = models.ForeignKey(settings.AUTH_USER_MODEL,
+                                related_name='waitlisted',
+                                on_delete=models.CASCADE)
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['created', 'id']
+        unique_together = ('module', 'student')
+        indexes = [
+            models.Index(fields=['module', 'created'],
+                         name='waitlist_module_created_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.student} waiting for {self.module}'
+
+
+class ModuleProgress(models.Model):
+    """
+        The Resources of a Module a student has completed, one row per
+        student and Module: bit <slot> of <completed> is set when the Resource
+        with that slot is done, <completed_count> caches the number of set
+        bits (see students/progress.py).
+    """
+    module = models.ForeignKey(Module,
+                               related_name='progress',
+                               on_delete=models.CASCADE)
+    student = models.ForeignKey(settings.AUTH_USER_MODEL,
+                                related_name='module_progress',
+                                on_delete=models.CASCADE)
+    completed = models.BinaryField(default=b'')
+    completed_count = models.PositiveIntegerField(default=0)
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('student', 'module')
+        verbose_name_plural = 'module progress'
+
+    def __str__(self):
+        return f'{self.student} in {self.module}: {self.completed_count} done'
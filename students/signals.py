@@ -0,0 +1,67 @@
+from django.db.models.signals import m2m_changed
+from django.dispatch import receiver
+
+from modules.models import Module
+from modules.signals import resources_hidden, resources_removed
+from moodle.tasks import enqueue_on_commit
+from .enrollment import (Enrollment, promote_waitlist, recount_seats,
+                         send_enrollment_changed)
+from .progress import forget_slots
+
+
+@receiver(m2m_changed, sender=Enrollment)
+def sync_seats(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Keeps <seats_taken> right, and reports the change, when students are added
+    or removed through the m2m manager (e.g. the admin).
+    students/enrollment.py doesn't go through it.
+    """
+    if action == 'pre_clear':
+        # Remember what clear() is about to remove
+        if reverse:
+            instance._cleared_module_ids = list(
+                Enrollment.objects.filter(customuser_id=instance.pk)
+                .values_list('module_id', flat=True))
+        else:
+            instance._cleared_students = Enrollment.objects.filter(
+                module_id=instance.pk).count()
+        return
+    if action == 'pre_remove':
+        # <pk_set> is what was asked for, remember what is actually enrolled
+        if reverse:
+            removed = (Enrollment.objects.filter(customuser_id=instance.pk, module_id__in=pk_set)
+                       .values_list('module_id', flat=True))
+        else:
+            removed = (Enrollment.objects.filter(module_id=instance.pk, customuser_id__in=pk_set)
+                       .values_list('customuser_id', flat=True))
+        instance._removed_pks = set(removed)
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if action == 'post_remove':
+        pk_set = getattr(instance, '_removed_pks', pk_set)
+    sign = 1 if action == 'post_add' else -1
+    if not reverse:
+        # module.students.add(...): one Module, <pk_set> holds students
+        removed = getattr(instance, '_cleared_students', 0)
+        changes = {instance.pk: -removed if action == 'post_clear'
+                   else sign * len(pk_set or ())}
+    elif action == 'post_clear':
+        changes = {pk: -1 for pk in getattr(instance, '_cleared_module_ids', [])}
+    else:
+        changes = {pk: sign for pk in pk_set or ()}
+    for module_id, delta in changes.items():
+        recount_seats(module_id)
+        if action != 'post_add':
+            promote_waitlist(module_id)
+        send_enrollment_changed(module_id, delta)
+
+
+@receiver([resources_removed, resources_hidden])
+def forget_removed_resources(sender, module_id, slots=(), hidden=False, **kwargs):
+    """
+    Clears the slots of removed Resources from the students' progress, as soon
+    as their Topic is hidden (not again when it is purged).
+    """
+    if module_id is not None and slots and not hidden:
+        enqueue_on_commit(forget_slots, module_id, list(slots))
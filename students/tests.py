@@ -1,3 +1,197 @@
-from django.test import TestCase
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
-# Create your tests here.
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.db import OperationalError, connections
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+
+from accounts.models import CustomUser
+from analytics.rollups import rebuild_summaries
+from modules.models import Module, Resource, Text, Topic
+from modules.purge import soft_delete_topics
+from modules.signals import resources_added
+from .enrollment import (ENROLLED, WAITLISTED, Enrollment, enroll,
+                         promote_waitlist, unenroll)
+from .loaders import load_module_player
+from .models import ModuleProgress, WaitlistEntry
+from .progress import forget_slots, mark, set_slots, with_progress
+
+
+def retry_locked(func, *args):
+    """
+    SQLite has a single writer and reports a busy database instead of queueing
+    like PostgreSQL does; retry the whole call, as a client would.
+    """
+    while True:
+        try:
+            return func(*args)
+        except OperationalError as e:
+            if 'locked' not in str(e):
+                raise
+            time.sleep(0.001)
+
+
+class EnrollmentConcurrencyTests(TransactionTestCase):
+    students = 300
+    capacity = 50
+    workers = 16
+
+    def setUp(self):
+        CustomUser.objects.bulk_create([
+            CustomUser(username=f'student{i}', email=f'student{i}@example.com')
+            for i in range(self.students)])
+        self.users = list(CustomUser.objects.order_by('id'))
+        self.module = Module.objects.create(code='CONC1', title='Concurrency',
+                                            overview='-', capacity=self.capacity)
+
+    def enroll_all(self):
+        barrier = threading.Barrier(self.workers)
+
+        def worker(users):
+            barrier.wait()
+            try:
+                return [retry_locked(enroll, self.module, user) for user in users]
+            finally:
+                connections.close_all()
+
+        batches = [self.users[i::self.workers] for i in range(self.workers)]
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            results = [status for batch in pool.map(worker, batches) for status in batch]
+        return results, time.perf_counter() - start
+
+    def test_no_overbooking(self):
+        results, elapsed = self.enroll_all()
+
+        self.assertEqual(results.count(ENROLLED), self.capacity)
+        self.assertEqual(results.count(WAITLISTED), self.students - self.capacity)
+        self.assertEqual(Enrollment.objects.filter(module=self.module).count(), self.capacity)
+        self.assertEqual(Module.objects.get(pk=self.module.pk).seats_taken, self.capacity)
+        self.assertEqual(WaitlistEntry.objects.filter(module=self.module).count(),
+                         self.students - self.capacity)
+        # Every enroller got an answer, without piling up behind locks
+        self.assertLess(elapsed, 60)
+
+    def test_waitlist_is_promoted_in_order(self):
+        self.enroll_all()
+        waiting = list(WaitlistEntry.objects.filter(module=self.module)
+                       .values_list('student_id', flat=True)[:3])
+        leaving = Enrollment.objects.filter(module=self.module) \
+            .values_list('customuser_id', flat=True)[:3]
+        for user in CustomUser.objects.filter(id__in=list(leaving)):
+            self.assertTrue(unenroll(self.module, user))
+
+        enrolled = set(Enrollment.objects.filter(module=self.module)
+                       .values_list('customuser_id', flat=True))
+        self.assertTrue(set(waiting) <= enrolled)
+        self.assertEqual(len(enrolled), self.capacity)
+        self.assertEqual(Module.objects.get(pk=self.module.pk).seats_taken, self.capacity)
+
+    def test_raising_capacity_promotes(self):
+        self.enroll_all()
+        Module.objects.filter(pk=self.module.pk).update(capacity=self.capacity + 10)
+        self.assertEqual(len(promote_waitlist(self.module.pk)), 10)
+        self.assertEqual(Enrollment.objects.filter(module=self.module).count(),
+                         self.capacity + 10)
+
+
+class ProgressTests(TestCase):
+
+    def setUp(self):
+        self.instructor = CustomUser.objects.create(username='teacher', email='teacher@example.com')
+        self.student = CustomUser.objects.create(username='student', email='student@example.com')
+        self.module = Module.objects.create(code='PROG1', title='Progress', overview='-',
+                                            instructor=self.instructor)
+        topic = Topic.objects.create(module=self.module, title='Topic', description='')
+        self.resources = [
+            Resource.objects.create(topic=topic, item=Text.objects.create(
+                creator=self.instructor, title=f'Text {i}', content='-'))
+            for i in range(10)]
+        resources_added.send(sender=Resource, module_id=self.module.pk,
+                             count=len(self.resources), size=0)
+        enroll(self.module, self.student)
+
+    def test_bitmap(self):
+        self.assertEqual(set_slots(b'', [0, 9]), b'\x01\x02')
+        self.assertEqual(set_slots(b'\x01\x02', [9], done=False), b'\x01')
+        self.assertEqual([r.slot for r in self.resources], list(range(10)))
+
+    def test_module_list_progress_in_one_query(self):
+        for resource in self.resources[:3]:
+            mark(self.student.pk, self.module.pk, resource.slot)
+        mark(self.student.pk, self.module.pk, self.resources[0].slot, done=False)
+        modules = with_progress(Module.objects.filter(students=self.student), self.student.pk)
+        with self.assertNumQueries(1):
+            module, = modules
+        self.assertEqual((module.completed, module.total_resources, module.progress_percent),
+                         (2, 10, 20))
+
+    def test_removed_resources_are_forgotten(self):
+        for resource in self.resources[:3]:
+            mark(self.student.pk, self.module.pk, resource.slot)
+        # What the resources_removed receiver runs once the removal commits
+        self.assertEqual(forget_slots(self.module.pk, [self.resources[1].slot]), 1)
+        progress = ModuleProgress.objects.get(student=self.student, module=self.module)
+        self.assertEqual(progress.completed_count, 2)
+
+
+class ModulePlayerTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.instructor = CustomUser.objects.create(username='teacher', email='teacher@example.com',
+                                                    first_name='Ada', last_name='Byron')
+        self.student = CustomUser.objects.create(username='student', email='student@example.com')
+        self.module = Module.objects.create(code='PLAY1', title='Player', overview='-',
+                                            instructor=self.instructor)
+        self.topics = [Topic.objects.create(module=self.module, title=f'Week {n}')
+                       for n in range(3)]
+        for topic in self.topics:
+            Resource.objects.create(topic=topic, item=Text.objects.create(
+                creator=self.instructor, title='Notes', content='-'))
+        enroll(self.module, self.student)
+        # Loaded once per process, not per request
+        ContentType.objects.get_for_model(Text)
+
+    def test_fixed_number_of_queries(self):
+        # Enrollment, Module, Topics, Resources, Text items, completion bitmap
+        with self.assertNumQueries(6):
+            player = load_module_player(self.student, self.module.pk)
+        self.assertEqual(len(player['resources']), 1)
+        # Warm outline: the same for every topic, however many topics there are
+        for topic in self.topics:
+            with self.assertNumQueries(4):
+                load_module_player(self.student, self.module.pk, topic.pk)
+
+    def test_progress_matches_module_list(self):
+        rebuild_summaries([self.module.pk])
+        first = Resource.objects.get(topic=self.topics[0])
+        mark(self.student.pk, self.module.pk, first.slot)
+        soft_delete_topics([self.topics[2]])
+
+        modules = with_progress(Module.objects.filter(pk=self.module.pk), self.student.pk)
+        player = load_module_player(self.student, self.module.pk)
+        self.assertEqual((modules[0].total_resources, modules[0].progress_percent),
+                         (2, player['progress']))
+        # A recount agrees with the running total
+        rebuild_summaries([self.module.pk], storage=False)
+        modules = with_progress(Module.objects.filter(pk=self.module.pk), self.student.pk)
+        self.assertEqual(modules[0].total_resources, 2)
+
+    def test_topic_description_is_shown(self):
+        Topic.objects.filter(pk=self.topics[1].pk).update(
+            description='**Read** first', description_html='<p><strong>Read</strong> first</p>')
+        self.client.force_login(self.student)
+        response = self.client.get(reverse('student_module_detail_topic',
+                                           args=[self.module.pk, self.topics[1].pk]))
+        self.assertContains(response, '<p><strong>Read</strong> first</p>', html=True)
+
+    def test_instructor_rename_refreshes_outline(self):
+        load_module_player(self.student, self.module.pk)
+        self.instructor.first_name = 'Augusta'
+        self.instructor.save()
+        player = load_module_player(self.student, self.module.pk)
+        self.assertEqual(player['module'].instructor.first_name, 'Augusta')
@@ -8,12 +8,21 @@ urlpatterns = [
     # Modules
     path('enroll/',
          views.StudentEnrollModuleView.as_view(), name='student_enroll_module'),
+    path('unenroll/',
+         views.StudentUnenrollModuleView.as_view(), name='student_unenroll_module'),
     path('modules/', views.StudentModuleListView.as_view(),
          name='student_module_list'),
-    path('module/<pk>/', views.StudentModuleDetailView.as_view(),
+    path('module/<int:pk>/', views.StudentModuleDetailView.as_view(),
          name='student_module_detail'),
+    path('module/<int:pk>/<int:topic_id>/',
+         views.StudentModuleDetailView.as_view(),
+         name='student_module_detail_topic'),
 
     # Topics
     path('module/topic/<topic_id>/', views.StudentTopicDetailView.as_view(),
          name='student_topic_detail'),
+
+    # Resources
+    path('resource/<int:id>/complete/', views.StudentResourceCompleteView.as_view(),
+         name='student_resource_complete'),
 ]
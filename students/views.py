@@ -1,6 +1,8 @@
-from django.shortcuts import render
+from django.http import Http404
+from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse_lazy
-from django.contrib.auth import authenticate, login
+from django.contrib import messages
+from django.contrib.auth import login
 from django.views.generic.edit import CreateView, FormView
 from django.views.generic.list import ListView
 from django.views.generic.detail import DetailView
@@ -8,9 +10,12 @@ from django.contrib.auth.mixins import LoginRequiredMixin
 from django.views.generic.base import TemplateResponseMixin, View
 
 from accounts.forms import CustomUserCreationForm
+from .enrollment import WAITLISTED, enroll, is_enrolled, unenroll, waitlist_position
 from .forms import ModuleEnrollForm
+from .loaders import load_module_player
 from .mixins import StudentModuleMixin
-from modules.models import Module, Topic
+from .progress import mark, with_progress
+from modules.models import Module, Resource, Topic
 
 
 class StudentRegistrationView(CreateView):
@@ -20,13 +25,13 @@ class StudentRegistrationView(CreateView):
 
     def form_valid(self, form):
         """
-        Authenticates the student after they register.
+        Logs the student in after they register.
+        The new user is logged in directly: calling authenticate() would hash
+        the password a second time.
         """
         result = super().form_valid(form)
-        cd = form.cleaned_data
-        user = authenticate(username=cd['username'],
-                            password=cd['password1'])
-        login(self.request, user)
+        login(self.request, self.object,
+              backend='django.contrib.auth.backends.ModelBackend')
         return result
 
 
@@ -39,20 +44,43 @@ class StudentEnrollModuleView(LoginRequiredMixin, FormView):
     module = None
     form_class = ModuleEnrollForm
 
+    status = None
+
     def form_valid(self, form):
         # Get the Module from the form data
         self.module = form.cleaned_data['module']
-        print(self.module)
-        # Add the user to the set of enrolled students
-        self.module.students.add(self.request.user)
+        # Takes a seat, or a place on the waitlist when the Module is full
+        self.status = enroll(self.module, self.request.user)
+        if self.status == WAITLISTED:
+            position = waitlist_position(self.module, self.request.user)
+            messages.info(self.request,
+                          f'"{self.module}" is full. You are number {position} '
+                          f'on the waitlist and will be enrolled when a seat frees up.')
         return super().form_valid(form)
 
     def get_success_url(self):
+        if self.status == WAITLISTED:
+            return self.module.get_absolute_url()
         # URL to redirect student to in case of successfull enrollment
         return reverse_lazy('student_module_detail',
                             args=[self.module.id])
 
 
+class StudentUnenrollModuleView(LoginRequiredMixin, FormView):
+    """
+    Removes the Student from a Module (or its waitlist).
+    The freed seat goes to the first student on the waitlist.
+    """
+    form_class = ModuleEnrollForm
+    success_url = reverse_lazy('student_module_list')
+
+    def form_valid(self, form):
+        module = form.cleaned_data['module']
+        if unenroll(module, self.request.user):
+            messages.success(self.request, f'You left "{module}".')
+        return super().form_valid(form)
+
+
 class StudentModuleListView(LoginRequiredMixin, StudentModuleMixin, ListView):
     """
     A list view for Students to see Modules they're enrolled in.
@@ -60,28 +88,46 @@ class StudentModuleListView(LoginRequiredMixin, StudentModuleMixin, ListView):
     template_name = 'student/module/list.html'
     context_object_name = 'modules'
 
+    def get_queryset(self):
+        # Progress of every enrollment comes with the Modules, same query
+        return with_progress(super().get_queryset(), self.request.user.pk)
+
 
-class StudentModuleDetailView(StudentModuleMixin, DetailView):
+class StudentModuleDetailView(LoginRequiredMixin, TemplateResponseMixin, View):
+    """
+    The module player: outline of the Module and the content of one Topic
+    (the first one unless <topic_id> is given). See students/loaders.py.
+    """
     template_name = 'student/module/detail.html'
-    context_object_name = 'modules'
 
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        module = self.get_object()
-        if 'topic_id' in self.kwargs:
-            # Get the topic
-            context['topic'] = module.topics.get(id=self.kwargs['topic_id'])
-        else:
-            # Get the first topic
-            context['topic'] = module.topics.all()[0]
-        return context
+    def get(self, request, pk, topic_id=None):
+        context = load_module_player(request.user, pk, topic_id)
+        return self.render_to_response(context)
 
 
-class StudentTopicDetailView(StudentModuleMixin, View):
-    template_name = 'manage/topic/resource_list.html'
-    context_object_name = 'topics'
+class StudentTopicDetailView(LoginRequiredMixin, View):
+    """
+    Topics are shown in the module player, which also follows their live
+    updates: redirect there (the player checks the enrollment).
+    """
 
     def get(self, request, topic_id):
-        topic = get_object_or_404(
-            Topic, id=topic_id, module__students__in=request.user)
-        return self.render_to_response({'topic': topic})
+        topic = get_object_or_404(Topic, id=topic_id)
+        return redirect('student_module_detail_topic', topic.module_id, topic.id)
+
+
+class StudentResourceCompleteView(LoginRequiredMixin, View):
+    """
+    Marks a Resource as done (or, with done=0, as not done) for the student.
+    """
+
+    def post(self, request, id):
+        resource = get_object_or_404(
+            Resource.objects.select_related('topic'), id=id,
+            topic__deleted__isnull=True, topic__module__deleted__isnull=True)
+        module_id = resource.topic.module_id
+        if not is_enrolled(module_id, request.user.pk):
+            raise Http404('No resource found matching the query')
+        mark(request.user.pk, module_id, resource.slot,
+             done=request.POST.get('done') != '0')
+        return redirect('student_module_detail_topic', module_id, resource.topic_id)